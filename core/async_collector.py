@@ -0,0 +1,240 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
+
+from checkpoint import CheckpointStore
+from fast_decode import decode_search_response
+from request_executor import ERROR_CLASSES, classify_status
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_api_date(date_str: str) -> datetime:
+    """Converte uma data no formato da API (ISO 8601 com 'Z') para datetime UTC"""
+    return datetime.fromisoformat(date_str.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+
+def format_api_date(dt: datetime) -> str:
+    """Formata datetime no formato aceito por since/until"""
+    return dt.astimezone(timezone.utc).strftime(DATE_FORMAT)
+
+
+def split_date_range(start_date: str, end_date: str, slices: int) -> List[Tuple[str, str]]:
+    """Divide o período [start_date, end_date) em fatias de mesma duração"""
+    start = parse_api_date(start_date)
+    end = parse_api_date(end_date)
+    slices = max(1, slices)
+    step = (end - start) / slices
+
+    windows = []
+    for i in range(slices):
+        window_start = start + step * i
+        window_end = end if i == slices - 1 else start + step * (i + 1)
+        windows.append((format_api_date(window_start), format_api_date(window_end)))
+    return windows
+
+
+class AsyncBlueskyCollector:
+    """Coleta concorrente: uma cadeia de cursor por query e por fatia de data"""
+
+    def __init__(self, searcher, max_concurrency: int = 8, delay: float = 0.0, checkpoint=None,
+                 sink=None, keep_posts: bool = True):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("Para a coleta assíncrona, instale: pip install aiohttp")
+
+        # Reaproveita sessão autenticada e extração de dados do coletor síncrono
+        self.searcher = searcher
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        # CheckpointStore opcional: cada cadeia retoma do último cursor registrado
+        self.checkpoint = checkpoint
+        # PostStreamWriter opcional: grava cada lote assim que a página chega
+        self.sink = sink
+        self.keep_posts = keep_posts
+        # As gravações no sink rodam em threads (asyncio.to_thread); uma de cada vez
+        self._sink_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.stats = {
+            'requests': 0,
+            'chains_started': 0,
+            'chains_finished': 0,
+            'rate_limit_hits': 0
+        }
+
+    def _headers(self) -> Dict:
+        """Cabeçalhos da requisição, incluindo o token atual"""
+        # Token lido no envio: a troca pelo renovado é atômica no gerenciador de sessão
+        headers = dict(self.searcher.session.headers)
+        headers.update(self.searcher.session_manager.auth_headers())
+        return headers
+
+    async def _fetch_page(self, http, query: str, since: str, until: str,
+                          cursor: Optional[str] = None) -> Dict:
+        """Busca uma página de resultados respeitando o limite global de concorrência"""
+        endpoint = f"{self.searcher.base_url}/xrpc/app.bsky.feed.searchPosts"
+
+        params = {
+            'q': query,
+            'limit': 25,
+            'since': since,
+            'until': until
+        }
+
+        if cursor:
+            params['cursor'] = cursor
+
+        # SQLite, fsync e o refresh do token (requests) bloqueiam: rodam fora do event loop
+        response_cache = self.searcher.response_cache
+        if response_cache:
+            cached = await asyncio.to_thread(response_cache.get_raw, endpoint, params)
+            if cached is not None:
+                return decode_search_response(cached)
+
+        rate_limiter = self.searcher.rate_limiter
+        # Mesma classificação de erros e políticas de retentativa do coletor síncrono
+        executor = self.searcher.executor
+        attempts = {error_class: 0 for error_class in ERROR_CLASSES}
+
+        while True:
+            # Ritmo global: o limitador é o mesmo do coletor síncrono
+            await rate_limiter.acquire_async()
+            session_manager = self.searcher.session_manager
+            if session_manager.needs_refresh():
+                await asyncio.to_thread(session_manager.ensure_valid)
+            headers = None
+            async with self._semaphore:
+                self.stats['requests'] += 1
+                try:
+                    async with http.get(endpoint, params=params, headers=self._headers()) as response:
+                        rate_limiter.update_from_headers(response.headers)
+                        error_class = classify_status(response.status)
+                        if error_class is None:
+                            if response.status == 403:
+                                print("❌ Acesso negado. Verifique suas credenciais.")
+                                return {}
+                            response.raise_for_status()
+                            body = await response.read()
+                            if response_cache:
+                                await asyncio.to_thread(response_cache.put_raw, endpoint, params, body)
+                            return decode_search_response(body)
+                        headers = response.headers
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error_class = 'connection'
+                    print(f"🔌 Falha de conexão [{query} {since[:10]}]: {e}")
+                except aiohttp.ClientError as e:
+                    print(f"❌ Erro na requisição [{query} {since[:10]}]: {e}")
+                    return {}
+
+            if error_class == 'rate_limit':
+                self.stats['rate_limit_hits'] += 1
+
+            attempts[error_class] += 1
+            # Num 401, retry_wait renova o token de forma síncrona
+            wait = await asyncio.to_thread(executor.retry_wait, error_class, attempts[error_class], headers)
+            if wait is None:
+                print(f"❌ Desistindo [{query} {since[:10]}] após {attempts[error_class]} falhas ({error_class})")
+                return {}
+
+            # Espera fora do semáforo; pausas de 429 são aplicadas no próximo acquire_async
+            if error_class == 'rate_limit':
+                print(f"⏳ Rate limit atingido [{query} {since[:10]}]. Aguardando liberação...")
+            elif wait > 0:
+                await asyncio.sleep(wait)
+
+    def _write_to_sink(self, posts: List[Dict]):
+        with self._sink_lock:
+            self.searcher.write_to_sink(self.sink, posts)
+
+    async def _crawl_chain(self, http, query: str, since: str, until: str,
+                           max_requests: int) -> List[Dict]:
+        """Percorre uma cadeia de cursor completa para uma query e uma janela"""
+        self.stats['chains_started'] += 1
+        chain_posts = []
+        cursor = None
+        requests_made = 0
+
+        key = CheckpointStore.make_key(query, since, until)
+        if self.checkpoint:
+            cursor, done = self.checkpoint.get_cursor(key)
+            if self.keep_posts:
+                chain_posts.extend(await asyncio.to_thread(self.checkpoint.load_posts, key))
+            if done:
+                self.stats['chains_finished'] += 1
+                return chain_posts
+
+        while requests_made < max_requests:
+            requests_made += 1
+            result = await self._fetch_page(http, query, since, until, cursor)
+
+            # Resposta vazia por erro não encerra a cadeia no checkpoint
+            if not result:
+                break
+
+            posts_raw = result.get('posts', [])
+            if not posts_raw:
+                if self.checkpoint:
+                    await asyncio.to_thread(self.checkpoint.record_page, key, [], None, done=True)
+                break
+
+            batch = self.searcher.extract_batch(posts_raw)
+            filtered_posts = self.searcher.filter_batch(batch, query)
+            if self.sink:
+                await asyncio.to_thread(self._write_to_sink, filtered_posts)
+            if self.keep_posts:
+                chain_posts.extend(filtered_posts)
+
+            cursor = result.get('cursor')
+            if self.checkpoint:
+                await asyncio.to_thread(self.checkpoint.record_page, key, filtered_posts, cursor,
+                                        done=not cursor)
+            if not cursor:
+                break
+
+            if self.delay > 0:
+                await asyncio.sleep(self.delay)
+
+        self.stats['chains_finished'] += 1
+        print(f"   ✅ '{query}' {since[:10]} → {until[:10]}: {requests_made} requests")
+        return chain_posts
+
+    async def collect(self, queries: List[str], slices: int = 12,
+                      max_requests_per_chain: int = 10000) -> List[Dict]:
+        """Dispara todas as cadeias (query × janela) e junta os resultados sem duplicatas"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        windows = split_date_range(self.searcher.start_date, self.searcher.end_date, slices)
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        async with aiohttp.ClientSession(connector=connector) as http:
+            tasks = [
+                self._crawl_chain(http, query, since, until, max_requests_per_chain)
+                for query in queries
+                for since, until in windows
+            ]
+            results = await asyncio.gather(*tasks)
+
+        # Junta as cadeias, removendo posts repetidos entre queries
+        all_posts = []
+        seen_uris = set()
+        for chain_posts in results:
+            for post in chain_posts:
+                uri = post.get('uri')
+                if uri in seen_uris:
+                    continue
+                seen_uris.add(uri)
+                all_posts.append(post)
+
+        return all_posts
+
+    def run(self, queries: List[str], slices: int = 12,
+            max_requests_per_chain: int = 10000) -> List[Dict]:
+        """Executa a coleta assíncrona a partir de código síncrono"""
+        return asyncio.run(self.collect(queries, slices, max_requests_per_chain))
@@ -1,47 +1,74 @@
 import requests
 import json
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import csv
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Iterable, Set
 import os
+import threading
 from getpass import getpass
+from async_collector import AsyncBlueskyCollector, AIOHTTP_AVAILABLE, format_api_date, parse_api_date
+from crawl_planner import QueryYieldTracker, TimeWindowPlanner
+from checkpoint import CheckpointStore, WatermarkStore
+from rate_limiter import AdaptiveRateLimiter
+from request_executor import RequestExecutor
+from session_manager import BlueskySessionManager
+from response_cache import ResponseCache
+from fast_decode import decode_search_response
+from post_batch import PostBatch, StageTimings
+from post_record import Post
+from post_sinks import JsonlSink, CsvSink, PostStreamWriter, iter_jsonl, write_json_array
+from post_store import PYARROW_AVAILABLE, write_parquet
+from post_warehouse import DEFAULT_WAREHOUSE, PostWarehouse
 
 class BlueskySearcher2025:
-    def __init__(self):
-        self.base_url = "https://bsky.social"
+    def __init__(self, cache: Optional[ResponseCache] = None, base_url: str = "https://bsky.social",
+                 start_date: str = "2025-01-01T00:00:00Z", end_date: str = "2025-12-31T23:59:59Z"):
+        # Permite apontar para um PDS alternativo ou para o servidor simulado (mock_atproto_server.py)
+        self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
-        self.access_token = None
         self.session.headers.update({
             'User-Agent': 'BlueskyAgroSearcher2025/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
 
-        # Filtros de data para 2025
-        self.start_date = "2025-01-01T00:00:00Z"
-        self.end_date = "2025-12-31T23:59:59Z"
+        # Filtros de data (padrão: todo o ano de 2025)
+        self.start_date = start_date
+        self.end_date = end_date
 
-    def create_session(self, identifier: str, password: str) -> bool:
-        """Cria sessão autenticada no Bluesky"""
-        endpoint = f"{self.base_url}/xrpc/com.atproto.server.createSession"
+        # Ritmo compartilhado por todos os workers, ajustado pelos cabeçalhos da API
+        self.rate_limiter = AdaptiveRateLimiter(rate=1 / 3.0)
 
-        data = {
-            "identifier": identifier,
-            "password": password
-        }
+        # Tokens renovados em segundo plano antes do exp do JWT
+        self.stats = {}
+        self.session_manager = BlueskySessionManager(self.base_url, self.session, stats=self.stats)
 
-        try:
-            response = self.session.post(endpoint, json=data)
-            response.raise_for_status()
+        # Retentativas por classe de erro (429, 401, 5xx, conexão); 401 renova o token
+        self.executor = RequestExecutor(self.session, self.rate_limiter, self.stats,
+                                        on_auth_error=self.session_manager.handle_auth_error,
+                                        auth_provider=self.session_manager.auth_headers)
+
+        # Cache opcional de páginas já baixadas (query, janela, cursor)
+        self.response_cache = cache
+
+        # Posts da coleta em andamento (disponíveis mesmo se ela for interrompida)
+        self.collected_posts: List[Dict] = []
+
+        # Tempo gasto em busca, extração, filtro e gravação
+        self.timings = StageTimings()
 
-            session_data = response.json()
-            self.access_token = session_data.get('accessJwt')
+        # Rendimento e queries de cada post na última coleta com várias queries
+        self.query_tracker: Optional[QueryYieldTracker] = None
 
-            if self.access_token:
-                self.session.headers.update({
-                    'Authorization': f'Bearer {self.access_token}'
-                })
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.session_manager.access_token
+
+    def create_session(self, identifier: str, password: str) -> bool:
+        """Cria sessão autenticada no Bluesky"""
+        try:
+            if self.session_manager.create_session(identifier, password):
                 print("✅ Autenticação realizada com sucesso!")
                 return True
             else:
@@ -55,43 +82,53 @@ class BlueskySearcher2025:
                 print(f"Response: {e.response.text}")
             return False
 
-    def search_posts_2025(self, query: str, limit: int = 25, cursor: Optional[str] = None) -> Dict:
+    def search_posts_2025(self, query: str, limit: int = 25, cursor: Optional[str] = None,
+                          since: Optional[str] = None, until: Optional[str] = None) -> Dict:
         """Busca posts de 2025 usando a API autenticada do Bluesky"""
-        if not self.access_token:
-            print("❌ Erro: Não autenticado")
-            return {}
-
         endpoint = f"{self.base_url}/xrpc/app.bsky.feed.searchPosts"
 
         params = {
             'q': query,
             'limit': min(limit, 25),
-            'since': self.start_date,
-            'until': self.end_date
+            'since': since or self.start_date,
+            'until': until or self.end_date
         }
 
         if cursor:
             params['cursor'] = cursor
 
-        try:
-            response = self.session.get(endpoint, params=params)
+        if self.response_cache:
+            cached = self.response_cache.get_raw(endpoint, params)
+            if cached is not None:
+                return decode_search_response(cached)
+
+        if not self.access_token:
+            print("❌ Erro: Não autenticado")
+            return {}
 
-            if response.status_code == 429:
-                wait_time = 60
-                print(f"⏳ Rate limit atingido. Aguardando {wait_time}s...")
-                time.sleep(wait_time)
-                return self.search_posts_2025(query, limit, cursor)
+        try:
+            with self.timings.stage('busca'):
+                response = self.executor.execute('GET', endpoint, params=params)
+            if response is None:
+                return {}
 
             if response.status_code == 403:
                 print("❌ Acesso negado. Verifique suas credenciais.")
                 return {}
 
             response.raise_for_status()
-            return response.json()
+            # Decodificação rápida (msgspec/orjson) direto dos bytes; o cache guarda o corpo original
+            data = decode_search_response(response.content)
+            if self.response_cache:
+                self.response_cache.put_raw(endpoint, params, response.content)
+            return data
 
         except requests.exceptions.RequestException as e:
             print(f"❌ Erro na requisição: {e}")
             return {}
+        except ValueError as e:
+            print(f"❌ Resposta inválida da API: {e}")
+            return {}
 
     def is_post_from_2025(self, post_date: str) -> bool:
         """Verifica se o post é de 2025"""
@@ -108,8 +145,8 @@ class BlueskySearcher2025:
             print(f"⚠️ Erro ao verificar data: {e}")
             return False
 
-    def extract_post_data(self, post: Dict) -> Dict:
-        """Extrai dados relevantes de um post"""
+    def extract_post_data(self, post: Dict) -> Optional[Post]:
+        """Extrai dados relevantes de um post (registro compacto, lido como um dict)"""
         try:
             if 'post' in post:
                 actual_post = post['post']
@@ -120,50 +157,76 @@ class BlueskySearcher2025:
             author = actual_post.get('author', {})
             created_at = record.get('createdAt', '')
 
-            return {
-                'uri': actual_post.get('uri', ''),
-                'cid': actual_post.get('cid', ''),
-                'author_did': author.get('did', ''),
-                'author_handle': author.get('handle', ''),
-                'author_display_name': author.get('displayName', ''),
-                'text': record.get('text', ''),
-                'created_at': created_at,
-                'reply_count': actual_post.get('replyCount', 0),
-                'repost_count': actual_post.get('repostCount', 0),
-                'like_count': actual_post.get('likeCount', 0),
-                'indexed_at': actual_post.get('indexedAt', ''),
-                'langs': record.get('langs', []),
-                'is_2025': self.is_post_from_2025(created_at)
-            }
+            return Post(
+                uri=actual_post.get('uri', ''),
+                cid=actual_post.get('cid', ''),
+                author_did=author.get('did', ''),
+                author_handle=author.get('handle', ''),
+                author_display_name=author.get('displayName', ''),
+                text=record.get('text', ''),
+                created_at=created_at,
+                reply_count=actual_post.get('replyCount', 0),
+                repost_count=actual_post.get('repostCount', 0),
+                like_count=actual_post.get('likeCount', 0),
+                indexed_at=actual_post.get('indexedAt', ''),
+                langs=record.get('langs', []),
+                is_2025=self.is_post_from_2025(created_at)
+            )
         except Exception as e:
             print(f"❌ Erro ao extrair dados: {e}")
-            return {}
-
-    def filter_posts_by_keyword_and_year(self, posts: List[Dict], keyword: str) -> List[Dict]:
-        """Filtra posts de 2025 que contêm a palavra-chave"""
-        filtered_posts = []
-        keyword_lower = keyword.lower()
-
-        for post in posts:
-            text = post.get('text', '').lower()
-            created_at = post.get('created_at', '')
-
-            # Verifica se contém a palavra-chave E é de 2025
-            if keyword_lower in text and self.is_post_from_2025(created_at):
-                filtered_posts.append(post)
-
-        return filtered_posts
-
-    def collect_all_posts_2025(self, query: str, delay: float = 3.0, max_requests: int = 10000) -> List[Dict]:
-        """Coleta TODOS os posts de 2025 (sem limite de quantidade)"""
+            return None
+
+    def extract_batch(self, posts_raw: List[Dict]) -> PostBatch:
+        """Extrai a página inteira para colunas em uma passada"""
+        with self.timings.stage('extração', len(posts_raw)):
+            return PostBatch.from_page(posts_raw)
+
+    def filter_batch(self, batch: PostBatch, keyword: str,
+                     exclude_uris: Optional[Set[str]] = None) -> List[Post]:
+        """Posts do lote com a palavra-chave e dentro do período da coleta (datas comparadas como texto)"""
+        with self.timings.stage('filtro', len(batch)):
+            return batch.filter(keyword, self.start_date, self.end_date, exclude_uris).to_posts()
+
+    def write_to_sink(self, sink, posts: List[Post]):
+        with self.timings.stage('gravação', len(posts)):
+            sink.write_batch(posts)
+
+    def collect_all_posts_2025(self, query: str, delay: float = 3.0, max_requests: int = 10000,
+                               checkpoint: Optional[CheckpointStore] = None,
+                               sink: Optional[PostStreamWriter] = None,
+                               keep_posts: bool = True) -> List[Dict]:
+        """Coleta TODOS os posts de 2025 (sem limite de quantidade)
+
+        Com `sink`, cada lote é gravado assim que chega; com keep_posts=False
+        nada é acumulado na memória e o retorno fica vazio.
+        """
         all_posts = []
+        self.collected_posts = all_posts
         cursor = None
         requests_made = 0
         posts_2025_found = 0
 
+        # Retoma do último cursor salvo, sem baixar de novo as páginas já registradas
+        key = CheckpointStore.make_key(query, self.start_date, self.end_date)
+        if checkpoint:
+            cursor, done = checkpoint.get_cursor(key)
+            restored_posts = checkpoint.load_posts(key)
+            posts_2025_found = len(restored_posts)
+            if keep_posts:
+                all_posts.extend(restored_posts)
+            if done:
+                print(f"♻️ Coleta de '{query}' já concluída no checkpoint: {posts_2025_found} posts")
+                return all_posts
+            if cursor:
+                print(f"♻️ Retomando '{query}' do checkpoint com {posts_2025_found} posts já coletados")
+
+        # O delay define o ritmo inicial; depois vale o limite informado pelo servidor
+        if delay > 0:
+            self.rate_limiter.set_rate(1.0 / delay)
+
         print(f"🔍 Iniciando coleta COMPLETA de posts de 2025 com '{query}'...")
         print(f"📅 Período: 01/01/2025 a 31/12/2025")
-        print(f"⏱️ Delay entre requests: {delay}s")
+        print(f"⏱️ Delay inicial entre requests: {delay}s (ajustado pelos cabeçalhos de rate limit)")
         print(f"🔄 Máximo de requests: {max_requests}")
         print("-" * 60)
 
@@ -185,24 +248,20 @@ class BlueskySearcher2025:
 
             if not posts_raw:
                 print("📭 Não há mais posts disponíveis")
+                if checkpoint:
+                    checkpoint.record_page(key, [], None, done=True)
                 break
 
             # Processa os posts
-            batch_posts = []
-            batch_2025_count = 0
-
-            for post_raw in posts_raw:
-                post_data = self.extract_post_data(post_raw)
-                if post_data and post_data.get('text'):
-                    batch_posts.append(post_data)
-
-                    # Conta posts de 2025
-                    if post_data.get('is_2025', False):
-                        batch_2025_count += 1
+            batch = self.extract_batch(posts_raw)
+            batch_2025_count = batch.count_true('is_2025')
 
             # Filtra apenas posts de 2025 com a palavra-chave
-            filtered_posts = self.filter_posts_by_keyword_and_year(batch_posts, query)
-            all_posts.extend(filtered_posts)
+            filtered_posts = self.filter_batch(batch, query)
+            if sink:
+                self.write_to_sink(sink, filtered_posts)
+            if keep_posts:
+                all_posts.extend(filtered_posts)
             posts_2025_found += len(filtered_posts)
 
             print(f"   📊 Posts neste lote: {len(posts_raw)}")
@@ -211,6 +270,8 @@ class BlueskySearcher2025:
 
             # Atualiza cursor
             cursor = result.get('cursor')
+            if checkpoint:
+                checkpoint.record_page(key, filtered_posts, cursor, done=not cursor)
             if not cursor:
                 print("📄 Não há mais páginas disponíveis")
                 break
@@ -222,45 +283,221 @@ class BlueskySearcher2025:
                 print(f"   🕐 Tempo decorrido: {elapsed}")
                 print(f"   📝 Total de posts de 2025: {posts_2025_found}")
                 print(f"   📈 Taxa: {posts_2025_found / requests_made:.1f} posts/request")
+                print(f"   ⚡ Ritmo: {self.rate_limiter.achieved_rate():.2f} req/s "
+                      f"(alvo {self.rate_limiter.rate:.2f} req/s)")
                 print("-" * 40)
 
-            # Rate limiting
-            if delay > 0:
-                time.sleep(delay)
-
         elapsed = datetime.now() - start_time
         print(f"\n✅ === COLETA FINALIZADA ===")
         print(f"🕐 Tempo total: {elapsed}")
         print(f"📡 Total de requests: {requests_made}")
-        print(f"📝 Posts de 2025 coletados: {len(all_posts)}")
-        print(f"📈 Taxa final: {len(all_posts) / requests_made:.1f} posts/request")
+        print(f"📝 Posts de 2025 coletados: {posts_2025_found}")
+        print(f"📈 Taxa final: {posts_2025_found / requests_made:.1f} posts/request")
+        self.print_rate_metrics()
 
         return all_posts
 
-    def analyze_posts(self, posts: List[Dict]):
-        """Análise estatística dos posts coletados"""
-        if not posts:
-            return
+    def collect_incremental_2025(self, query: str, watermarks: WatermarkStore,
+                                 known_uris: Optional[Callable[[List[str]], Set[str]]] = None,
+                                 delay: float = 3.0, max_requests: int = 10000,
+                                 sink: Optional[PostStreamWriter] = None,
+                                 overlap_margin: float = 600.0) -> List[Dict]:
+        """Coleta só os posts mais novos que a marca d'água da query
 
-        print(f"\n📊 === ANÁLISE ESTATÍSTICA ===")
+        A busca começa em `watermark - overlap_margin` (posts indexados com atraso)
+        e para na primeira página que contém URIs já armazenadas (`known_uris`).
+        A marca só avança quando a cadeia termina, para uma interrupção não pular posts.
+        """
+        watermark = watermarks.get(query)
+        if not watermark:
+            print(f"⚠️ Sem marca d'água para '{query}': faça primeiro uma coleta completa")
+            return []
 
-        # Estatísticas básicas
-        total_likes = sum(post.get('like_count', 0) for post in posts)
-        total_reposts = sum(post.get('repost_count', 0) for post in posts)
-        total_replies = sum(post.get('reply_count', 0) for post in posts)
+        since_dt = parse_api_date(watermark) - timedelta(seconds=overlap_margin)
+        since = max(format_api_date(since_dt), self.start_date)
 
-        print(f"📝 Total de posts: {len(posts)}")
-        print(f"💖 Total de likes: {total_likes}")
-        print(f"🔄 Total de reposts: {total_reposts}")
-        print(f"💬 Total de replies: {total_replies}")
+        if delay > 0:
+            self.rate_limiter.set_rate(1.0 / delay)
+
+        print(f"🔍 Coleta incremental de '{query}' desde {since} (marca: {watermark})")
+
+        new_posts = []
+        cursor = None
+        requests_made = 0
+        completed = False
 
-        if len(posts) > 0:
-            print(f"📈 Média de likes/post: {total_likes / len(posts):.1f}")
-            print(f"📈 Média de reposts/post: {total_reposts / len(posts):.1f}")
+        while requests_made < max_requests:
+            requests_made += 1
+            result = self.search_posts_2025(query, 25, cursor, since=since)
+            if not result or 'posts' not in result:
+                print("❌ Sem resultados ou erro na API")
+                break
+
+            batch = self.extract_batch(result.get('posts', []))
 
-        # Posts por mês
+            # Resultados vêm do mais novo ao mais antigo: URI conhecida = daqui para trás já temos
+            known = known_uris(batch.uris) if known_uris and len(batch) else set()
+            filtered_posts = self.filter_batch(batch, query, exclude_uris=known)
+            if sink:
+                self.write_to_sink(sink, filtered_posts)
+            new_posts.extend(filtered_posts)
+            print(f"📡 Request {requests_made} - Posts novos: {len(new_posts)}")
+
+            cursor = result.get('cursor')
+            if known:
+                print(f"🛑 Página com {len(known)} posts já armazenados: coleta incremental concluída")
+                completed = True
+                break
+            if not cursor or not len(batch):
+                completed = True
+                break
+
+        if completed:
+            watermarks.advance(query, new_posts)
+            watermarks.save()
+            print(f"✅ {len(new_posts)} posts novos | nova marca d'água: {watermarks.get(query)}")
+        else:
+            print("⚠️ Coleta incremental incompleta: a marca d'água não foi alterada")
+
+        self.print_rate_metrics()
+        return new_posts
+
+    def collect_all_posts_2025_async(self, queries: List[str], slices: int = 12,
+                                     max_concurrency: int = 8,
+                                     max_requests_per_chain: int = 10000,
+                                     checkpoint: Optional[CheckpointStore] = None,
+                                     sink: Optional[PostStreamWriter] = None,
+                                     keep_posts: bool = True) -> List[Dict]:
+        """Coleta concorrente: uma cadeia de cursor por query e por fatia do período"""
+        collector = AsyncBlueskyCollector(self, max_concurrency=max_concurrency, checkpoint=checkpoint,
+                                          sink=sink, keep_posts=keep_posts)
+
+        print(f"🔍 Iniciando coleta CONCORRENTE de posts de 2025 para {queries}...")
+        print(f"📅 Período dividido em {slices} janelas")
+        print(f"⚡ Requests simultâneos: até {max_concurrency}")
+        print("-" * 60)
+
+        start_time = datetime.now()
+        all_posts = collector.run(queries, slices, max_requests_per_chain)
+
+        elapsed = datetime.now() - start_time
+        requests_made = max(collector.stats['requests'], 1)
+        print(f"\n✅ === COLETA FINALIZADA ===")
+        print(f"🕐 Tempo total: {elapsed}")
+        posts_collected = sink.count if sink and not keep_posts else len(all_posts)
+        print(f"📡 Total de requests: {collector.stats['requests']}")
+        print(f"📝 Posts de 2025 coletados: {posts_collected}")
+        print(f"📈 Taxa final: {posts_collected / requests_made:.1f} posts/request")
+        self.print_rate_metrics()
+
+        return all_posts
+
+    def collect_all_posts_2025_planned(self, queries: List[str], max_workers: int = 4,
+                                       max_pages_per_window: int = 40,
+                                       delay: float = 3.0,
+                                       checkpoint: Optional[CheckpointStore] = None,
+                                       sink: Optional[PostStreamWriter] = None,
+                                       min_query_yield: float = 0.02,
+                                       max_requests_per_query: Optional[int] = None) -> List[Dict]:
+        """Coleta em janelas adaptativas (mês → semana → dia → hora) com pool de workers
+
+        Com várias queries, todas avançam juntas num único rastreamento: cada post recebe
+        `matched_queries` e a query cujas páginas recentes rendem menos de `min_query_yield`
+        de URIs novas é encerrada. `max_requests_per_query` limita os requests de cada
+        query somando todas as janelas dela.
+        """
+        stream_lock = threading.Lock()
+        if delay > 0:
+            self.rate_limiter.set_rate(1.0 / delay)
+
+        tracker = QueryYieldTracker(min_yield=min_query_yield) if len(queries) > 1 else None
+        self.query_tracker = tracker
+
+        def fetch_page(query, since, until, cursor):
+            return self.search_posts_2025(query, 25, cursor, since, until)
+
+        def process_page(window, posts_raw):
+            filtered_posts = self.filter_batch(self.extract_batch(posts_raw), window.query)
+            if tracker:
+                # Queries que acharam o post até aqui; as posteriores entram no fim da coleta
+                for post in filtered_posts:
+                    post.matched_queries = tracker.matched_queries(post.uri)
+            if sink:
+                with stream_lock:
+                    self.write_to_sink(sink, filtered_posts)
+            return filtered_posts
+
+        planner = TimeWindowPlanner(fetch_page, process_page, max_workers=max_workers,
+                                    max_pages_per_window=max_pages_per_window,
+                                    checkpoint=checkpoint, yield_tracker=tracker,
+                                    max_requests_per_query=max_requests_per_query)
+
+        print(f"🔍 Iniciando coleta PLANEJADA de posts de 2025 para {queries}...")
+        print(f"👷 Workers: {max_workers} | Páginas por janela antes de subdividir: {max_pages_per_window}")
+        print("-" * 60)
+
+        start_time = datetime.now()
+        all_posts = planner.run(queries, self.start_date, self.end_date)
+        if tracker:
+            all_posts = list(self.tag_posts(all_posts))
+
+        elapsed = datetime.now() - start_time
+        print(f"\n✅ === COLETA FINALIZADA ===")
+        print(f"🕐 Tempo total: {elapsed}")
+        print(f"🗂️ Janelas rastreadas: {planner.stats['windows_crawled']} "
+              f"({planner.stats['windows_split']} subdivididas)")
+        print(f"📡 Total de requests: {planner.stats['pages_fetched']}")
+        print(f"📝 Posts de 2025 coletados: {len(all_posts)}")
+        if tracker:
+            print(f"⏭️ Janelas puladas por queries encerradas: {planner.stats['windows_skipped']}")
+            tracker.print_report()
+        self.print_rate_metrics()
+
+        return all_posts
+
+    def tag_posts(self, posts: Iterable[Dict]) -> Iterable[Dict]:
+        """Completa `matched_queries` com todas as queries que encontraram cada post"""
+        for post in posts:
+            if self.query_tracker:
+                matched = self.query_tracker.matched_queries(post['uri'])
+                if matched:
+                    post['matched_queries'] = matched
+            yield post
+
+    def print_rate_metrics(self):
+        """Mostra o ritmo alcançado e as esperas impostas pelo limitador"""
+        metrics = self.rate_limiter.metrics()
+        print(f"⚡ Ritmo alcançado: {metrics['achieved_rate']:.2f} req/s "
+              f"(alvo {metrics['target_rate']:.2f} req/s)")
+        print(f"⏳ Esperas: {metrics['throttled_waits']} ({metrics['total_wait_time']:.0f}s) | "
+              f"Backoffs por 429: {metrics['backoffs']}")
+        print(f"🔄 Renovações de token: {self.stats['token_renewals']}")
+        print(f"🔁 Retentativas: 429={self.stats['retries_rate_limit']} "
+              f"401={self.stats['retries_auth']} 5xx={self.stats['retries_server']} "
+              f"conexão={self.stats['retries_connection']} | "
+              f"Falhas definitivas: {self.stats['failed_requests']}")
+        if self.response_cache:
+            self.response_cache.print_stats()
+        self.timings.print_report()
+
+    def analyze_posts(self, posts: Iterable[Dict]):
+        """Análise estatística dos posts coletados (uma única passada, aceita streams)"""
+        total_posts = 0
+        total_likes = 0
+        total_reposts = 0
+        total_replies = 0
         monthly_count = {}
+        author_count = {}
+
         for post in posts:
+            total_posts += 1
+
+            # Estatísticas básicas
+            total_likes += post.get('like_count', 0)
+            total_reposts += post.get('repost_count', 0)
+            total_replies += post.get('reply_count', 0)
+
+            # Posts por mês
             created_at = post.get('created_at', '')
             if created_at:
                 try:
@@ -270,52 +507,96 @@ class BlueskySearcher2025:
                 except:
                     pass
 
+            # Autores mais ativos
+            handle = post.get('author_handle', '')
+            if handle:
+                author_count[handle] = author_count.get(handle, 0) + 1
+
+        top_authors = sorted(author_count.items(), key=lambda x: x[1], reverse=True)[:10]
+        self._print_analysis(total_posts, total_likes, total_reposts, total_replies,
+                             monthly_count, top_authors)
+
+    def analyze_warehouse(self, warehouse: PostWarehouse, uris: Optional[Iterable[str]] = None):
+        """Mesma análise de analyze_posts, calculada por consultas indexadas na base SQLite
+
+        Com `uris`, só os posts desta coleta entram na análise; sem, a base inteira.
+        """
+        since, until = self.start_date, self.end_date
+        warehouse.scope_to(uris)
+        totals = warehouse.totals(since, until)
+        self._print_analysis(totals['posts'], totals['likes'], totals['reposts'], totals['replies'],
+                             warehouse.monthly_counts(since, until),
+                             warehouse.top_authors(10, since, until))
+
+    def _print_analysis(self, total_posts: int, total_likes: int, total_reposts: int, total_replies: int,
+                        monthly_count: Dict[str, int], top_authors: List):
+        if not total_posts:
+            return
+
+        print(f"\n📊 === ANÁLISE ESTATÍSTICA ===")
+        print(f"📝 Total de posts: {total_posts}")
+        print(f"💖 Total de likes: {total_likes}")
+        print(f"🔄 Total de reposts: {total_reposts}")
+        print(f"💬 Total de replies: {total_replies}")
+        print(f"📈 Média de likes/post: {total_likes / total_posts:.1f}")
+        print(f"📈 Média de reposts/post: {total_reposts / total_posts:.1f}")
+
         if monthly_count:
             print(f"\n📅 === POSTS POR MÊS (2025) ===")
             for month, count in sorted(monthly_count.items()):
                 print(f"   {month}: {count} posts")
 
-        # Autores mais ativos
-        author_count = {}
-        for post in posts:
-            handle = post.get('author_handle', '')
-            if handle:
-                author_count[handle] = author_count.get(handle, 0) + 1
-
-        if author_count:
+        if top_authors:
             print(f"\n👥 === TOP 10 AUTORES MAIS ATIVOS ===")
-            top_authors = sorted(author_count.items(), key=lambda x: x[1], reverse=True)[:10]
             for i, (author, count) in enumerate(top_authors, 1):
                 print(f"   {i}. @{author}: {count} posts")
 
-    def save_to_csv(self, posts: List[Dict], filename: str = None):
-        """Salva posts em arquivo CSV"""
+    def save_to_csv(self, posts: Iterable[Dict], filename: str = None):
+        """Salva posts em arquivo CSV (esquema fixo, gravado em lotes)"""
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"data/bluesky_agro_2025_complete_{timestamp}.csv"
 
-        if not posts:
+        if isinstance(posts, list) and not posts:
             print("❌ Nenhum post para salvar")
             return
 
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = posts[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        if os.path.exists(filename):
+            os.remove(filename)
 
-            writer.writeheader()
-            for post in posts:
-                writer.writerow(post)
+        sink = CsvSink(filename)
+        batch = []
+        for post in posts:
+            batch.append(post)
+            if len(batch) >= 1000:
+                sink.write_batch(batch)
+                batch = []
+        sink.write_batch(batch)
+        sink.close()
 
         print(f"💾 Posts salvos em: {filename}")
 
-    def save_to_json(self, posts: List[Dict], filename: str = None):
-        """Salva posts em arquivo JSON"""
+    def save_to_json(self, posts: Iterable[Dict], filename: str = None):
+        """Salva posts em arquivo JSON (array gravado item a item)"""
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"data/bluesky_agro_2025_complete_{timestamp}.json"
 
-        with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(posts, jsonfile, ensure_ascii=False, indent=2)
+        write_json_array(posts, filename)
+
+        print(f"💾 Posts salvos em: {filename}")
+
+    def save_to_parquet(self, posts: Iterable[Dict], filename: str = None):
+        """Salva posts em Parquet com colunas tipadas (lido pelas etapas de análise)"""
+        if not PYARROW_AVAILABLE:
+            print("⚠️ pyarrow não instalado: arquivo Parquet não gerado (pip install pyarrow)")
+            return
+
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"data/bluesky_agro_2025_complete_{timestamp}.parquet"
+
+        write_parquet(posts, filename)
 
         print(f"💾 Posts salvos em: {filename}")
 
@@ -359,15 +640,37 @@ def main():
 
     # Configurações para busca completa de 2025
     QUERY = "agronegócio"
+    # Com mais de uma query, todas são coletadas juntas num único rastreamento planejado
+    QUERIES = [QUERY]
+    MIN_QUERY_YIELD = 0.02  # Query encerrada quando menos de 2% das páginas recentes são posts novos
     DELAY_BETWEEN_REQUESTS = 3.0  # Mais conservador para coleta longa
     MAX_REQUESTS = 50000  # Limite alto para busca completa
+    USE_ASYNC = AIOHTTP_AVAILABLE  # Coleta concorrente quando aiohttp está instalado
+    DATE_SLICES = 12  # Uma cadeia de cursor por mês
+    MAX_CONCURRENCY = 8
+    CHECKPOINT_DIR = f"data/checkpoints/{QUERY}"  # Permite retomar após Ctrl-C ou queda
+    STREAM_BASE = f"data/bluesky_agro_2025_{QUERY}_parcial"  # Gravado lote a lote durante a coleta
+    WAREHOUSE_PATH = DEFAULT_WAREHOUSE  # Base SQLite consolidada de todas as execuções
+    INCREMENTAL = True  # Depois da primeira coleta completa, busca só posts mais novos
+    WATERMARKS_PATH = "data/checkpoints/watermarks.json"  # Post mais recente por query
+
+    watermarks = WatermarkStore(WATERMARKS_PATH)
+    multi_query = len(QUERIES) > 1
+    incremental = INCREMENTAL and not multi_query and watermarks.get(QUERY) is not None
 
     print("🚀 === COLETOR COMPLETO - POSTS 2025 ===")
-    print(f"🔍 Buscando por: '{QUERY}'")
+    print(f"🔍 Buscando por: {', '.join(repr(query) for query in QUERIES)}")
     print(f"📅 Período: Todo o ano de 2025")
     print(f"⏱️ Delay entre requests: {DELAY_BETWEEN_REQUESTS}s")
     print(f"🔄 Máximo de requests: {MAX_REQUESTS}")
-    print(f"⚠️  ATENÇÃO: Esta pode ser uma coleta MUITO longa!")
+    if incremental:
+        print(f"🆕 Modo incremental: só posts mais novos que {watermarks.get(QUERY)}")
+    else:
+        if multi_query:
+            print(f"🔀 Queries coletadas juntas; encerradas com menos de {MIN_QUERY_YIELD:.0%} de posts novos")
+        elif USE_ASYNC:
+            print(f"⚡ Modo concorrente: {DATE_SLICES} janelas, até {MAX_CONCURRENCY} requests simultâneos")
+        print(f"⚠️  ATENÇÃO: Esta pode ser uma coleta MUITO longa!")
     print("-" * 60)
 
     # Confirma se o usuário quer continuar
@@ -383,44 +686,136 @@ def main():
         print("❌ Credenciais não fornecidas. O script será encerrado.")
         return
 
+    # Servidor alternativo opcional (BLUESKY_BASE_URL no .env), ex.: mock_atproto_server.py
+    base_url = os.getenv('BLUESKY_BASE_URL')
+    if base_url:
+        searcher.base_url = searcher.session_manager.base_url = base_url.rstrip('/')
+        print(f"🧪 Usando servidor: {searcher.base_url}")
+
+    # Cache de respostas opcional (BLUESKY_RESPONSE_CACHE no .env)
+    cache_path = os.getenv('BLUESKY_RESPONSE_CACHE')
+    if cache_path:
+        searcher.response_cache = ResponseCache(cache_path)
+        print(f"🗄️ Cache de respostas ativo: {cache_path}")
+
     # Autentica
     if not searcher.create_session(email, password):
         print("❌ Falha na autenticação")
         return
 
+    checkpoint = CheckpointStore(CHECKPOINT_DIR)
+
+    # Arquivos parciais: crescem a cada lote e continuam entre retomadas
+    stream_jsonl = f"{STREAM_BASE}.jsonl"
+    stream_csv = f"{STREAM_BASE}.csv"
+    # A base consolidada recebe os mesmos lotes; posts já conhecidos têm o engajamento atualizado
+    warehouse = PostWarehouse(WAREHOUSE_PATH)
+    stream = PostStreamWriter(
+        [JsonlSink(stream_jsonl), CsvSink(stream_csv), warehouse],
+        seen_uris=(post.get('uri') for post in iter_jsonl(stream_jsonl))
+    )
+    print(f"📝 Posts gravados durante a coleta em: {stream_jsonl} / {stream_csv}")
+    print(f"🗃️ Base consolidada: {WAREHOUSE_PATH}")
+
     try:
         print(f"\n🏁 Iniciando coleta em 3 segundos...")
         time.sleep(3)
 
-        # Coleta TODOS os posts de 2025
-        posts = searcher.collect_all_posts_2025(
-            query=QUERY,
-            delay=DELAY_BETWEEN_REQUESTS,
-            max_requests=MAX_REQUESTS
-        )
-
-        if posts:
-            # Análise estatística
-            searcher.analyze_posts(posts)
-
-            # Salva os arquivos
+        # Coleta TODOS os posts de 2025 (ou só os novos, no modo incremental)
+        if incremental:
+            searcher.collect_incremental_2025(
+                query=QUERY,
+                watermarks=watermarks,
+                known_uris=warehouse.known_uris,
+                delay=DELAY_BETWEEN_REQUESTS,
+                max_requests=MAX_REQUESTS,
+                sink=stream
+            )
+        elif multi_query:
+            searcher.collect_all_posts_2025_planned(
+                queries=QUERIES,
+                delay=DELAY_BETWEEN_REQUESTS,
+                checkpoint=checkpoint,
+                sink=stream,
+                min_query_yield=MIN_QUERY_YIELD,
+                max_requests_per_query=MAX_REQUESTS
+            )
+        elif USE_ASYNC:
+            searcher.collect_all_posts_2025_async(
+                queries=[QUERY],
+                slices=DATE_SLICES,
+                max_concurrency=MAX_CONCURRENCY,
+                max_requests_per_chain=MAX_REQUESTS // DATE_SLICES,
+                checkpoint=checkpoint,
+                sink=stream,
+                keep_posts=False
+            )
+        else:
+            searcher.collect_all_posts_2025(
+                query=QUERY,
+                delay=DELAY_BETWEEN_REQUESTS,
+                max_requests=MAX_REQUESTS,
+                checkpoint=checkpoint,
+                sink=stream,
+                keep_posts=False
+            )
+        stream.close()
+
+        total_posts = len(stream.seen_uris)
+        if total_posts:
+            # Análise estatística por consultas indexadas na base consolidada
+            warehouse = PostWarehouse(WAREHOUSE_PATH)
+            if searcher.query_tracker:
+                # Os lotes foram gravados com as queries conhecidas até então; aqui entram todas
+                warehouse.tag_queries((post['uri'], post.get('matched_queries'))
+                                      for post in searcher.tag_posts(iter_jsonl(stream_jsonl)))
+            print(f"\n🗃️ Base consolidada: {len(warehouse):,} posts de todas as execuções")
+            # A análise cobre só os posts desta coleta, como antes da base consolidada
+            searcher.analyze_warehouse(warehouse, uris=stream.seen_uris)
+            warehouse.close()
+
+            # Coleta completa concluída: a próxima execução pode ser incremental
+            if not incremental:
+                watermarks.advance(QUERY, iter_jsonl(stream_jsonl))
+                watermarks.save()
+
+            # Converte os arquivos parciais nos arquivos finais
             print(f"\n💾 === SALVANDO ARQUIVOS ===")
-            searcher.save_to_csv(posts)
-            searcher.save_to_json(posts)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            final_base = f"data/bluesky_agro_2025_complete_{timestamp}"
+            os.replace(stream_csv, f"{final_base}.csv")
+            print(f"💾 Posts salvos em: {final_base}.csv")
+            searcher.save_to_json(searcher.tag_posts(iter_jsonl(stream_jsonl)), f"{final_base}.json")
+            searcher.save_to_parquet(iter_jsonl(stream_jsonl), f"{final_base}.parquet")
+            if searcher.query_tracker:
+                final_jsonl = JsonlSink(f"{final_base}.jsonl")
+                final_jsonl.write_batch(list(searcher.tag_posts(iter_jsonl(stream_jsonl))))
+                final_jsonl.close()
+                os.remove(stream_jsonl)
+            else:
+                os.replace(stream_jsonl, f"{final_base}.jsonl")
+
+            # Coleta salva: o próximo run começa do zero
+            checkpoint.clear()
 
-            print(f"\n🎉 SUCESSO! Coletados {len(posts)} posts de 2025 com 'agronegócio'!")
+            print(f"\n🎉 SUCESSO! Coletados {total_posts} posts de 2025 com 'agronegócio'!")
 
+        elif incremental:
+            print("📭 Nenhum post novo desde a última execução.")
         else:
             print("❌ Nenhum post foi coletado.")
 
     except KeyboardInterrupt:
         print("\n\n⏹️ Interrompido pelo usuário.")
-        print("💾 Salvando posts coletados até agora...")
-        if 'posts' in locals() and posts:
-            searcher.save_to_csv(posts)
-            searcher.save_to_json(posts)
+        print(f"💾 Posts coletados até agora estão em: {stream_jsonl} / {stream_csv}")
+        print(f"♻️ Rode novamente para retomar do checkpoint em {CHECKPOINT_DIR}")
     except Exception as e:
         print(f"❌ Erro inesperado: {e}")
+        print(f"♻️ Rode novamente para retomar do checkpoint em {CHECKPOINT_DIR}")
+    finally:
+        stream.close()
+        checkpoint.close()
+        searcher.session_manager.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from post_record import Post
+from post_sinks import json_default
+
+
+class CheckpointStore:
+    """Checkpoint durável: diário append-only de páginas, com o último cursor por chave
+
+    O diário é a única fonte de verdade: cada página grava nele o cursor da chave. Ao abrir,
+    um diário com muitas páginas por chave é compactado numa entrada por chave, e cursors.json
+    (só para inspeção) é regravado no close().
+    """
+
+    JOURNAL_FILE = "journal.jsonl"
+    CURSORS_FILE = "cursors.json"
+
+    # Compacta ao abrir quando há mais que isto de entradas por chave no diário
+    COMPACT_RATIO = 2
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.cursors_path = os.path.join(directory, self.CURSORS_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        # Estado por chave (query|since|until): cursor, done e subjanelas
+        self.state: Dict[str, Dict] = {}
+        # Offsets (em bytes) das entradas com posts de cada chave, para load_posts(key)
+        self._offsets: Dict[str, List[int]] = {}
+        self.pages_restored = 0
+        self._truncated = False
+        self._replay()
+        # Compactar também descarta uma linha truncada, que corromperia a próxima página anexada
+        if self._truncated or self.pages_restored > self.COMPACT_RATIO * len(self.state):
+            self.compact()
+
+        self._journal = open(self.journal_path, 'ab')
+        self._journal_size = self._journal.seek(0, os.SEEK_END)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, since: str, until: str) -> str:
+        return f"{query}|{since}|{until}"
+
+    def _read_journal(self):
+        """Lê o diário (offset, entrada) ignorando uma eventual última linha truncada por queda"""
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield line_offset, json.loads(line)
+                except json.JSONDecodeError:
+                    self._truncated = True
+                    print("⚠️ Linha incompleta no diário de checkpoint ignorada")
+
+    def _apply(self, entry: Dict, offset: int):
+        key_state = self.state.setdefault(entry['key'], {})
+        key_state['cursor'] = entry.get('cursor')
+        key_state['done'] = entry.get('done', False)
+        if entry.get('subwindows'):
+            key_state['subwindows'] = entry['subwindows']
+        if entry.get('posts'):
+            self._offsets.setdefault(entry['key'], []).append(offset)
+
+    def _replay(self):
+        """Reconstrói o último estado de cada chave (e o índice de offsets) a partir do diário"""
+        for offset, entry in self._read_journal():
+            self.pages_restored += 1
+            self._apply(entry, offset)
+
+        if self.state:
+            done = sum(1 for s in self.state.values() if s.get('done'))
+            print(f"♻️ Checkpoint encontrado em {self.directory}: "
+                  f"{self.pages_restored} páginas, {done}/{len(self.state)} cadeias concluídas")
+
+    def compact(self):
+        """Regrava o diário com uma entrada por chave (estado final e posts sem repetição)"""
+        posts_by_key: Dict[str, List[Dict]] = {}
+        seen_uris = set()
+        for _, entry in self._read_journal():
+            key_posts = posts_by_key.setdefault(entry['key'], [])
+            for post in entry.get('posts', []):
+                uri = post.get('uri')
+                if uri in seen_uris:
+                    continue
+                seen_uris.add(uri)
+                key_posts.append(post)
+
+        tmp_path = self.journal_path + ".tmp"
+        self._offsets = {}
+        offset = 0
+        with open(tmp_path, 'wb') as f:
+            for key, key_posts in posts_by_key.items():
+                entry = {'key': key, **self.state[key], 'posts': key_posts}
+                line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+                f.write(line)
+                if key_posts:
+                    self._offsets[key] = [offset]
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _write_cursors(self):
+        """Grava o índice de cursores de forma atômica"""
+        tmp_path = self.cursors_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cursors_path)
+
+    def record_page(self, key: str, posts: List[Dict], cursor: Optional[str],
+                    done: bool = False, subwindows: Optional[List[Tuple[str, str]]] = None):
+        """Anexa uma página (com o cursor da chave) ao diário, com fsync"""
+        entry = {'key': key, 'cursor': cursor, 'done': done, 'posts': posts}
+        if subwindows:
+            entry['subwindows'] = [list(w) for w in subwindows]
+
+        line = (json.dumps(entry, ensure_ascii=False, default=json_default) + "\n").encode('utf-8')
+
+        # Workers do planejador gravam em paralelo
+        with self._lock:
+            self._journal.write(line)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+            self._apply(entry, self._journal_size)
+            self._journal_size += len(line)
+
+    def get_cursor(self, key: str) -> Tuple[Optional[str], bool]:
+        """Retorna (cursor, done) da última página registrada para a chave"""
+        key_state = self.state.get(key, {})
+        return key_state.get('cursor'), key_state.get('done', False)
+
+    def get_subwindows(self, key: str) -> List[Tuple[str, str]]:
+        """Subjanelas registradas quando a janela foi subdividida"""
+        return [tuple(w) for w in self.state.get(key, {}).get('subwindows', [])]
+
+    def _read_key_entries(self, key: str):
+        """Entradas da chave, lidas direto pelos offsets indexados"""
+        offsets = self._offsets.get(key)
+        if not offsets:
+            return
+        with open(self.journal_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def load_posts(self, key: Optional[str] = None) -> List[Post]:
+        """Posts já coletados (de uma chave ou de todas), sem URIs repetidas"""
+        if key is None:
+            entries = (entry for _, entry in self._read_journal())
+        else:
+            entries = self._read_key_entries(key)
+
+        posts = []
+        seen_uris = set()
+        for entry in entries:
+            for post in entry.get('posts', []):
+                uri = post.get('uri')
+                if uri in seen_uris:
+                    continue
+                seen_uris.add(uri)
+                posts.append(Post.from_mapping(post))
+        return posts
+
+    def close(self):
+        if not self._journal.closed:
+            self._journal.close()
+            self._write_cursors()
+
+    def clear(self):
+        """Remove o checkpoint após uma coleta concluída e salva"""
+        if not self._journal.closed:
+            self._journal.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.state = {}
+        self._offsets = {}
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except (AttributeError, ValueError):
+        return None
+
+
+class WatermarkStore:
+    """Marca d'água por query: data do post mais recente já coletado (modo incremental)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.watermarks: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.watermarks = json.load(f)
+
+    @staticmethod
+    def _format(value: datetime) -> str:
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+    @staticmethod
+    def sort_at(created_at: Optional[datetime], indexed_at: Optional[datetime],
+                now: datetime) -> Optional[datetime]:
+        """Data pela qual a busca filtra (≈ min(createdAt, indexedAt)), nunca no futuro
+
+        createdAt é definido pelo cliente e pode estar adiantado; indexedAt vem do servidor.
+        """
+        if created_at is None:
+            return None
+        return min(created_at, indexed_at or now, now)
+
+    def get(self, query: str) -> Optional[str]:
+        """Data de ordenação do post mais recente já visto para a query (None = nunca coletada)"""
+        current = self.watermarks.get(query, {})
+        if current.get('sort_at'):
+            return current['sort_at']
+        # Marcas antigas só tinham o maior created_at/indexed_at
+        value = self.sort_at(_parse_date(current.get('created_at', '')),
+                             _parse_date(current.get('indexed_at', '')), datetime.now(timezone.utc))
+        return self._format(value) if value else None
+
+    def advance(self, query: str, posts: Iterable[Dict]) -> Optional[str]:
+        """Avança a marca com os posts coletados (nunca recua); retorna a marca vigente"""
+        now = datetime.now(timezone.utc)
+        # Compara como datetime: formatos ISO diferentes não ordenam lexicalmente
+        newest = _parse_date(self.get(query) or '')
+
+        for post in posts:
+            value = self.sort_at(_parse_date(post.get('created_at', '')),
+                                 _parse_date(post.get('indexed_at', '')), now)
+            if value and (newest is None or value > newest):
+                newest = value
+
+        if newest is None:
+            return None
+
+        self.watermarks[query] = {
+            'sort_at': self._format(newest),
+            'updated_at': now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        }
+        return self.get(query)
+
+    def save(self):
+        """Grava as marcas de forma atômica"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.watermarks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
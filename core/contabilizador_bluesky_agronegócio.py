@@ -1,27 +1,54 @@
 import requests
 import json
 import time
-from datetime import datetime, timezone, timedelta
-from typing import Dict, Optional, Set
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import os
 from getpass import getpass
-import re
+import threading
+from crawl_planner import QueryYieldTracker, TimeWindowPlanner
+from rate_limiter import AdaptiveRateLimiter
+from request_executor import RequestExecutor
+from session_manager import BlueskySessionManager
+from response_cache import ResponseCache
+from dedup_index import DedupIndex
+from keyword_matcher import AGRO_BRAZIL_MATCHER, AGRO_SIGNAL_NAMES
+from fast_decode import decode_search_response
+from metrics import JsonSnapshotWriter, MetricsRegistry, MetricsServer
+from filter_workers import (FLAG_2025, FLAG_AGRO, FLAG_BRAZIL, FilterWorkerPool, classify_post,
+                            is_brazil_post, is_post_from_2025)
 
 class OptimizedBlueskyCounter2025:
-    def __init__(self):
-        self.base_url = "https://bsky.social"
+    def __init__(self, cache: Optional[ResponseCache] = None, base_url: str = "https://bsky.social",
+                 dedup_path: Optional[str] = None):
+        # Permite apontar para um PDS alternativo ou para o servidor simulado (mock_atproto_server.py)
+        self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
-        self.access_token = None
-        self.refresh_token = None
-        self.token_expires_at = None
         self.session.headers.update({
             'User-Agent': 'BlueskyAgroCounter2025/2.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
 
-        # Cache para evitar reprocessamento
-        self.processed_uris: Set[str] = set()
+        # Cache para evitar reprocessamento: hashes de 64 bits de (DID, rkey) em vez das URIs;
+        # com dedup_path o índice é gravado e recarregado entre execuções
+        self.processed_uris = DedupIndex(dedup_path, bloom_capacity=1_000_000 if dedup_path else None)
+        self._batch_lock = threading.Lock()
+        # Os workers do planejador contam requests em paralelo
+        self._requests_lock = threading.Lock()
+
+        # Ritmo compartilhado por todos os workers, ajustado pelos cabeçalhos da API
+        self.rate_limiter = AdaptiveRateLimiter(rate=1 / 1.5)
+
+        # Cache opcional de páginas já baixadas (query, janela, cursor)
+        self.response_cache = cache
+
+        # Rendimento de posts novos por query (preenchido pela coleta planejada)
+        self.query_tracker: Optional[QueryYieldTracker] = None
+
+        # Período de busca
+        self.start_date = "2025-01-01T00:00:00Z"
+        self.end_date = "2025-12-31T23:59:59Z"
 
         # Otimização: múltiplas queries para cobrir variações
         self.agro_queries = [
@@ -32,40 +59,90 @@ class OptimizedBlueskyCounter2025:
         # Contadores otimizados
         self.stats = {
             'total_requests': 0,
+            'posts_fetched': 0,
             'total_posts_processed': 0,
             'duplicate_posts_skipped': 0,
             'posts_2025_count': 0,
             'posts_agronegocio_count': 0,
             'posts_brazil_count': 0,
             'posts_final_count': 0,
-            'token_renewals': 0
+            'token_renewals': 0,
+            # Quantos posts dispararam cada sinal de agro/Brasil
+            'signal_counts': {}
         }
 
-    def create_session(self, identifier: str, password: str) -> bool:
-        """Cria sessão com gerenciamento aprimorado de tokens"""
-        endpoint = f"{self.base_url}/xrpc/com.atproto.server.createSession"
+        # Tokens renovados em segundo plano antes do exp do JWT
+        self.session_manager = BlueskySessionManager(self.base_url, self.session, stats=self.stats)
 
-        data = {
-            "identifier": identifier,
-            "password": password
-        }
+        # Retentativas por classe de erro; 401 renova o token e repete o request
+        self.executor = RequestExecutor(self.session, self.rate_limiter, self.stats,
+                                        on_auth_error=self.session_manager.handle_auth_error,
+                                        auth_provider=self.session_manager.auth_headers)
 
-        try:
-            response = self.session.post(endpoint, json=data)
-            response.raise_for_status()
-
-            session_data = response.json()
-            self.access_token = session_data.get('accessJwt')
-            self.refresh_token = session_data.get('refreshJwt')
+        # Métricas ao vivo (endpoint OpenMetrics ou snapshot JSON), lidas de self.stats
+        self.metrics = self._build_metrics()
 
-            # Estima expiração do token (5 minutos como segurança)
-            self.token_expires_at = datetime.now() + timedelta(minutes=5)
+    def _build_metrics(self) -> MetricsRegistry:
+        """Registra as métricas da contagem sobre self.stats e o índice de deduplicação"""
+        stats = self.stats
+        metrics = MetricsRegistry(prefix="bluesky_counter")
+
+        metrics.counter('requests', "Requests de busca enviados à API",
+                        lambda: stats['total_requests'], rate_name='requests_per_second')
+        metrics.counter('http_attempts', "Tentativas HTTP (inclui retentativas)",
+                        lambda: stats['http_attempts'])
+        metrics.counter('posts_fetched', "Posts recebidos da API (com duplicados)",
+                        lambda: stats['posts_fetched'], rate_name='posts_per_second')
+        metrics.counter('posts_unique', "Posts inéditos após a deduplicação",
+                        lambda: stats['total_posts_processed'], rate_name='unique_posts_per_second')
+        metrics.counter('posts_duplicate', "Posts descartados como duplicados",
+                        lambda: stats['duplicate_posts_skipped'])
+        for name, key, help_text in (('posts_2025', 'posts_2025_count', "Posts inéditos de 2025"),
+                                     ('posts_agro', 'posts_agronegocio_count', "Posts inéditos com termos de agro"),
+                                     ('posts_brazil', 'posts_brazil_count', "Posts inéditos do Brasil"),
+                                     ('posts_final', 'posts_final_count', "Posts agronegócio Brasil 2025")):
+            metrics.counter(name, help_text, lambda key=key: stats[key])
+            metrics.gauge(f'{name}_pass_ratio', f"Fração dos posts inéditos que passa no filtro {name}",
+                          lambda key=key: stats[key] / stats['total_posts_processed']
+                          if stats['total_posts_processed'] else 0.0)
+        metrics.gauge('dedup_ratio', "Fração dos posts recebidos que já tinham sido vistos",
+                      lambda: stats['duplicate_posts_skipped'] / stats['posts_fetched']
+                      if stats['posts_fetched'] else 0.0)
+        metrics.counter('token_renewals', "Renovações do token de acesso", lambda: stats['token_renewals'])
+        for error_class in ('rate_limit', 'auth', 'server', 'connection'):
+            metrics.counter(f'retries_{error_class}', f"Retentativas por erro {error_class}",
+                            lambda error_class=error_class: stats[f'retries_{error_class}'])
+        metrics.counter('failed_requests', "Requests que falharam após as retentativas",
+                        lambda: stats['failed_requests'])
+        metrics.gauge('dedup_index_entries', "URIs no índice de deduplicação", lambda: len(self.processed_uris))
+        metrics.gauge('target_request_rate', "Ritmo alvo do limitador (req/s)", lambda: self.rate_limiter.rate)
+
+        self.request_latency = metrics.histogram('request_latency_seconds',
+                                                 "Duração de cada busca (esperas e retentativas incluídas)")
+        self.page_latency = metrics.histogram('page_processing_seconds',
+                                              "Deduplicação, filtros e contagem de uma página",
+                                              buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+        return metrics
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.session_manager.access_token
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.session_manager.refresh_token
+
+    @property
+    def token_expires_at(self) -> Optional[datetime]:
+        expires_at = self.session_manager.expires_at
+        return datetime.fromtimestamp(expires_at) if expires_at else None
 
-            if self.access_token and self.refresh_token:
-                self.session.headers.update({
-                    'Authorization': f'Bearer {self.access_token}'
-                })
+    def create_session(self, identifier: str, password: str) -> bool:
+        """Cria sessão com gerenciamento aprimorado de tokens"""
+        try:
+            if self.session_manager.create_session(identifier, password) and self.refresh_token:
                 print("✅ Autenticação realizada com sucesso!")
+                print(f"⏰ Token válido até {self.token_expires_at:%H:%M:%S} (renovação automática)")
                 return True
             else:
                 print("❌ Erro: Tokens não encontrados")
@@ -77,61 +154,26 @@ class OptimizedBlueskyCounter2025:
 
     def refresh_session(self) -> bool:
         """Renova o token de acesso usando refresh token"""
-        if not self.refresh_token:
-            print("❌ Sem refresh token disponível")
-            return False
-
-        endpoint = f"{self.base_url}/xrpc/com.atproto.server.refreshSession"
-
-        # Temporariamente usa o refresh token
-        old_auth = self.session.headers.get('Authorization')
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.refresh_token}'
-        })
-
-        try:
-            response = self.session.post(endpoint)
-            response.raise_for_status()
-
-            session_data = response.json()
-            new_access_token = session_data.get('accessJwt')
-            new_refresh_token = session_data.get('refreshJwt')
-
-            if new_access_token:
-                self.access_token = new_access_token
-                self.refresh_token = new_refresh_token or self.refresh_token
-                self.token_expires_at = datetime.now() + timedelta(minutes=5)
-                self.stats['token_renewals'] += 1
-
-                self.session.headers.update({
-                    'Authorization': f'Bearer {self.access_token}'
-                })
-                print("🔄 Token renovado com sucesso!")
-                return True
-            else:
-                print("❌ Erro na renovação do token")
-                return False
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Erro na renovação: {e}")
-            # Restaura autorização anterior em caso de erro
-            if old_auth:
-                self.session.headers.update({'Authorization': old_auth})
-            return False
+        return self.session_manager.refresh()
 
     def ensure_valid_token(self) -> bool:
         """Garante que o token está válido"""
-        if not self.token_expires_at or datetime.now() >= self.token_expires_at:
+        if self.session_manager.needs_refresh():
             print("⏰ Token próximo do vencimento, renovando...")
-            return self.refresh_session()
-        return True
+        return self.session_manager.ensure_valid()
 
-    def search_posts_optimized(self, query: str, limit: int = 25, cursor: Optional[str] = None) -> Dict:
+    def search_posts_optimized(self, query: str, limit: int = 25, cursor: Optional[str] = None,
+                               since: Optional[str] = None, until: Optional[str] = None) -> Dict:
         """Busca otimizada com gerenciamento automático de tokens"""
-        if not self.ensure_valid_token():
-            print("❌ Falha na validação do token")
-            return {}
+        return self._search(query, limit, cursor, since, until, raw=False) or {}
+
+    def search_posts_raw(self, query: str, limit: int = 25, cursor: Optional[str] = None,
+                         since: Optional[str] = None, until: Optional[str] = None) -> bytes:
+        """Mesma busca, devolvendo o corpo JSON sem decodificar (para os workers de filtro)"""
+        return self._search(query, limit, cursor, since, until, raw=True) or b''
 
+    def _search(self, query: str, limit: int, cursor: Optional[str], since: Optional[str],
+                until: Optional[str], raw: bool):
         endpoint = f"{self.base_url}/xrpc/app.bsky.feed.searchPosts"
 
         # Otimização: query mais específica para reduzir ruído
@@ -140,197 +182,244 @@ class OptimizedBlueskyCounter2025:
         params = {
             'q': optimized_query,
             'limit': min(limit, 25),
-            'since': "2025-01-01T00:00:00Z",
-            'until': "2025-12-31T23:59:59Z"
+            'since': since or self.start_date,
+            'until': until or self.end_date
         }
 
         if cursor:
             params['cursor'] = cursor
 
+        if self.response_cache:
+            cached = self.response_cache.get_raw(endpoint, params)
+            if cached is not None:
+                return cached if raw else decode_search_response(cached)
+
+        if not self.ensure_valid_token():
+            print("❌ Falha na validação do token")
+            return None
+
         try:
-            self.stats['total_requests'] += 1
-            response = self.session.get(endpoint, params=params)
-
-            if response.status_code == 429:
-                # Otimização: backoff exponencial
-                wait_time = min(60 * (2 ** (self.stats['total_requests'] % 4)), 300)
-                print(f"⏳ Rate limit. Aguardando {wait_time}s (backoff exponencial)...")
-                time.sleep(wait_time)
-                return self.search_posts_optimized(query, limit, cursor)
-
-            if response.status_code == 401:
-                print("🔑 Token expirado, tentando renovar...")
-                if self.refresh_session():
-                    return self.search_posts_optimized(query, limit, cursor)
-                else:
-                    return {}
+            with self._requests_lock:
+                self.stats['total_requests'] += 1
+            with self.request_latency.time():
+                response = self.executor.execute('GET', endpoint, params=params)
+            if response is None:
+                return None
 
             response.raise_for_status()
-            return response.json()
+            body = response.content
+            if self.response_cache:
+                self.response_cache.put_raw(endpoint, params, body)
+            # Decodificação rápida (msgspec/orjson); no modo raw ela acontece nos workers
+            return body if raw else decode_search_response(body)
 
         except requests.exceptions.RequestException as e:
             print(f"❌ Erro na requisição: {e}")
-            return {}
-
-    def is_brazil_post_optimized(self, post: Dict) -> bool:
-        """Detecção otimizada de posts brasileiros"""
-        try:
-            if 'post' in post:
-                actual_post = post['post']
-            else:
-                actual_post = post
-
-            record = actual_post.get('record', {})
-            author = actual_post.get('author', {})
-            text = record.get('text', '').lower()
-
-            # 1. Verificação rápida: idioma português
-            langs = record.get('langs', [])
-            if any(lang.startswith('pt') for lang in langs):
-                return True
-
-            # 2. Handle brasileiro (.br)
-            handle = author.get('handle', '').lower()
-            if '.br' in handle or 'brasil' in handle:
-                return True
+            return None
+        except ValueError as e:
+            print(f"❌ Resposta inválida da API: {e}")
+            return None
 
-            # 3. Padrões brasileiros otimizados (regex para performance)
-            brazil_patterns = [
-                r'\br\$\d', r'\breai[s]?\b', r'\bcpf\b', r'\bcnpj\b',
-                r'\bbrasil\b', r'\bbrasileiro\b', r'\bbrasileira\b',
-                r'\bs[ãa]o paulo\b', r'\brio de janeiro\b', r'\bbras[íi]lia\b'
-            ]
-
-            for pattern in brazil_patterns:
-                if re.search(pattern, text):
-                    return True
-
-            # 4. Verificação de estados/regiões (só se necessário)
-            if any(state in text for state in ['minas gerais', 'rio grande', 'santa catarina']):
-                return True
-
-            return False
-
-        except Exception:
-            return False
+    def is_brazil_post_optimized(self, post: Dict, signals: Optional[Set[str]] = None) -> bool:
+        """Detecção otimizada de posts brasileiros (signals: resultado de AGRO_BRAZIL_MATCHER.scan)"""
+        # A mesma função roda nos workers de filtro (filter_workers.py)
+        return is_brazil_post(post.get('post', post), signals)
 
     def has_agro_keywords_optimized(self, text: str) -> bool:
         """Detecção otimizada de termos do agronegócio"""
         if not text:
             return False
 
-        text_lower = text.lower()
-
-        # Termos principais com regex para performance
-        agro_patterns = [
-            r'\bagroneg[óo]cio\b',
-            r'\bagricultura\b', r'\bpecuária\b', r'\bfazenda\b',
-            r'\b(soja|milho|algod[ãa]o|caf[ée]|cana)\b',
-            r'\b(bovino|su[íi]no|avicultura)\b',
-            r'\b(plantio|colheita|safra)\b'
-        ]
-
-        return any(re.search(pattern, text_lower) for pattern in agro_patterns)
+        # Matcher compilado uma vez por processo (keyword_matcher.py)
+        return AGRO_BRAZIL_MATCHER.matches(text, AGRO_SIGNAL_NAMES)
 
     def process_multiple_queries(self, delay: float = 1.5, max_requests_per_query: int = 1000) -> Dict:
         """Executa múltiplas queries para cobertura completa"""
         print(f"🔍 Executando {len(self.agro_queries)} queries otimizadas...")
 
+        # O delay define o ritmo inicial; depois vale o limite informado pelo servidor
+        if delay > 0:
+            self.rate_limiter.set_rate(1.0 / delay)
+
         start_time = datetime.now()
 
         for i, query in enumerate(self.agro_queries, 1):
             print(f"\n📡 Query {i}/{len(self.agro_queries)}: '{query}'")
 
-            cursor = None
-            requests_for_query = 0
+            # Pipeline preguiçoso: cada página atravessa busca → dedup → filtros → contagem
+            pages = self.fetch_pages(query, max_requests_per_query)
+            self.count_posts(self.filter_posts(self.dedup_posts(pages)))
 
-            while requests_for_query < max_requests_per_query:
-                result = self.search_posts_optimized(query, 25, cursor)
+        # Estatísticas finais
+        elapsed = datetime.now() - start_time
+        self.stats['elapsed_time'] = elapsed
 
-                if not result or 'posts' not in result:
-                    break
+        return self.stats
 
-                posts_raw = result.get('posts', [])
-                if not posts_raw:
-                    break
+    def process_multiple_queries_planned(self, delay: float = 1.5, max_workers: int = 4,
+                                         max_pages_per_window: int = 40,
+                                         min_query_yield: float = 0.02,
+                                         filter_workers: int = 0,
+                                         max_requests_per_query: Optional[int] = None) -> Dict:
+        """Executa as queries juntas em janelas de tempo adaptativas, em paralelo
+
+        Queries cujas páginas recentes trazem menos de `min_query_yield` de posts
+        inéditos são encerradas, evitando baixar de novo o que outra query já trouxe.
+        Com `filter_workers`, as páginas chegam cruas a um pool de processos que
+        decodifica e filtra; aqui ficam só a deduplicação e a contagem.
+        `max_requests_per_query` limita os requests de cada query somando todas as janelas.
+        """
+        pool = FilterWorkerPool(filter_workers) if filter_workers > 0 else None
+
+        def fetch_page(query, since, until, cursor):
+            if pool is None:
+                return self.search_posts_optimized(query, 25, cursor, since, until)
+            raw = self.search_posts_raw(query, 25, cursor, since, until)
+            return pool.filter(raw) if raw else {}
+
+        def process_page(window, posts_raw):
+            # A deduplicação usa processed_uris, compartilhado entre os workers
+            with self._batch_lock:
+                if pool is None:
+                    self.process_posts_batch(posts_raw)
+                else:
+                    self.merge_filtered_posts(posts_raw)
+            return []
 
-                # Processa lote
-                self.process_posts_batch(posts_raw)
+        if delay > 0:
+            self.rate_limiter.set_rate(1.0 / delay)
 
-                requests_for_query += 1
+        # Cada página ocupa a thread do planejador até o worker responder: com o pool,
+        # são precisas mais threads que processos para nenhum worker ficar parado
+        if pool:
+            max_workers = max(max_workers, pool.saturating_threads())
 
-                # Atualiza cursor
-                cursor = result.get('cursor')
-                if not cursor:
-                    break
+        self.query_tracker = QueryYieldTracker(min_yield=min_query_yield)
+        planner = TimeWindowPlanner(fetch_page, process_page, max_workers=max_workers,
+                                    max_pages_per_window=max_pages_per_window,
+                                    yield_tracker=self.query_tracker,
+                                    max_requests_per_query=max_requests_per_query)
 
-                # Rate limiting otimizado
-                time.sleep(delay)
+        print(f"🔍 Executando {len(self.agro_queries)} queries em janelas adaptativas "
+              f"com {max_workers} workers...")
 
-            print(f"   ✅ Concluída: {requests_for_query} requests")
+        if pool:
+            print(f"🧵 Filtros em {pool.workers} processos")
+
+        start_time = datetime.now()
+        try:
+            planner.run(self.agro_queries, self.start_date, self.end_date)
+        finally:
+            if pool:
+                pool.close()
+
+        print(f"   🗂️ Janelas rastreadas: {planner.stats['windows_crawled']} "
+              f"({planner.stats['windows_split']} subdivididas, "
+              f"{planner.stats['windows_skipped']} puladas por queries encerradas, "
+              f"{planner.stats['windows_over_budget']} fora do orçamento de requests)")
 
-        # Estatísticas finais
         elapsed = datetime.now() - start_time
         self.stats['elapsed_time'] = elapsed
 
         return self.stats
 
-    def process_posts_batch(self, posts_raw: list):
-        """Processa lote com deduplicação"""
-        for post_raw in posts_raw:
-            try:
-                # Extrai URI para deduplicação
-                if 'post' in post_raw:
-                    actual_post = post_raw['post']
-                else:
-                    actual_post = post_raw
-
-                post_uri = actual_post.get('uri', '')
+    def fetch_pages(self, query: str, max_requests: int = 1000,
+                    since: Optional[str] = None, until: Optional[str] = None) -> Iterator[List[Dict]]:
+        """Etapa de busca: percorre a cadeia de cursor da query, uma página por vez"""
+        cursor = None
+        requests_for_query = 0
 
-                # Pula se já processado
-                if post_uri in self.processed_uris:
-                    self.stats['duplicate_posts_skipped'] += 1
-                    continue
+        while requests_for_query < max_requests:
+            result = self.search_posts_optimized(query, 25, cursor, since, until)
+            if not result or 'posts' not in result:
+                break
 
-                self.processed_uris.add(post_uri)
-                self.stats['total_posts_processed'] += 1
+            posts_raw = result.get('posts', [])
+            if not posts_raw:
+                break
 
-                # Extrai dados básicos
-                record = actual_post.get('record', {})
-                created_at = record.get('createdAt', '')
-                text = record.get('text', '')
+            requests_for_query += 1
+            yield posts_raw
 
-                # Aplica filtros otimizados
-                is_2025 = self.is_post_from_2025(created_at)
-                has_agro = self.has_agro_keywords_optimized(text)
-                is_brazil = self.is_brazil_post_optimized(post_raw)
+            cursor = result.get('cursor')
+            if not cursor:
+                break
 
-                # Contabiliza
-                if is_2025:
-                    self.stats['posts_2025_count'] += 1
+        print(f"   ✅ Concluída: {requests_for_query} requests")
 
-                if has_agro:
-                    self.stats['posts_agronegocio_count'] += 1
+    def dedup_posts(self, pages: Iterable[List[Dict]]) -> Iterator[Dict]:
+        """Etapa de deduplicação: só passam posts cuja URI ainda não foi vista"""
+        for posts_raw in pages:
+            for post_raw in posts_raw:
+                actual_post = post_raw.get('post', post_raw)
+                self.stats['posts_fetched'] += 1
 
-                if is_brazil:
-                    self.stats['posts_brazil_count'] += 1
+                # Pula se já processado (add retorna False para URIs já vistas)
+                if not self.processed_uris.add(actual_post.get('uri', '')):
+                    self.stats['duplicate_posts_skipped'] += 1
+                    continue
 
-                if is_2025 and has_agro and is_brazil:
-                    self.stats['posts_final_count'] += 1
+                self.stats['total_posts_processed'] += 1
+                yield actual_post
 
+    def filter_posts(self, posts: Iterable[Dict]) -> Iterator[Tuple[Set[str], bool, bool, bool]]:
+        """Etapa de filtros: (sinais, is_2025, has_agro, is_brazil) de cada post"""
+        for actual_post in posts:
+            try:
+                # Uma única varredura do texto para agro e Brasil (filter_workers.classify_post)
+                signals, is_2025, has_agro, is_brazil = classify_post(actual_post)
             except Exception as e:
                 print(f"⚠️ Erro ao processar post: {e}")
                 continue
 
+            yield signals, is_2025, has_agro, is_brazil
+
+    def count_posts(self, results: Iterable[Tuple[Set[str], bool, bool, bool]]) -> int:
+        """Etapa de contagem: consome o pipeline e atualiza self.stats"""
+        stats = self.stats
+        signal_counts = stats['signal_counts']
+        counted = 0
+        for signals, is_2025, has_agro, is_brazil in results:
+            counted += 1
+            for signal in signals:
+                signal_counts[signal] = signal_counts.get(signal, 0) + 1
+
+            if is_2025:
+                stats['posts_2025_count'] += 1
+            if has_agro:
+                stats['posts_agronegocio_count'] += 1
+            if is_brazil:
+                stats['posts_brazil_count'] += 1
+            if is_2025 and has_agro and is_brazil:
+                stats['posts_final_count'] += 1
+        return counted
+
+    def dedup_filtered(self, summaries: Iterable[Dict]) -> Iterator[Tuple[Set[str], bool, bool, bool]]:
+        """Deduplicação dos resumos de filter_workers.filter_page (hash da URI já calculado)"""
+        for summary in summaries:
+            self.stats['posts_fetched'] += 1
+            if not self.processed_uris.add_hash(summary['uri_hash']):
+                self.stats['duplicate_posts_skipped'] += 1
+                continue
+
+            self.stats['total_posts_processed'] += 1
+            flags = summary['flags']
+            yield (set(summary['signals']), bool(flags & FLAG_2025),
+                   bool(flags & FLAG_AGRO), bool(flags & FLAG_BRAZIL))
+
+    def merge_filtered_posts(self, summaries: List[Dict]):
+        """Junta uma página já filtrada por um worker: só deduplicação e contagem"""
+        with self.page_latency.time():
+            self.count_posts(self.dedup_filtered(summaries))
+
+    def process_posts_batch(self, posts_raw: list):
+        """Processa lote com deduplicação (mesmo pipeline, para uma página já baixada)"""
+        with self.page_latency.time():
+            self.count_posts(self.filter_posts(self.dedup_posts([posts_raw])))
+
     def is_post_from_2025(self, post_date: str) -> bool:
         """Verifica se o post é de 2025"""
-        try:
-            if not post_date:
-                return False
-            post_datetime = datetime.fromisoformat(post_date.replace('Z', '+00:00'))
-            return post_datetime.year == 2025
-        except Exception:
-            return False
+        return is_post_from_2025(post_date)
 
     def print_optimized_report(self):
         """Relatório otimizado com métricas de performance"""
@@ -340,13 +429,34 @@ class OptimizedBlueskyCounter2025:
         print(f"🕐 Tempo total: {stats.get('elapsed_time', 'N/A')}")
         print(f"📡 Total de requests: {stats['total_requests']:,}")
         print(f"🔄 Renovações de token: {stats['token_renewals']}")
+        print(f"🔁 Retentativas: 429={stats['retries_rate_limit']} 401={stats['retries_auth']} "
+              f"5xx={stats['retries_server']} conexão={stats['retries_connection']} | "
+              f"Falhas definitivas: {stats['failed_requests']}")
         print(f"📊 Posts únicos processados: {stats['total_posts_processed']:,}")
         print(f"🔄 Posts duplicados ignorados: {stats['duplicate_posts_skipped']:,}")
+        print(f"🧮 Índice de deduplicação: {len(self.processed_uris):,} URIs "
+              f"em {self.processed_uris.memory_bytes() / 1024 / 1024:.1f} MB")
 
         if stats['total_requests'] > 0:
             efficiency = stats['total_posts_processed'] / stats['total_requests']
             print(f"⚡ Eficiência: {efficiency:.1f} posts únicos/request")
 
+        rate_metrics = self.rate_limiter.metrics()
+        print(f"⚡ Ritmo alcançado: {rate_metrics['achieved_rate']:.2f} req/s "
+              f"(alvo {rate_metrics['target_rate']:.2f} req/s)")
+        print(f"⏳ Esperas: {rate_metrics['throttled_waits']} ({rate_metrics['total_wait_time']:.0f}s) | "
+              f"Backoffs por 429: {rate_metrics['backoffs']}")
+        if self.response_cache:
+            self.response_cache.print_stats()
+
+        if self.query_tracker:
+            self.query_tracker.print_report()
+
+        if stats['signal_counts']:
+            top_signals = sorted(stats['signal_counts'].items(), key=lambda item: item[1], reverse=True)
+            print("🏷️ Sinais mais frequentes: " +
+                  ", ".join(f"{signal} ({count:,})" for signal, count in top_signals[:6]))
+
         print(f"\n🎯 === RESULTADO FINAL ===")
         print(f"✅ Posts agronegócio Brasil 2025: {stats['posts_final_count']:,}")
 
@@ -364,7 +474,9 @@ def main():
     print("   🎯 Múltiplas queries para maior cobertura")
     print("   ⚡ Deduplicação de posts")
     print("   📊 Detecção otimizada de Brasil/agronegócio")
-    print("   ⏱️ Backoff exponencial para rate limits")
+    print("   ⏱️ Ritmo adaptativo pelos cabeçalhos de rate limit")
+    print("   🗂️ Janelas de tempo adaptativas em paralelo")
+    print("   📈 Métricas ao vivo (BLUESKY_METRICS_PORT / BLUESKY_METRICS_FILE)")
     print("-" * 60)
 
     # Obtém credenciais
@@ -372,17 +484,54 @@ def main():
     email = os.getenv('BLUESKY_EMAIL') or input("📧 Email: ").strip()
     password = os.getenv('BLUESKY_PASSWORD') or getpass("🔑 Senha: ")
 
+    # Servidor alternativo opcional (BLUESKY_BASE_URL no .env), ex.: mock_atproto_server.py
+    base_url = os.getenv('BLUESKY_BASE_URL')
+    if base_url:
+        counter.base_url = counter.session_manager.base_url = base_url.rstrip('/')
+        print(f"🧪 Usando servidor: {counter.base_url}")
+
+    # Cache de respostas opcional (BLUESKY_RESPONSE_CACHE no .env)
+    cache_path = os.getenv('BLUESKY_RESPONSE_CACHE')
+    if cache_path:
+        counter.response_cache = ResponseCache(cache_path)
+        print(f"🗄️ Cache de respostas ativo: {cache_path}")
+
+    # Deduplicação persistente opcional (BLUESKY_DEDUP_INDEX no .env): só posts novos são contados
+    dedup_path = os.getenv('BLUESKY_DEDUP_INDEX')
+    if dedup_path:
+        counter.processed_uris = DedupIndex(dedup_path, bloom_capacity=1_000_000)
+        print(f"🧮 Índice de deduplicação: {dedup_path} ({len(counter.processed_uris):,} posts já vistos)")
+
     if not counter.create_session(email, password):
         print("❌ Falha na autenticação")
         return
 
+    # Acompanhamento ao vivo opcional: endpoint OpenMetrics/Prometheus (BLUESKY_METRICS_PORT)
+    # e/ou snapshot JSON regravado periodicamente (BLUESKY_METRICS_FILE)
+    metrics_server = None
+    metrics_port = os.getenv('BLUESKY_METRICS_PORT')
+    if metrics_port:
+        metrics_server = MetricsServer(counter.metrics, port=int(metrics_port)).start()
+        print(f"📈 Métricas ao vivo em {metrics_server.url} (JSON em /metrics.json)")
+
+    snapshot_writer = None
+    metrics_file = os.getenv('BLUESKY_METRICS_FILE')
+    if metrics_file:
+        snapshot_writer = JsonSnapshotWriter(counter.metrics, metrics_file).start()
+        print(f"📈 Snapshot de métricas a cada {snapshot_writer.interval:.0f}s em {metrics_file}")
+
+    # Filtros em processos separados (BLUESKY_FILTER_WORKERS no .env) para taxas de ingestão altas
+    filter_workers = int(os.getenv('BLUESKY_FILTER_WORKERS', '0'))
+
     try:
         print(f"\n🏁 Iniciando contagem otimizada...")
         time.sleep(2)
 
-        # Executa contagem com múltiplas queries
-        final_stats = counter.process_multiple_queries(
+        # Executa contagem com múltiplas queries, em janelas de tempo paralelas
+        final_stats = counter.process_multiple_queries_planned(
             delay=1.5,  # Menor delay devido às otimizações
+            max_workers=4,
+            filter_workers=filter_workers,
             max_requests_per_query=2000
         )
 
@@ -394,6 +543,13 @@ def main():
         counter.print_optimized_report()
     except Exception as e:
         print(f"❌ Erro: {e}")
+    finally:
+        counter.session_manager.stop()
+        counter.processed_uris.save()
+        if snapshot_writer:
+            snapshot_writer.stop()
+        if metrics_server:
+            metrics_server.stop()
 
 def load_env_file():
     """Carrega .env"""
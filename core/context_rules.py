@@ -0,0 +1,202 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD_CHAR = re.compile(r'\w')
+# Lado de um padrão 'A.*B': literal simples ou alternância (?:x|y|z), opcionalmente precedido de \b
+_LITERAL_RE = re.compile(r'[^\\()|.*+?\[\]{}^$]+')
+_ALTERNATION_RE = re.compile(r'\(\?:([^\\()|.*+?\[\]{}^$]+(?:\|[^\\()|.*+?\[\]{}^$]+)*)\)')
+
+# Rótulo decidido só pelas regras (None: caso ambíguo, depende do modelo)
+RULE_LABELS = {
+    'nao_relacionado': 'neutro',
+    'critica_explicita': 'negativo',
+    'apoio_explicito': 'positivo'
+}
+
+
+def _trie_pattern(literals: Iterable[str]) -> str:
+    """Alternância em forma de trie ('agr(?:onegócio|icultura)'): em cada posição do texto o
+    motor de regex segue um único ramo por caractere, e o casamento é sempre o literal mais longo"""
+    trie: Dict[str, dict] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # Ramo opcional guloso: tenta primeiro o literal mais longo
+            return f'(?:{body})?'
+        return body
+
+    return build(trie)
+
+
+def _parse_side(side: str) -> Optional[Tuple[List[str], bool]]:
+    """(alternativas, exige \\b antes) de um lado do padrão, ou None se não for suportado"""
+    boundary = side.startswith(r'\b')
+    if boundary:
+        side = side[2:]
+    match = _ALTERNATION_RE.fullmatch(side)
+    if match:
+        return match.group(1).split('|'), boundary
+    if _LITERAL_RE.fullmatch(side):
+        return [side], boundary
+    return None
+
+
+def _parse_pattern(pattern: str):
+    """Padrão 'A.*B' em (lado A, lado B); None para padrões em outro formato"""
+    parts = pattern.split('.*')
+    if len(parts) != 2:
+        return None
+    left, right = _parse_side(parts[0]), _parse_side(parts[1])
+    if left is None or right is None:
+        return None
+    return left, right
+
+
+class ContextRuleEngine:
+    """Regras de contexto do agronegócio avaliadas em uma única passada sobre o texto
+
+    Todos os termos (termos de entrada, palavras-chave e os dois lados de cada padrão
+    'A.*B') entram em uma só regex, e cada ocorrência atualiza o estado das regras.
+    'A.*B' casa quando um B começa depois do fim de algum A na mesma linha (o '.' não
+    casa '\\n'): o mesmo resultado de re.search, sem backtracking. Padrões em outro
+    formato continuam avaliados com re.search (compilados).
+    """
+
+    def __init__(self, gate_terms: Iterable[str], critique_patterns: Iterable[str],
+                 support_patterns: Iterable[str], positive_keywords: Iterable[str],
+                 negative_keywords: Iterable[str]):
+        self.positive_keywords = list(positive_keywords)
+        self.negative_keywords = list(negative_keywords)
+
+        # Papéis de cada literal: ('gate',), ('pos', i), ('neg', i), ('A'|'B', regra, exige \b)
+        self._roles: Dict[str, List[tuple]] = {}
+        for term in gate_terms:
+            self._add_role(term, ('gate',))
+        for i, keyword in enumerate(self.positive_keywords):
+            self._add_role(keyword, ('pos', i))
+        for i, keyword in enumerate(self.negative_keywords):
+            self._add_role(keyword, ('neg', i))
+
+        # Regras na ordem das listas: primeiro as de crítica, depois as de apoio
+        self._rule_kinds: List[str] = []
+        self._fallback: List[Tuple[int, re.Pattern]] = []
+        for kind, patterns in (('critica_explicita', critique_patterns), ('apoio_explicito', support_patterns)):
+            for pattern in patterns:
+                rule = len(self._rule_kinds)
+                self._rule_kinds.append(kind)
+                parsed = _parse_pattern(pattern)
+                if parsed is None:
+                    self._fallback.append((rule, re.compile(pattern)))
+                    continue
+                (left, left_boundary), (right, right_boundary) = parsed
+                for literal in left:
+                    self._add_role(literal, ('A', rule, left_boundary))
+                for literal in right:
+                    self._add_role(literal, ('B', rule, right_boundary))
+
+        # Em cada posição a regex devolve o literal mais longo; os que são prefixo dele
+        # (ex.: 'desenvolvimento' em 'desenvolvimento rural') também ocorreram ali
+        literals = list(self._roles)
+        self._actions = {literal: [self._compile_actions(other) for other in literals if literal.startswith(other)]
+                         for literal in literals}
+        self._scanner = re.compile(_trie_pattern(literals + ['\n']))
+        self._critique_rules = frozenset(rule for rule, kind in enumerate(self._rule_kinds)
+                                         if kind == 'critica_explicita')
+
+    def _add_role(self, literal: str, role: tuple):
+        self._roles.setdefault(literal.lower(), []).append(role)
+
+    def _compile_actions(self, literal: str) -> tuple:
+        """Papéis de um literal agrupados, para a varredura não percorrer a lista a cada ocorrência"""
+        roles = self._roles[literal]
+        starts_with_word = _WORD_CHAR.match(literal) is not None
+
+        def rules(kind, boundary):
+            return tuple(role[1] for role in roles if role[0] == kind and role[2] == boundary)
+
+        return (len(literal), starts_with_word, any(role[0] == 'gate' for role in roles),
+                tuple(role[1] for role in roles if role[0] == 'pos'),
+                tuple(role[1] for role in roles if role[0] == 'neg'),
+                rules('A', False), rules('A', True), rules('B', False), rules('B', True))
+
+    def detectar(self, texto: str) -> str:
+        """Contexto do texto (mesmos valores de detectar_contexto_agronegocio)"""
+        texto = texto.lower()
+        related = False
+        critique = False
+        positives = set()
+        negatives = set()
+        fired = set()
+        # Menor fim de um A de cada regra na linha atual
+        left_end: Dict[int, int] = {}
+
+        search = self._scanner.search
+        match = search(texto)
+        while match is not None:
+            start = match.start()
+            found = match.group()
+            # Recomeça no caractere seguinte (não no fim): ocorrências sobrepostas também contam
+            match = search(texto, start + 1)
+            if found == '\n':
+                left_end.clear()
+                continue
+
+            word_before = None
+            for (length, starts_with_word, gate, pos, neg,
+                 left_free, left_bounded, right_free, right_bounded) in self._actions[found]:
+                if gate:
+                    related = True
+                positives.update(pos)
+                negatives.update(neg)
+
+                lefts, rights = left_free, right_free
+                if left_bounded or right_bounded:
+                    # \b antes do literal: o caractere anterior tem "palavra-idade" diferente
+                    if word_before is None:
+                        word_before = bool(start) and _WORD_CHAR.match(texto, start - 1) is not None
+                    if word_before != starts_with_word:
+                        lefts, rights = lefts + left_bounded, rights + right_bounded
+
+                end = start + length
+                for rule in lefts:
+                    if end < left_end.get(rule, end + 1):
+                        left_end[rule] = end
+                for rule in rights:
+                    if left_end.get(rule, start + 1) <= start:
+                        fired.add(rule)
+                        critique = critique or rule in self._critique_rules
+
+            # Crítica explícita tem prioridade sobre todo o resto: não precisa ler o restante
+            if related and critique:
+                return 'critica_explicita'
+
+        if not related:
+            return 'nao_relacionado'
+
+        for rule, pattern in self._fallback:
+            if pattern.search(texto):
+                fired.add(rule)
+        for kind in ('critica_explicita', 'apoio_explicito'):
+            if any(self._rule_kinds[rule] == kind for rule in fired):
+                return kind
+
+        if len(negatives) > len(positives):
+            return 'contexto_negativo'
+        elif len(positives) > len(negatives):
+            return 'contexto_positivo'
+        return 'contexto_neutro'
+
+    def avaliar(self, texto: str) -> Tuple[str, Optional[str]]:
+        """(contexto, rótulo): rótulo None quando o caso é ambíguo e precisa do modelo"""
+        contexto = self.detectar(texto)
+        return contexto, RULE_LABELS.get(contexto)
@@ -0,0 +1,373 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from async_collector import parse_api_date, format_api_date
+from dedup_index import uri_hash
+
+# Granularidades em ordem crescente de refinamento
+GRANULARITIES = ['month', 'week', 'day', 'hour']
+
+
+def _next_boundary(dt: datetime, granularity: str) -> datetime:
+    """Retorna o início da próxima unidade de tempo após dt"""
+    if granularity == 'month':
+        if dt.month == 12:
+            return dt.replace(year=dt.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        return dt.replace(month=dt.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return dt + timedelta(weeks=1)
+    if granularity == 'day':
+        return dt + timedelta(days=1)
+    return dt + timedelta(hours=1)
+
+
+def split_window(since: str, until: str, granularity: str) -> List[Tuple[str, str]]:
+    """Divide [since, until) em janelas da granularidade indicada"""
+    start = parse_api_date(since)
+    end = parse_api_date(until)
+
+    windows = []
+    current = start
+    while current < end:
+        boundary = min(_next_boundary(current, granularity), end)
+        windows.append((format_api_date(current), format_api_date(boundary)))
+        current = boundary
+    return windows
+
+
+class CrawlWindow:
+    """Janela de tempo de uma query, rastreada de forma independente"""
+
+    def __init__(self, query: str, since: str, until: str, granularity: str):
+        self.query = query
+        self.since = since
+        self.until = until
+        self.granularity = granularity
+
+    @property
+    def key(self) -> str:
+        return f"{self.query}|{self.since}|{self.until}"
+
+    def finer_granularity(self) -> Optional[str]:
+        """Próxima granularidade mais fina, ou None se já estiver em horas"""
+        index = GRANULARITIES.index(self.granularity)
+        if index + 1 < len(GRANULARITIES):
+            return GRANULARITIES[index + 1]
+        return None
+
+    def __repr__(self):
+        return f"CrawlWindow({self.query!r}, {self.since} → {self.until}, {self.granularity})"
+
+
+class QueryYieldTracker:
+    """Rendimento de URIs novas por query numa coleta com várias queries
+
+    Guarda, por hash de URI, as queries que encontraram cada post. Uma query cujas
+    últimas páginas quase só trazem posts já vistos é encerrada.
+    """
+
+    def __init__(self, min_yield: float = 0.02, min_pages: int = 5, recent_pages: int = 10):
+        self.min_yield = min_yield
+        # Só avalia a query depois de min_pages páginas, olhando as recent_pages mais recentes
+        self.min_pages = min_pages
+        self.recent_pages = recent_pages
+
+        self.stopped: Set[str] = set()
+        self.stats: Dict[str, Dict] = {}
+        self._recent: Dict[str, Deque[Tuple[int, int]]] = {}
+        self._matches: Dict[int, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def _query_stats(self, query: str) -> Dict:
+        if query not in self.stats:
+            self.stats[query] = {'pages': 0, 'posts': 0, 'new': 0, 'overlap': {}}
+            self._recent[query] = deque(maxlen=self.recent_pages)
+        return self.stats[query]
+
+    def record_page(self, query: str, uris: Iterable[str]) -> int:
+        """Registra as URIs de uma página da query; retorna quantas eram inéditas"""
+        with self._lock:
+            stats = self._query_stats(query)
+            overlap = stats['overlap']
+            total = new = 0
+            for uri in uris:
+                total += 1
+                key = uri_hash(uri)
+                matched = self._matches.get(key)
+                if matched is None:
+                    self._matches[key] = (query,)
+                    new += 1
+                    continue
+                if query in matched:
+                    continue
+                # Crédito da sobreposição vai para a query que achou o post primeiro
+                overlap[matched[0]] = overlap.get(matched[0], 0) + 1
+                self._matches[key] = matched + (query,)
+
+            stats['pages'] += 1
+            stats['posts'] += total
+            stats['new'] += new
+            recent = self._recent[query]
+            recent.append((new, total))
+
+            if query not in self.stopped and stats['pages'] >= self.min_pages:
+                recent_total = sum(t for _, t in recent)
+                recent_new = sum(n for n, _ in recent)
+                if recent_total and recent_new / recent_total < self.min_yield:
+                    self.stopped.add(query)
+                    print(f"   ✂️ Query '{query}' encerrada: {recent_new}/{recent_total} posts novos "
+                          f"nas últimas {len(recent)} páginas")
+            return new
+
+    def is_stopped(self, query: str) -> bool:
+        return query in self.stopped
+
+    def matched_queries(self, uri: str) -> List[str]:
+        """Queries que encontraram o post, na ordem em que o encontraram"""
+        return list(self._matches.get(uri_hash(uri), ()))
+
+    def print_report(self):
+        print("🔎 Rendimento por query:")
+        for query, stats in self.stats.items():
+            posts = stats['posts']
+            share = stats['new'] / posts * 100 if posts else 0.0
+            overlap = ", ".join(f"{other}: {count:,}" for other, count in
+                                sorted(stats['overlap'].items(), key=lambda item: item[1], reverse=True))
+            status = " (encerrada)" if query in self.stopped else ""
+            print(f"   '{query}'{status}: {stats['pages']:,} páginas, {posts:,} posts, "
+                  f"{stats['new']:,} novos ({share:.1f}%)" + (f" | já vistos em {overlap}" if overlap else ""))
+
+
+class TimeWindowPlanner:
+    """Planeja e executa a coleta em janelas adaptativas (mês → semana → dia → hora)"""
+
+    def __init__(self, fetch_page: Callable[..., Dict],
+                 process_page: Callable[[CrawlWindow, List[Dict]], List[Dict]],
+                 max_workers: int = 4, max_pages_per_window: int = 40,
+                 delay: float = 0.0, checkpoint=None,
+                 yield_tracker: Optional[QueryYieldTracker] = None,
+                 max_requests_per_query: Optional[int] = None):
+        # fetch_page(query, since, until, cursor) -> resposta da API searchPosts
+        # process_page(window, posts_raw) -> posts a manter no resultado final
+        self.fetch_page = fetch_page
+        self.process_page = process_page
+        self.max_workers = max_workers
+        self.max_pages_per_window = max_pages_per_window
+        self.delay = delay
+        # CheckpointStore opcional: janelas concluídas são puladas e as parciais retomadas
+        self.checkpoint = checkpoint
+        # QueryYieldTracker opcional: várias queries num só rastreamento, cortando as redundantes
+        self.yield_tracker = yield_tracker
+        # Sinalizado em stop() ou num Ctrl-C: os workers encerram a janela na próxima página
+        self._stop = threading.Event()
+        # Orçamento opcional de requests por query, somado entre todas as janelas dela
+        self.max_requests_per_query = max_requests_per_query
+        self._query_requests: Dict[str, int] = {}
+        self._budget_lock = threading.Lock()
+
+        self.stats = {
+            'windows_planned': 0,
+            'windows_crawled': 0,
+            'windows_split': 0,
+            'pages_fetched': 0,
+            'windows_skipped': 0,
+            'windows_over_budget': 0
+        }
+
+    def plan(self, queries: List[str], since: str, until: str,
+             granularity: str = 'month') -> List[CrawlWindow]:
+        """Plano inicial: cada query dividida na granularidade mais grossa
+
+        As queries são intercaladas por janela, para avançarem juntas no tempo e a
+        sobreposição entre elas aparecer logo no início.
+        """
+        windows = [
+            CrawlWindow(query, window_since, window_until, granularity)
+            for window_since, window_until in split_window(since, until, granularity)
+            for query in queries
+        ]
+        self.stats['windows_planned'] += len(windows)
+        return windows
+
+    def stop(self):
+        """Pede aos workers que parem; as janelas em andamento ficam pendentes no checkpoint"""
+        self._stop.set()
+
+    def _take_request(self, query: str) -> bool:
+        """Reserva um request do orçamento da query; False se ele já acabou"""
+        if self.max_requests_per_query is None:
+            return True
+        with self._budget_lock:
+            used = self._query_requests.get(query, 0)
+            if used >= self.max_requests_per_query:
+                return False
+            self._query_requests[query] = used + 1
+            return True
+
+    def budget_exhausted(self, query: str) -> bool:
+        if self.max_requests_per_query is None:
+            return False
+        return self._query_requests.get(query, 0) >= self.max_requests_per_query
+
+    def _oldest_sort_at(self, posts_raw: List[Dict]) -> Optional[str]:
+        """Menor timestamp de ordenação (createdAt/indexedAt) visto na página"""
+        oldest = None
+        for post_raw in posts_raw:
+            actual_post = post_raw.get('post', post_raw)
+            for value in (actual_post.get('record', {}).get('createdAt'), actual_post.get('indexedAt')):
+                if value and (oldest is None or value < oldest):
+                    oldest = value
+        return oldest
+
+    def crawl_window(self, window: CrawlWindow) -> Tuple[List[Dict], List[CrawlWindow]]:
+        """Percorre a cadeia de cursor da janela; se ela for densa demais, subdivide o restante"""
+        posts = []
+        cursor = None
+        pages = 0
+        oldest_seen = None
+        finer = window.finer_granularity()
+
+        if self.checkpoint:
+            cursor, done = self.checkpoint.get_cursor(window.key)
+            if done:
+                # Os posts já vieram do diário em run(); só faltam as subjanelas pendentes
+                subwindows = [
+                    CrawlWindow(window.query, sub_since, sub_until, finer)
+                    for sub_since, sub_until in self.checkpoint.get_subwindows(window.key)
+                ]
+                return [], subwindows
+
+        while True:
+            # Janelas em horas não podem ser subdivididas: seguem até o fim da cadeia
+            if finer and pages >= self.max_pages_per_window:
+                break
+
+            # Coleta interrompida: a janela fica pendente no checkpoint
+            if self._stop.is_set():
+                return posts, []
+
+            # Query encerrada por baixo rendimento: a janela fica pendente no checkpoint
+            if self.yield_tracker and self.yield_tracker.is_stopped(window.query):
+                self.stats['windows_skipped'] += 1
+                return posts, []
+
+            # Orçamento da query esgotado: a janela fica pendente no checkpoint
+            if not self._take_request(window.query):
+                self.stats['windows_over_budget'] += 1
+                return posts, []
+
+            result = self.fetch_page(window.query, window.since, window.until, cursor)
+            pages += 1
+            self.stats['pages_fetched'] += 1
+
+            # Resposta vazia por erro: a janela fica pendente no checkpoint
+            if not result:
+                return posts, []
+
+            posts_raw = result.get('posts', [])
+            if not posts_raw:
+                cursor = None
+                if self.checkpoint:
+                    self.checkpoint.record_page(window.key, [], None, done=True)
+                break
+
+            if self.yield_tracker:
+                self.yield_tracker.record_page(
+                    window.query, (post_raw.get('post', post_raw).get('uri', '') for post_raw in posts_raw))
+
+            page_posts = self.process_page(window, posts_raw)
+            posts.extend(page_posts)
+
+            page_oldest = self._oldest_sort_at(posts_raw)
+            if page_oldest and (oldest_seen is None or page_oldest < oldest_seen):
+                oldest_seen = page_oldest
+
+            cursor = result.get('cursor')
+            if self.checkpoint:
+                self.checkpoint.record_page(window.key, page_posts, cursor, done=not cursor)
+            if not cursor:
+                break
+
+            if self.delay > 0 and self._stop.wait(self.delay):
+                return posts, []
+
+        self.stats['windows_crawled'] += 1
+
+        if not cursor or not oldest_seen:
+            return posts, []
+
+        # A parte mais recente já foi coberta; o restante [since, oldest_seen] é refinado.
+        # Um segundo de sobreposição garante cobertura — duplicatas saem no merge por URI.
+        remaining_until = format_api_date(parse_api_date(oldest_seen) + timedelta(seconds=1))
+        remaining_until = min(remaining_until, window.until)
+        if remaining_until <= window.since:
+            if self.checkpoint:
+                self.checkpoint.record_page(window.key, [], None, done=True)
+            return posts, []
+
+        self.stats['windows_split'] += 1
+        split = split_window(window.since, remaining_until, finer)
+        if self.checkpoint:
+            self.checkpoint.record_page(window.key, [], cursor, done=True, subwindows=split)
+        subwindows = [
+            CrawlWindow(window.query, sub_since, sub_until, finer)
+            for sub_since, sub_until in split
+        ]
+        self.stats['windows_planned'] += len(subwindows)
+        print(f"   🔀 Janela densa {window.since[:10]} → {window.until[:10]} ('{window.query}'): "
+              f"{len(subwindows)} subjanelas ({finer})")
+        return posts, subwindows
+
+    def run(self, queries: List[str], since: str, until: str) -> List[Dict]:
+        """Executa o plano num pool de workers e junta os resultados sem URIs repetidas"""
+        all_posts = []
+        seen_uris = set()
+
+        if self.checkpoint:
+            for post in self.checkpoint.load_posts():
+                seen_uris.add(post.get('uri'))
+                all_posts.append(post)
+
+        # Pool explícito: num Ctrl-C as janelas na fila são canceladas em vez de esperadas
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = {
+                pool.submit(self.crawl_window, window): window
+                for window in self.plan(queries, since, until)
+            }
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    window = pending.pop(future)
+                    try:
+                        posts, subwindows = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Erro na janela {window}: {e}")
+                        continue
+
+                    for post in posts:
+                        uri = post.get('uri')
+                        if uri in seen_uris:
+                            continue
+                        seen_uris.add(uri)
+                        all_posts.append(post)
+
+                    for subwindow in subwindows:
+                        if self.yield_tracker and self.yield_tracker.is_stopped(subwindow.query):
+                            self.stats['windows_skipped'] += 1
+                            continue
+                        if self.budget_exhausted(subwindow.query):
+                            self.stats['windows_over_budget'] += 1
+                            continue
+                        pending[pool.submit(self.crawl_window, subwindow)] = subwindow
+        except BaseException:
+            self.stop()
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return all_posts
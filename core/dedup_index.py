@@ -0,0 +1,242 @@
+import hashlib
+import math
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, Optional, Tuple
+
+INDEX_MAGIC = b'BSKYDDUP'
+BLOOM_MAGIC = b'BSKYBLOM'
+FORMAT_VERSION = 1
+
+# Slot vazio da tabela; hashes que dariam 0 são remapeados para 1
+EMPTY = 0
+
+
+def split_post_uri(uri: str) -> Tuple[str, str]:
+    """Separa (DID, rkey) de at://did/app.bsky.feed.post/rkey"""
+    if uri.startswith('at://'):
+        parts = uri[5:].split('/')
+        if len(parts) == 3:
+            return parts[0], parts[2]
+    return uri, ''
+
+
+def uri_hash(uri: str) -> int:
+    """Hash de 64 bits de (DID, rkey) — o identificador estável de um post"""
+    did, rkey = split_post_uri(uri)
+    digest = hashlib.blake2b(f"{did}\x00{rkey}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre os hashes de 64 bits (double hashing)"""
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[bytearray] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        # Itens para os quais (num_bits, num_hashes) é o dimensionamento ótimo
+        self.capacity = max(1, int(num_bits * math.log(2) / num_hashes))
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> 'BloomFilter':
+        """Dimensiona para `capacity` itens com a taxa de falso positivo desejada"""
+        capacity = max(capacity, 1)
+        num_bits = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key: int):
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: int):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(BLOOM_MAGIC + struct.pack('<BQI', FORMAT_VERSION, self.num_bits, self.num_hashes))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BloomFilter':
+        with open(path, 'rb') as f:
+            header = f.read(len(BLOOM_MAGIC) + struct.calcsize('<BQI'))
+            if not header.startswith(BLOOM_MAGIC):
+                raise ValueError(f"Arquivo de Bloom inválido: {path}")
+            _, num_bits, num_hashes = struct.unpack('<BQI', header[len(BLOOM_MAGIC):])
+            return cls(num_bits, num_hashes, bytearray(f.read()))
+
+
+class DedupIndex:
+    """Conjunto compacto de URIs já vistas: hashes de 64 bits em tabela de endereçamento aberto"""
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 1 << 16,
+                 bloom_capacity: Optional[int] = None, bloom_error_rate: float = 0.01):
+        # path opcional: o índice (e o Bloom, em path + '.bloom') persistem entre execuções
+        self.path = path
+        self.count = 0
+        self._table = array('Q', bytes(8 * self._table_size(capacity)))
+        self._mask = len(self._table) - 1
+
+        # O Bloom na frente responde "nunca visto" sem sondar a tabela; cresce junto com o índice
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom = BloomFilter.for_capacity(bloom_capacity, bloom_error_rate) if bloom_capacity else None
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def _table_size(capacity: int) -> int:
+        size = 8
+        while size * DedupIndex.MAX_LOAD < capacity:
+            size <<= 1
+        return size
+
+    def _probe(self, key: int) -> int:
+        """Posição do hash na tabela, ou do slot vazio onde ele entraria (sondagem linear)"""
+        table = self._table
+        mask = self._mask
+        i = key & mask
+        while True:
+            slot = table[i]
+            if slot == key or slot == EMPTY:
+                return i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old = self._table
+        self._table = array('Q', bytes(8 * len(old) * 2))
+        self._mask = len(self._table) - 1
+        for key in old:
+            if key != EMPTY:
+                self._table[self._probe(key)] = key
+
+    def _free_slot(self, key: int) -> int:
+        """Slot vazio onde entra um hash que sabidamente não está na tabela"""
+        table = self._table
+        mask = self._mask
+        i = key & mask
+        while table[i] != EMPTY:
+            i = (i + 1) & mask
+        return i
+
+    def _rebuild_bloom(self, capacity: int):
+        """Redimensiona o Bloom para `capacity` itens e o repovoa a partir da tabela"""
+        self.bloom = BloomFilter.for_capacity(capacity, self.bloom_error_rate)
+        for key in self._table:
+            if key != EMPTY:
+                self.bloom.add(key)
+
+    def contains_hash(self, key: int) -> bool:
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        return self._table[self._probe(key)] == key
+
+    def add_hash(self, key: int) -> bool:
+        """Insere o hash; retorna False se ele já estava no índice"""
+        bloom = self.bloom
+        if bloom is not None and key not in bloom:
+            # Ausência garantida pelo Bloom: vai direto ao slot vazio, sem comparar hashes
+            i = self._free_slot(key)
+        else:
+            i = self._probe(key)
+            if self._table[i] == key:
+                return False
+        self._table[i] = key
+        self.count += 1
+        if bloom is not None:
+            bloom.add(key)
+            if self.count > bloom.capacity:
+                # Acima da capacidade a taxa de falso positivo sobe: dobra o Bloom
+                self._rebuild_bloom(2 * self.count)
+        if self.count > len(self._table) * self.MAX_LOAD:
+            self._grow()
+        return True
+
+    def add(self, uri: str) -> bool:
+        """Registra a URI; retorna False se ela já tinha sido vista"""
+        return self.add_hash(uri_hash(uri))
+
+    def update(self, uris: Iterable[str]):
+        for uri in uris:
+            self.add(uri)
+
+    def __contains__(self, uri: str) -> bool:
+        return self.contains_hash(uri_hash(uri))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def memory_bytes(self) -> int:
+        """Memória ocupada pela tabela e pelo Bloom"""
+        size = self._table.itemsize * len(self._table)
+        if self.bloom is not None:
+            size += len(self.bloom.bits)
+        return size
+
+    def save(self, path: Optional[str] = None):
+        """Grava o índice de forma atômica (e o Bloom ao lado, se houver)"""
+        path = path or self.path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC + struct.pack('<BQQ', FORMAT_VERSION, self.count, len(self._table)))
+            self._write_table(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        if self.bloom is not None:
+            self.bloom.save(path + ".bloom")
+
+    def _write_table(self, f):
+        # Arquivo sempre little-endian, independente da máquina
+        if sys.byteorder == 'big':
+            table = array('Q', self._table)
+            table.byteswap()
+            table.tofile(f)
+        else:
+            self._table.tofile(f)
+
+    def load(self, path: str):
+        """Carrega um índice gravado por save()"""
+        with open(path, 'rb') as f:
+            header = f.read(len(INDEX_MAGIC) + struct.calcsize('<BQQ'))
+            if not header.startswith(INDEX_MAGIC):
+                raise ValueError(f"Índice de deduplicação inválido: {path}")
+            _, count, size = struct.unpack('<BQQ', header[len(INDEX_MAGIC):])
+            table = array('Q')
+            table.fromfile(f, size)
+            if sys.byteorder == 'big':
+                table.byteswap()
+
+        self._table = table
+        self._mask = size - 1
+        self.count = count
+
+        bloom_path = path + ".bloom"
+        if os.path.exists(bloom_path):
+            self.bloom = BloomFilter.load(bloom_path)
+            if self.count > self.bloom.capacity:
+                self._rebuild_bloom(2 * self.count)
+        elif self.bloom is not None:
+            # Bloom configurado mas não gravado: reconstrói a partir da tabela, com folga para crescer
+            self._rebuild_bloom(max(self.bloom.capacity, 2 * self.count))
@@ -0,0 +1,168 @@
+import argparse
+import json
+import sqlite3
+import time
+import tracemalloc
+import zlib
+from typing import Callable, Dict, List, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    msgspec = None
+    MSGSPEC_AVAILABLE = False
+
+
+def loads(raw: bytes):
+    """Decodifica JSON com orjson quando instalado (biblioteca padrão caso contrário)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+if MSGSPEC_AVAILABLE:
+    class _View(msgspec.Struct):
+        """Acesso no estilo dict (.get / in), para o código que já percorre as respostas"""
+
+        def get(self, key: str, default=None):
+            return getattr(self, key, default)
+
+        def __contains__(self, key: str) -> bool:
+            return key in self.__struct_fields__
+
+    # Só os campos usados pelos coletores; embed, facets, labels, viewer etc. são pulados
+    class PostRecord(_View):
+        text: Optional[str] = ''
+        createdAt: Optional[str] = ''
+        langs: Optional[List[str]] = []
+
+    class ProfileViewBasic(_View):
+        did: str = ''
+        handle: str = ''
+        displayName: Optional[str] = ''
+
+    class PostView(_View):
+        uri: str = ''
+        cid: str = ''
+        author: ProfileViewBasic = msgspec.field(default_factory=ProfileViewBasic)
+        record: PostRecord = msgspec.field(default_factory=PostRecord)
+        replyCount: Optional[int] = 0
+        repostCount: Optional[int] = 0
+        likeCount: Optional[int] = 0
+        indexedAt: str = ''
+
+    class SearchPostsResponse(msgspec.Struct):
+        # Sem default: resposta sem 'posts' cai na decodificação completa (e é tratada como erro)
+        posts: List[PostView]
+        cursor: Optional[str] = None
+
+    _SEARCH_DECODER = msgspec.json.Decoder(SearchPostsResponse)
+
+
+def decode_search_response(raw: bytes) -> Dict:
+    """Decodifica uma resposta de searchPosts
+
+    Com msgspec, os posts viram structs tipados (PostView) que respondem a .get como
+    os dicts originais, sem materializar os campos que não usamos. Sem msgspec, ou se
+    a resposta não seguir o esquema, a decodificação é completa (orjson ou json).
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            page = _SEARCH_DECODER.decode(raw)
+            return {'posts': page.posts, 'cursor': page.cursor}
+        except msgspec.ValidationError:
+            pass
+    return loads(raw)
+
+
+def decoder_name() -> str:
+    if MSGSPEC_AVAILABLE:
+        return "msgspec"
+    return "orjson" if ORJSON_AVAILABLE else "json"
+
+
+def _load_cached_bodies(path: str) -> List[bytes]:
+    """Corpos de searchPosts guardados pelo ResponseCache (respostas reais gravadas)"""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT body FROM responses WHERE endpoint LIKE '%app.bsky.feed.searchPosts'"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [zlib.decompress(body) for (body,) in rows]
+
+
+def _seed_bodies(seed_file: str, page_size: int = 100) -> List[bytes]:
+    """Páginas de searchPosts montadas com os posts coletados (mesmo formato do servidor simulado)"""
+    from mock_atproto_server import load_seed_posts
+
+    posts = load_seed_posts(seed_file)
+    bodies = []
+    for start in range(0, len(posts), page_size):
+        page = {'posts': posts[start:start + page_size], 'cursor': str(start + page_size)}
+        bodies.append(json.dumps(page, ensure_ascii=False).encode('utf-8'))
+    return bodies
+
+
+def _benchmark(name: str, decode: Callable[[bytes], Dict], bodies: List[bytes], repeat: int):
+    from post_batch import PostBatch
+
+    # Tempo: melhor de `repeat` rodadas, só decodificação e decodificação + extração em colunas
+    decode_time = extract_time = float('inf')
+    posts = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = [decode(body) for body in bodies]
+        decoded_at = time.perf_counter()
+        posts = sum(len(PostBatch.from_page(page.get('posts', []))) for page in pages)
+        finished_at = time.perf_counter()
+        decode_time = min(decode_time, decoded_at - start)
+        extract_time = min(extract_time, finished_at - start)
+        del pages
+
+    # Memória: pico para manter todas as páginas decodificadas ao mesmo tempo
+    tracemalloc.start()
+    pages = [decode(body) for body in bodies]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del pages
+
+    print(f"   {name:<8} decodificação {decode_time * 1e3:8.1f} ms | + extração {extract_time * 1e3:8.1f} ms "
+          f"| {extract_time / max(posts, 1) * 1e6:6.2f} µs/post | pico {peak / 1024 / 1024:6.1f} MiB")
+
+
+def main():
+    """Compara json, orjson e msgspec nas mesmas respostas de searchPosts"""
+    parser = argparse.ArgumentParser(description="Benchmark de decodificação das respostas de searchPosts")
+    parser.add_argument('--cache', default=None, help="SQLite do ResponseCache com respostas gravadas")
+    parser.add_argument('--seed-file', default="data/bluesky_agronegócio_2025.json",
+                        help="JSON com os posts coletados (usado sem --cache)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bodies = _load_cached_bodies(args.cache) if args.cache else _seed_bodies(args.seed_file)
+    if not bodies:
+        print("⚠️ Nenhuma resposta de searchPosts encontrada")
+        return
+    total_bytes = sum(len(body) for body in bodies)
+    print(f"🧪 {len(bodies)} páginas ({total_bytes / 1024 / 1024:.1f} MiB), melhor de {args.repeat} rodadas")
+
+    # json é o que requests faz em response.json()
+    _benchmark("json", json.loads, bodies, args.repeat)
+    if ORJSON_AVAILABLE:
+        _benchmark("orjson", orjson.loads, bodies, args.repeat)
+    if MSGSPEC_AVAILABLE:
+        _benchmark("msgspec", decode_search_response, bodies, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
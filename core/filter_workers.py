@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from dedup_index import uri_hash
+from fast_decode import decode_search_response
+from keyword_matcher import AGRO_BRAZIL_MATCHER, AGRO_SIGNAL_NAMES, BRAZIL_SIGNAL_NAMES
+
+# Resultado dos filtros de cada post, em bits
+FLAG_2025 = 1
+FLAG_AGRO = 2
+FLAG_BRAZIL = 4
+
+
+def is_post_from_2025(post_date: str) -> bool:
+    """Verifica se o post é de 2025"""
+    try:
+        if not post_date:
+            return False
+        post_datetime = datetime.fromisoformat(post_date.replace('Z', '+00:00'))
+        return post_datetime.year == 2025
+    except Exception:
+        return False
+
+
+def is_brazil_post(actual_post: Dict, signals: Optional[Set[str]] = None) -> bool:
+    """Detecção de posts brasileiros (signals: resultado de AGRO_BRAZIL_MATCHER.scan)"""
+    try:
+        record = actual_post.get('record', {})
+        author = actual_post.get('author', {})
+
+        # 1. Verificação rápida: idioma português
+        langs = record.get('langs', [])
+        if any(lang.startswith('pt') for lang in langs):
+            return True
+
+        # 2. Handle brasileiro (.br)
+        handle = author.get('handle', '').lower()
+        if '.br' in handle or 'brasil' in handle:
+            return True
+
+        # 3. Termos brasileiros (moeda, documentos, cidades, estados) em uma passada
+        if signals is None:
+            signals = AGRO_BRAZIL_MATCHER.scan(record.get('text', ''))
+        return not signals.isdisjoint(BRAZIL_SIGNAL_NAMES)
+
+    except Exception:
+        return False
+
+
+def classify_post(actual_post: Dict):
+    """(sinais, is_2025, has_agro, is_brazil) de um post — os filtros do contador"""
+    record = actual_post.get('record', {})
+
+    # Uma única varredura do texto para agro e Brasil
+    signals = AGRO_BRAZIL_MATCHER.scan(record.get('text', ''))
+    is_2025 = is_post_from_2025(record.get('createdAt', ''))
+    has_agro = not signals.isdisjoint(AGRO_SIGNAL_NAMES)
+    is_brazil = is_brazil_post(actual_post, signals)
+    return signals, is_2025, has_agro, is_brazil
+
+
+def filter_page(raw: bytes) -> Dict:
+    """Executado no worker: decodifica a página crua e aplica os filtros
+
+    Devolve uma resposta no formato de searchPosts (cursor + posts), mas cada post
+    é só um resumo: URI e seu hash, datas de ordenação (usadas pelo planejador),
+    bits dos filtros e sinais. O texto não volta para o processo principal.
+    """
+    data = decode_search_response(raw)
+    summaries = []
+    for post_raw in data.get('posts', []):
+        actual_post = post_raw.get('post', post_raw)
+        uri = actual_post.get('uri', '')
+        record = actual_post.get('record', {})
+        try:
+            signals, is_2025, has_agro, is_brazil = classify_post(actual_post)
+        except Exception:
+            signals, is_2025, has_agro, is_brazil = set(), False, False, False
+
+        summaries.append({
+            'uri': uri,
+            'uri_hash': uri_hash(uri),
+            'indexedAt': actual_post.get('indexedAt'),
+            'record': {'createdAt': record.get('createdAt')},
+            'flags': (FLAG_2025 if is_2025 else 0) | (FLAG_AGRO if has_agro else 0)
+                     | (FLAG_BRAZIL if is_brazil else 0),
+            'signals': tuple(signals)
+        })
+    return {'cursor': data.get('cursor'), 'posts': summaries}
+
+
+class FilterWorkerPool:
+    """Pool de processos que decodifica e filtra páginas cruas fora do GIL do coletor
+
+    Cada chamada de filter() ocupa um worker até a resposta; para manter o pool cheio,
+    quem chama precisa de mais threads que `workers` (ver saturating_threads).
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn: o pool sobe com as threads do planejador, do refresh e das métricas já rodando
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    def saturating_threads(self) -> int:
+        """Threads chamadoras que mantêm todos os workers ocupados enquanto outras esperam a rede"""
+        return 2 * self.workers
+
+    def filter(self, raw: bytes) -> Dict:
+        """Filtra uma página (bloqueia a thread que chamou até o worker responder)"""
+        return self._executor.submit(filter_page, raw).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,105 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+
+class Substring(str):
+    """Termo casado como substring simples do texto, sem limites de palavra"""
+
+
+# Um termo é uma palavra/frase literal (com limites de palavra), uma Substring, ou um par
+# (âncora, regex) para casos que não são literais
+Term = Union[str, Substring, Tuple[str, str]]
+
+TOKEN_RE = re.compile(r'\w+')
+
+AGRO_SIGNALS: Dict[str, List[Term]] = {
+    'agro:agronegocio': ['agronegócio', 'agronegocio'],
+    'agro:agricultura': ['agricultura'],
+    'agro:pecuaria': ['pecuária'],
+    'agro:fazenda': ['fazenda'],
+    'agro:culturas': ['soja', 'milho', 'algodão', 'algodao', 'café', 'cafe', 'cana'],
+    'agro:criacao': ['bovino', 'suíno', 'suino', 'avicultura'],
+    'agro:producao': ['plantio', 'colheita', 'safra']
+}
+
+BRAZIL_SIGNALS: Dict[str, List[Term]] = {
+    'brasil:moeda': [('r', r'\br\$\d'), 'reai', 'reais'],
+    'brasil:documentos': ['cpf', 'cnpj'],
+    'brasil:brasil': ['brasil', 'brasileiro', 'brasileira'],
+    'brasil:cidades': ['são paulo', 'sao paulo', 'rio de janeiro', 'brasília', 'brasilia'],
+    # Como no filtro original (`state in text`): também casa dentro de palavras
+    'brasil:estados': [Substring('minas gerais'), Substring('rio grande'), Substring('santa catarina')]
+}
+
+
+class KeywordMatcher:
+    """Casamento de vários termos em uma única passada sobre o texto"""
+
+    def __init__(self, signals: Dict[str, Iterable[Term]]):
+        self.signal_names = frozenset(signals)
+        # Palavra isolada -> sinais; resolvida com uma interseção de conjuntos
+        self._words: Dict[str, Set[str]] = {}
+        # Frases e padrões só são conferidos (regex) se a palavra âncora aparecer no texto
+        self._anchored: Dict[str, List[Tuple[re.Pattern, str]]] = {}
+        # Substrings não dependem de tokens: testadas com `in` sobre o texto inteiro
+        self._substrings: List[Tuple[str, str]] = []
+
+        for signal, terms in signals.items():
+            for term in terms:
+                if isinstance(term, Substring):
+                    self._substrings.append((term.lower(), signal))
+                    continue
+
+                if isinstance(term, tuple):
+                    anchor, pattern = term
+                    self._add_anchored(anchor, re.compile(pattern), signal)
+                    continue
+
+                literal = term.lower()
+                if TOKEN_RE.fullmatch(literal):
+                    self._words.setdefault(literal, set()).add(signal)
+                    continue
+
+                anchor = TOKEN_RE.match(literal).group()
+                pattern = r'\b' + re.escape(literal) + r'\b'
+                self._add_anchored(anchor, re.compile(pattern), signal)
+
+        self._word_set = frozenset(self._words)
+        self._anchor_set = frozenset(self._anchored)
+
+    def _add_anchored(self, anchor: str, pattern: re.Pattern, signal: str):
+        self._anchored.setdefault(anchor, []).append((pattern, signal))
+
+    def scan(self, text: str) -> Set[str]:
+        """Sinais que dispararam no texto"""
+        if not text:
+            return set()
+
+        text = text.lower()
+        tokens = set(TOKEN_RE.findall(text))
+
+        fired = set()
+        for word in self._word_set.intersection(tokens):
+            fired |= self._words[word]
+
+        for anchor in self._anchor_set.intersection(tokens):
+            for pattern, signal in self._anchored[anchor]:
+                if signal not in fired and pattern.search(text):
+                    fired.add(signal)
+
+        for substring, signal in self._substrings:
+            if signal not in fired and substring in text:
+                fired.add(signal)
+        return fired
+
+    def matches(self, text: str, signal_names: Optional[FrozenSet[str]] = None) -> bool:
+        """True se algum dos sinais informados (padrão: todos) disparou"""
+        fired = self.scan(text)
+        return bool(fired) if signal_names is None else not fired.isdisjoint(signal_names)
+
+
+AGRO_SIGNAL_NAMES = frozenset(AGRO_SIGNALS)
+BRAZIL_SIGNAL_NAMES = frozenset(BRAZIL_SIGNALS)
+
+# Construído uma vez por processo e compartilhado pelos coletores
+AGRO_BRAZIL_MATCHER = KeywordMatcher({**AGRO_SIGNALS, **BRAZIL_SIGNALS})
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Latência de requests à API: de 50 ms a 30 s (esperas do limitador incluídas)
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Histograma com faixas fixas (cumulativas na exposição, como no Prometheus)"""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': running}
+
+    def quantile(self, q: float, snapshot: Optional[Dict] = None) -> Optional[float]:
+        """Quantil aproximado: limite superior da faixa que contém o q-ésimo valor"""
+        snapshot = snapshot or self.snapshot()
+        if not snapshot['count']:
+            return None
+        target = q * snapshot['count']
+        for bound, count in snapshot['buckets']:
+            if count >= target:
+                return bound
+        return None
+
+
+class MetricsRegistry:
+    """Métricas de uma coleta longa, lidas na hora da exposição
+
+    Contadores e gauges são funções (normalmente lendo o dict de estatísticas do
+    coletor), então o código da coleta não precisa ser instrumentado duas vezes.
+    """
+
+    def __init__(self, prefix: str = "bluesky", rate_window: float = 60.0):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._counters: Dict[str, Tuple[str, Callable[[], float], Optional[str]]] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+        # Amostras (instante, contadores) para as taxas por segundo da janela recente
+        self.rate_window = rate_window
+        self._history: Deque[Tuple[float, Dict[str, float]]] = deque()
+        self._lock = threading.Lock()
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}_{name}"
+
+    def counter(self, name: str, help_text: str, fn: Callable[[], float], rate_name: Optional[str] = None):
+        """Contador monotônico; com rate_name também é exposta a taxa por segundo recente"""
+        self._counters[self._name(name)] = (help_text, fn, rate_name and self._name(rate_name))
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], float]):
+        self._gauges[self._name(name)] = (help_text, fn)
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        histogram = Histogram(self._name(name), help_text, buckets)
+        self.histograms[histogram.name] = histogram
+        return histogram
+
+    def _read(self, fn: Callable[[], float]) -> float:
+        try:
+            return fn() or 0
+        except Exception:
+            return 0
+
+    def _rates(self, counters: Dict[str, float]) -> Dict[str, float]:
+        """Taxa por segundo de cada contador com rate_name, na janela de rate_window segundos"""
+        now = time.monotonic()
+        with self._lock:
+            self._history.append((now, counters))
+            while len(self._history) > 2 and now - self._history[1][0] >= self.rate_window:
+                self._history.popleft()
+            oldest_time, oldest = self._history[0]
+
+        elapsed = now - oldest_time
+        if elapsed <= 0:
+            # Primeira leitura: média desde o início
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            oldest = {}
+
+        rates = {}
+        for name, (_, _, rate_name) in self._counters.items():
+            if rate_name:
+                rates[rate_name] = (counters[name] - oldest.get(name, 0)) / elapsed
+        return rates
+
+    def collect(self) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+        counters = {name: self._read(fn) for name, (_, fn, _) in self._counters.items()}
+        gauges = {name: self._read(fn) for name, (_, fn) in self._gauges.items()}
+        gauges[self._name('uptime_seconds')] = time.time() - self.started_at
+        return counters, gauges, self._rates(counters)
+
+    def render_openmetrics(self) -> str:
+        counters, gauges, rates = self.collect()
+        lines: List[str] = []
+
+        for name, (help_text, _, rate_name) in self._counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"{name}_total {_format_value(counters[name])}")
+            if rate_name:
+                lines.append(f"# TYPE {rate_name} gauge")
+                lines.append(f"# HELP {rate_name} Taxa por segundo de {name} nos últimos {self.rate_window:.0f}s")
+                lines.append(f"{rate_name} {_format_value(rates[rate_name])}")
+
+        for name, value in gauges.items():
+            help_text = self._gauges[name][0] if name in self._gauges else "Tempo desde o início da coleta"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"{name} {_format_value(value)}")
+
+        for name, histogram in self.histograms.items():
+            snapshot = histogram.snapshot()
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# HELP {name} {histogram.help}")
+            for bound, count in snapshot['buckets']:
+                le = "+Inf" if bound == float('inf') else _format_value(bound)
+                lines.append(f'{name}_bucket{{le="{le}"}} {count}')
+            lines.append(f"{name}_sum {_format_value(snapshot['sum'])}")
+            lines.append(f"{name}_count {snapshot['count']}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """Mesmas métricas em JSON (com p50/p95 aproximados dos histogramas)"""
+        counters, gauges, rates = self.collect()
+        histograms = {}
+        for name, histogram in self.histograms.items():
+            snapshot = histogram.snapshot()
+            histograms[name] = {
+                'count': snapshot['count'],
+                'sum': snapshot['sum'],
+                'p50': histogram.quantile(0.5, snapshot),
+                'p95': histogram.quantile(0.95, snapshot),
+                'buckets': {("+Inf" if bound == float('inf') else str(bound)): count
+                            for bound, count in snapshot['buckets']}
+            }
+        return {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            'counters': counters,
+            'rates': rates,
+            'gauges': gauges,
+            'histograms': histograms
+        }
+
+
+class MetricsServer:
+    """Endpoint HTTP local: /metrics (OpenMetrics/Prometheus) e /metrics.json"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics':
+                    body = registry.render_openmetrics().encode('utf-8')
+                    content_type = OPENMETRICS_CONTENT_TYPE
+                elif self.path.split('?')[0] == '/metrics.json':
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False, indent=2).encode('utf-8')
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes periódicos não poluem a saída da coleta
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> 'MetricsServer':
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class JsonSnapshotWriter:
+    """Grava o snapshot JSON em arquivo a cada `interval` segundos (escrita atômica)"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"⚠️ Erro ao gravar métricas em {self.path}: {e}")
+
+    def start(self) -> 'JsonSnapshotWriter':
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Para a thread e grava um último snapshot com os números finais"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+        self.write()
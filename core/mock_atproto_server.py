@@ -0,0 +1,417 @@
+import argparse
+import base64
+import json
+import random
+import re
+import secrets
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from async_collector import parse_api_date
+
+DEFAULT_SEED = "data/bluesky_agronegócio_2025.json"
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def make_jwt(claims: Dict) -> str:
+    """JWT falso (assinatura aleatória) com os claims informados"""
+    header = _b64url(json.dumps({'alg': 'ES256K', 'typ': 'JWT'}).encode('utf-8'))
+    payload = _b64url(json.dumps(claims).encode('utf-8'))
+    return f"{header}.{payload}.{_b64url(secrets.token_bytes(32))}"
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos, para a busca aceitar 'agronegocio' e 'agronegócio'"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def parse_search_query(q: str) -> Tuple[List[str], Optional[str]]:
+    """Separa termos/frases entre aspas do operador lang:xx"""
+    terms = []
+    lang = None
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', q or ''):
+        if word.startswith('lang:'):
+            lang = word[5:].lower() or None
+            continue
+        term = fold_text(phrase or word).strip()
+        if term:
+            terms.append(term)
+    return terms, lang
+
+
+def to_post_view(post: Dict) -> Dict:
+    """Converte um post achatado (formato do CSV/JSON coletado) em PostView da API"""
+    if 'record' in post:
+        return post
+
+    return {
+        'uri': post.get('uri', ''),
+        'cid': post.get('cid', ''),
+        'author': {
+            'did': post.get('author_did', ''),
+            'handle': post.get('author_handle', ''),
+            'displayName': post.get('author_display_name', '')
+        },
+        'record': {
+            '$type': 'app.bsky.feed.post',
+            'text': post.get('text', ''),
+            'createdAt': post.get('created_at', ''),
+            'langs': post.get('langs') or []
+        },
+        'replyCount': post.get('reply_count', 0),
+        'repostCount': post.get('repost_count', 0),
+        'likeCount': post.get('like_count', 0),
+        'quoteCount': 0,
+        'indexedAt': post.get('indexed_at', ''),
+        'labels': []
+    }
+
+
+def load_seed_posts(path: str = DEFAULT_SEED, multiply: int = 1) -> List[Dict]:
+    """Lê o JSON coletado e devolve PostViews; multiply > 1 clona os posts com URIs novas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        posts = [to_post_view(post) for post in json.load(f)]
+
+    if multiply <= 1:
+        return posts
+
+    clones = []
+    for i in range(multiply):
+        for post in posts:
+            if i == 0:
+                clones.append(post)
+                continue
+            clone = dict(post)
+            clone['uri'] = f"{post['uri']}x{i}"
+            clone['cid'] = f"{post['cid']}x{i}"
+            clones.append(clone)
+    return clones
+
+
+class MockAtprotoServer:
+    """Servidor local com createSession, refreshSession e searchPosts para testes de carga"""
+
+    def __init__(self, posts: List[Dict], host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 rate_limit: int = 3000, rate_window: float = 300.0,
+                 error_rate_429: float = 0.0, error_rate_5xx: float = 0.0,
+                 token_ttl: float = 7200.0, max_page_depth: int = 0,
+                 password: Optional[str] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        # Cota por janela fixa, como a do PDS (3000 requests a cada 5 minutos)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.token_ttl = token_ttl
+        # Profundidade máxima da cadeia de cursor (0 = sem limite), como a busca real
+        self.max_page_depth = max_page_depth
+        self.password = password
+        self.random = random.Random(seed)
+
+        # Índice ordenado do mais recente para o mais antigo (mesma ordem de sort=latest)
+        indexed = []
+        for post in posts:
+            try:
+                sort_at = parse_api_date(post['record']['createdAt']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            indexed.append((sort_at, fold_text(post['record'].get('text', '')),
+                            [lang.lower() for lang in post['record'].get('langs') or []], post))
+        indexed.sort(key=lambda item: item[0], reverse=True)
+        self.posts = indexed
+
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_count = 0
+        # refreshJwt válido -> (did, handle); cada refresh invalida o anterior
+        self._refresh_tokens: Dict[str, Tuple[str, str]] = {}
+        # Resultados filtrados por (termos, lang, since, until) para paginar sem refazer o filtro
+        self._results = OrderedDict()
+
+        self.stats = {'requests': 0, 'search_requests': 0, 'sessions': 0, 'refreshes': 0,
+                      'rate_limited': 0, 'injected_429': 0, 'injected_5xx': 0, 'expired_tokens': 0}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockAtprotoServer':
+        """Sobe o servidor em uma thread daemon"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _issue_tokens(self, did: str, handle: str) -> Dict:
+        now = int(time.time())
+        access = make_jwt({'scope': 'com.atproto.access', 'sub': did, 'iat': now,
+                           'exp': now + int(self.token_ttl)})
+        refresh = make_jwt({'scope': 'com.atproto.refresh', 'sub': did, 'iat': now,
+                            'exp': now + 90 * 24 * 3600, 'jti': secrets.token_hex(8)})
+        with self._lock:
+            self._refresh_tokens[refresh] = (did, handle)
+        return {'did': did, 'handle': handle, 'accessJwt': access, 'refreshJwt': refresh, 'active': True}
+
+    def _rate_limit_headers(self) -> Tuple[bool, Dict[str, str]]:
+        """Consome uma unidade da cota; retorna (permitido, cabeçalhos ratelimit-*)"""
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            remaining = self.rate_limit - self._window_count
+            reset_at = self._window_start + self.rate_window
+
+        headers = {
+            'ratelimit-limit': str(self.rate_limit),
+            'ratelimit-remaining': str(max(remaining, 0)),
+            'ratelimit-reset': str(int(reset_at)),
+            'ratelimit-policy': f"{self.rate_limit};w={int(self.rate_window)}"
+        }
+        if remaining < 0:
+            headers['Retry-After'] = str(max(int(reset_at - now), 1))
+            return False, headers
+        return True, headers
+
+    def _check_access_token(self, authorization: Optional[str]) -> Optional[str]:
+        """Valida o Bearer accessJwt; retorna o código de erro ou None"""
+        if not authorization or not authorization.startswith('Bearer '):
+            return 'AuthMissing'
+        try:
+            payload = authorization[7:].split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        except (IndexError, ValueError):
+            return 'InvalidToken'
+        if claims.get('scope') != 'com.atproto.access':
+            return 'InvalidToken'
+        if claims.get('exp', 0) <= time.time():
+            return 'ExpiredToken'
+        return None
+
+    def _search_results(self, q: str, since: Optional[str], until: Optional[str]) -> List[Dict]:
+        """Posts que casam com a query na janela [since, until), do mais recente ao mais antigo"""
+        key = (q, since, until)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        terms, lang = parse_search_query(q)
+        since_ts = parse_api_date(since).timestamp() if since else None
+        until_ts = parse_api_date(until).timestamp() if until else None
+
+        results = []
+        for sort_at, text, langs, post in self.posts:
+            if until_ts is not None and sort_at >= until_ts:
+                continue
+            if since_ts is not None and sort_at < since_ts:
+                break
+            if lang and lang not in langs:
+                continue
+            if all(term in text for term in terms):
+                results.append(post)
+
+        with self._lock:
+            self._results[key] = results
+            while len(self._results) > 256:
+                self._results.popitem(last=False)
+        return results
+
+    def search_posts(self, params: Dict[str, str]) -> Tuple[int, Dict]:
+        q = params.get('q', '')
+        if not q:
+            return 400, {'error': 'InvalidRequest', 'message': 'Error: Params must have the property "q"'}
+        try:
+            limit = min(max(int(params.get('limit', 25)), 1), 100)
+            offset = int(params.get('cursor') or 0)
+            results = self._search_results(q, params.get('since'), params.get('until'))
+        except ValueError as e:
+            return 400, {'error': 'InvalidRequest', 'message': str(e)}
+
+        page = results[offset:offset + limit]
+        data = {'hitsTotal': len(results), 'posts': page}
+
+        next_offset = offset + limit
+        depth_ok = not self.max_page_depth or next_offset < self.max_page_depth * limit
+        if next_offset < len(results) and depth_ok:
+            data['cursor'] = str(next_offset)
+        return 200, data
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_json(self) -> Dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length))
+                except ValueError:
+                    return {}
+
+            def _handle(self, method: str):
+                parsed = urlparse(self.path)
+                body = self._read_json() if method == 'POST' else {}
+
+                if parsed.path == '/_mock/stats':
+                    self._send(200, server.stats)
+                    return
+
+                server._count('requests')
+
+                delay = server.latency + server.random.uniform(0, server.latency_jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                allowed, headers = server._rate_limit_headers()
+                if not allowed:
+                    server._count('rate_limited')
+                    self._send(429, {'error': 'RateLimitExceeded', 'message': 'Rate Limit Exceeded'}, headers)
+                    return
+                if server.error_rate_429 and server.random.random() < server.error_rate_429:
+                    server._count('injected_429')
+                    self._send(429, {'error': 'RateLimitExceeded', 'message': 'Rate Limit Exceeded'},
+                               {**headers, 'Retry-After': '1'})
+                    return
+                if server.error_rate_5xx and server.random.random() < server.error_rate_5xx:
+                    server._count('injected_5xx')
+                    self._send(502, {'error': 'UpstreamFailure', 'message': 'Injected failure'}, headers)
+                    return
+
+                if method == 'POST' and parsed.path == '/xrpc/com.atproto.server.createSession':
+                    identifier = body.get('identifier', '')
+                    if not identifier or (server.password is not None and body.get('password') != server.password):
+                        self._send(401, {'error': 'AuthenticationRequired',
+                                         'message': 'Invalid identifier or password'}, headers)
+                        return
+                    server._count('sessions')
+                    handle = identifier if '@' not in identifier else identifier.split('@')[0] + '.mock.local'
+                    self._send(200, server._issue_tokens('did:plc:mock' + fold_text(handle)[:16], handle), headers)
+                    return
+
+                if method == 'POST' and parsed.path == '/xrpc/com.atproto.server.refreshSession':
+                    token = (self.headers.get('Authorization') or '')[7:]
+                    with server._lock:
+                        identity = server._refresh_tokens.pop(token, None)
+                    if identity is None:
+                        self._send(400, {'error': 'ExpiredToken', 'message': 'Token has been revoked'}, headers)
+                        return
+                    server._count('refreshes')
+                    self._send(200, server._issue_tokens(*identity), headers)
+                    return
+
+                if method == 'GET' and parsed.path == '/xrpc/app.bsky.feed.searchPosts':
+                    error = server._check_access_token(self.headers.get('Authorization'))
+                    if error:
+                        if error == 'ExpiredToken':
+                            server._count('expired_tokens')
+                        # 401 para que os coletores exercitem o caminho de renovação
+                        self._send(401, {'error': error, 'message': 'Token could not be verified'}, headers)
+                        return
+                    server._count('search_requests')
+                    params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                    status, data = server.search_posts(params)
+                    self._send(status, data, headers)
+                    return
+
+                self._send(404, {'error': 'MethodNotImplemented', 'message': 'Method Not Implemented'}, headers)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
+
+
+def main():
+    """Sobe o servidor simulado na linha de comando"""
+    parser = argparse.ArgumentParser(description="Servidor AT Protocol simulado para testes offline")
+    parser.add_argument('--seed-file', default=DEFAULT_SEED, help="JSON com os posts coletados")
+    parser.add_argument('--multiply', type=int, default=1, help="Clona os posts N vezes (testes de carga)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.0, help="Latência fixa por request (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Latência aleatória extra (s)")
+    parser.add_argument('--rate-limit', type=int, default=3000, help="Requests por janela")
+    parser.add_argument('--rate-window', type=float, default=300.0, help="Duração da janela (s)")
+    parser.add_argument('--error-429', type=float, default=0.0, help="Probabilidade de 429 injetado")
+    parser.add_argument('--error-5xx', type=float, default=0.0, help="Probabilidade de 502 injetado")
+    parser.add_argument('--token-ttl', type=float, default=7200.0, help="Validade do accessJwt (s)")
+    parser.add_argument('--max-depth', type=int, default=0, help="Páginas máximas por cadeia de cursor")
+    parser.add_argument('--password', default=None, help="Senha exigida (padrão: qualquer uma)")
+    parser.add_argument('--random-seed', type=int, default=None)
+    args = parser.parse_args()
+
+    posts = load_seed_posts(args.seed_file, args.multiply)
+    server = MockAtprotoServer(
+        posts, host=args.host, port=args.port,
+        latency=args.latency, latency_jitter=args.jitter,
+        rate_limit=args.rate_limit, rate_window=args.rate_window,
+        error_rate_429=args.error_429, error_rate_5xx=args.error_5xx,
+        token_ttl=args.token_ttl, max_page_depth=args.max_depth,
+        password=args.password, seed=args.random_seed
+    )
+
+    print(f"🧪 Servidor simulado em {server.url} com {len(server.posts)} posts")
+    print(f"   Use BLUESKY_BASE_URL={server.url} no .env para apontar os coletores")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Encerrando servidor simulado")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 from datetime import datetime
 import os
+from post_record import Post
+from post_store import is_parquet_path, load_posts
 
 class BlueskyPostFormatter:
     def __init__(self):
@@ -35,12 +37,18 @@ class BlueskyPostFormatter:
         return None
 
     def load_csv(self, input_file: str):
-        """Carrega o CSV original"""
+        """Carrega o CSV original (ou o Parquet gerado pelo coletor/analisador)"""
         try:
             # Tenta diferentes encodings
             encodings = ['utf-8', 'latin-1', 'cp1252', 'utf-8-sig']
             df = None
 
+            if is_parquet_path(input_file):
+                # Parquet é tipado e sempre UTF-8: sem tentativas de encoding
+                df = load_posts(input_file)
+                print("✅ Arquivo Parquet carregado")
+                encodings = []
+
             for encoding in encodings:
                 try:
                     df = pd.read_csv(input_file, encoding=encoding)
@@ -80,22 +88,22 @@ class BlueskyPostFormatter:
             # Processa cada linha
             self.posts = []
             for _, row in df.iterrows():
-                post = {
-                    'author_handle': str(row.get('author_handle', '')).strip(),
-                    'author_display_name': str(row.get('author_display_name', '')).strip(),
-                    'created_at': str(row.get('created_at', '')).strip(),
-                    'sentiment': str(row.get(self.sentiment_column, 'neutro')).strip().lower(),
-                    'like_count': self._safe_int(row.get('like_count', 0)),
-                    'repost_count': self._safe_int(row.get('repost_count', 0)),
-                    'reply_count': self._safe_int(row.get('reply_count', 0)),
-                    'text': str(row.get('text', '')).strip(),
-                    'web_link': str(row.get('web_link', '')).strip(),
-                    'uri': str(row.get('uri', '')).strip(),
+                post = Post(
+                    author_handle=str(row.get('author_handle', '')).strip(),
+                    author_display_name=str(row.get('author_display_name', '')).strip(),
+                    created_at=str(row.get('created_at', '')).strip(),
+                    sentiment=str(row.get(self.sentiment_column, 'neutro')).strip().lower(),
+                    like_count=self._safe_int(row.get('like_count', 0)),
+                    repost_count=self._safe_int(row.get('repost_count', 0)),
+                    reply_count=self._safe_int(row.get('reply_count', 0)),
+                    text=str(row.get('text', '')).strip(),
+                    web_link=str(row.get('web_link', '')).strip(),
+                    uri=str(row.get('uri', '')).strip(),
                     # Preserva colunas extras se existirem
-                    'contexto_agronegocio': str(row.get('contexto_agronegocio', '')).strip() if 'contexto_agronegocio' in df.columns else '',
-                    'cid': str(row.get('cid', '')).strip() if 'cid' in df.columns else '',
-                    'author_did': str(row.get('author_did', '')).strip() if 'author_did' in df.columns else ''
-                }
+                    contexto_agronegocio=str(row.get('contexto_agronegocio', '')).strip() if 'contexto_agronegocio' in df.columns else '',
+                    cid=str(row.get('cid', '')).strip() if 'cid' in df.columns else '',
+                    author_did=str(row.get('author_did', '')).strip() if 'author_did' in df.columns else ''
+                )
 
                 # Só adiciona se tiver dados válidos
                 if post['author_handle'] and post['text']:
@@ -410,7 +418,7 @@ def main():
     print("Transforma CSV confuso em formato organizado e legível\n")
 
     # Solicita arquivo
-    input_file = input("📁 Digite o nome do arquivo CSV: ").strip()
+    input_file = input("📁 Digite o nome do arquivo CSV ou Parquet: ").strip()
 
     if not input_file:
         print("❌ Nome do arquivo não fornecido")
@@ -0,0 +1,158 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from post_record import Post, parse_timestamp
+from post_sinks import POST_FIELDS
+
+KEY_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def iso_key(value: str) -> str:
+    """Chave 'AAAA-MM-DDTHH:MM:SS' em UTC, comparável como string
+
+    Datas em UTC ('Z' ou '+00:00', com ou sem fração) são só fatiadas; as demais
+    passam por parse_timestamp. Data inválida vira '' (fica antes de qualquer limite).
+    """
+    if not value:
+        return ''
+    if len(value) >= 20 and value[10] == 'T' and value[19] in '.Z+' and (
+            value.endswith('Z') or value.endswith('+00:00')):
+        return value[:19]
+    dt = parse_timestamp(value)
+    return dt.strftime(KEY_FORMAT) if dt else ''
+
+
+class PostBatch:
+    """Uma ou mais páginas de searchPosts em colunas (uma lista por campo de POST_FIELDS)
+
+    A extração percorre os posts crus uma única vez; filtros trabalham sobre as colunas
+    e só os posts que passam viram registros Post.
+    """
+
+    __slots__ = ('columns', 'created_keys')
+
+    def __init__(self, columns: Dict[str, list], created_keys: List[str]):
+        self.columns = columns
+        self.created_keys = created_keys
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[List[Dict]], year: str = '2025') -> 'PostBatch':
+        """Extrai os campos de extract_post_data (posts sem texto são descartados)"""
+        columns = {name: [] for name in POST_FIELDS}
+        created_keys = []
+        appends = [columns[name].append for name in POST_FIELDS]
+        (add_uri, add_cid, add_did, add_handle, add_display_name, add_text, add_created,
+         add_replies, add_reposts, add_likes, add_indexed, add_langs, add_is_year) = appends
+        add_key = created_keys.append
+
+        for posts_raw in pages:
+            for item in posts_raw:
+                post = item.get('post', item)
+                record = post.get('record') or {}
+                text = record.get('text', '')
+                if not text:
+                    continue
+                author = post.get('author') or {}
+                created_at = record.get('createdAt', '')
+
+                add_uri(post.get('uri', ''))
+                add_cid(post.get('cid', ''))
+                add_did(author.get('did', ''))
+                add_handle(author.get('handle', ''))
+                add_display_name(author.get('displayName', ''))
+                add_text(text)
+                add_created(created_at)
+                add_replies(post.get('replyCount', 0))
+                add_reposts(post.get('repostCount', 0))
+                add_likes(post.get('likeCount', 0))
+                add_indexed(post.get('indexedAt', ''))
+                add_langs(record.get('langs', []))
+                # Ano local da data, como em is_post_from_2025
+                add_is_year(created_at[:4] == year if isinstance(created_at, str) else False)
+                add_key(iso_key(created_at) if isinstance(created_at, str) else '')
+
+        return cls(columns, created_keys)
+
+    @classmethod
+    def from_page(cls, posts_raw: List[Dict], year: str = '2025') -> 'PostBatch':
+        return cls.from_pages([posts_raw], year)
+
+    def __len__(self) -> int:
+        return len(self.created_keys)
+
+    @property
+    def uris(self) -> List[str]:
+        return self.columns['uri']
+
+    def count_true(self, name: str) -> int:
+        return sum(1 for value in self.columns[name] if value)
+
+    def filter(self, keyword: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, exclude_uris: Optional[Set[str]] = None) -> 'PostBatch':
+        """Mantém os posts com a palavra-chave, criados em [since, until] e fora de exclude_uris
+
+        Os limites são comparados como strings na forma de iso_key, sem criar datetimes.
+        """
+        keyword = keyword.lower() if keyword else None
+        low = iso_key(since) if since else None
+        high = iso_key(until) if until else None
+
+        keep = []
+        texts = self.columns['text']
+        uris = self.columns['uri']
+        for i, key in enumerate(self.created_keys):
+            if low is not None and key < low:
+                continue
+            if high is not None and key > high:
+                continue
+            if exclude_uris and uris[i] in exclude_uris:
+                continue
+            if keyword is not None and keyword not in texts[i].lower():
+                continue
+            keep.append(i)
+
+        if len(keep) == len(self.created_keys):
+            return self
+        columns = {name: [values[i] for i in keep] for name, values in self.columns.items()}
+        return PostBatch(columns, [self.created_keys[i] for i in keep])
+
+    def rows(self) -> Iterator[Post]:
+        return map(Post.from_row, zip(*(self.columns[name] for name in POST_FIELDS)))
+
+    def to_posts(self) -> List[Post]:
+        return list(self.rows())
+
+
+class StageTimings:
+    """Tempo acumulado e itens processados por etapa da coleta (seguro entre threads)"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.items: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, items: int = 0):
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.items[stage] = self.items.get(stage, 0) + items
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def print_report(self):
+        if not self.seconds:
+            return
+        print("⏱️ Tempo por etapa:")
+        for stage, seconds in self.seconds.items():
+            items = self.items[stage]
+            per_item = f" | {seconds / items * 1e6:.1f} µs/post" if items else ""
+            print(f"   {stage}: {seconds:.3f}s em {self.calls[stage]} chamadas{per_item}")
@@ -0,0 +1,100 @@
+import re
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from post_sinks import POST_FIELDS
+
+# Campos acrescentados pela coleta com várias queries, pela análise de sentimento e pelo organizador
+ANNOTATION_FIELDS = ('matched_queries', 'sentiment', 'contexto_agronegocio', 'web_link')
+
+# Strings que se repetem muito entre posts (autor, idioma) são internadas
+_INTERNED_FIELDS = ('author_did', 'author_handle', 'author_display_name')
+
+_FRACTION_RE = re.compile(r'(\.\d{6})\d+')
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Converte datas ISO 8601 da API (com 'Z' e até 9 casas decimais) em datetime UTC"""
+    if isinstance(value, datetime):
+        return value
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        value = _FRACTION_RE.sub(r'\1', value.strip().replace('Z', '+00:00'))
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class Post(Mapping):
+    """Registro compacto de um post (slots em vez de dict), com a API de leitura de um dict
+
+    Campos com valor None ficam fora de keys()/iteração, então um Post gerado pelo coletor
+    serializa exatamente os 13 campos de POST_FIELDS.
+    """
+
+    __slots__ = tuple(POST_FIELDS) + ANNOTATION_FIELDS
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            value = fields.get(name)
+            if value is not None:
+                if name in _INTERNED_FIELDS and isinstance(value, str):
+                    value = sys.intern(value)
+                elif name == 'langs' and isinstance(value, list):
+                    value = [sys.intern(lang) for lang in value]
+            setattr(self, name, value)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> 'Post':
+        """Converte um dict (JSONL, checkpoint, CSV) em Post"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    @classmethod
+    def from_row(cls, values) -> 'Post':
+        """Caminho rápido para lotes: valores na ordem de POST_FIELDS, sem dict intermediário"""
+        post = cls.__new__(cls)
+        (post.uri, post.cid, did, handle, display_name, post.text, post.created_at,
+         post.reply_count, post.repost_count, post.like_count, post.indexed_at,
+         langs, post.is_2025) = values
+        post.author_did = sys.intern(did) if isinstance(did, str) else did
+        post.author_handle = sys.intern(handle) if isinstance(handle, str) else handle
+        post.author_display_name = sys.intern(display_name) if isinstance(display_name, str) else display_name
+        post.langs = [sys.intern(lang) for lang in langs] if isinstance(langs, list) else langs
+        post.matched_queries = post.sentiment = post.contexto_agronegocio = post.web_link = None
+        return post
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            value = getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self.__slots__ if getattr(self, name) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict comum, para json.dumps e afins"""
+        return {name: getattr(self, name) for name in self}
+
+    def __repr__(self) -> str:
+        return f"Post(uri={self.uri!r}, author_handle={self.author_handle!r})"
+
@@ -0,0 +1,164 @@
+import csv
+import gzip
+import io
+import json
+import os
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Esquema fixo dos posts coletados (mesma ordem de extract_post_data)
+POST_FIELDS = [
+    'uri', 'cid', 'author_did', 'author_handle', 'author_display_name',
+    'text', 'created_at', 'reply_count', 'repost_count', 'like_count',
+    'indexed_at', 'langs', 'is_2025'
+]
+
+
+def json_default(value):
+    """Serializa registros que não são dict (ex.: Post de post_record.py)"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Deduz a compressão pela extensão do arquivo"""
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def _open_text(path: str, mode: str, compression: Optional[str]):
+    """Abre arquivo texto com compressão opcional (cada append gera um novo frame)"""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ImportError("Para compressão zstd, instale: pip install zstandard")
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8', newline='' if path.endswith('.csv') else None)
+
+
+class JsonlSink:
+    """Grava posts em JSON Lines à medida que cada lote chega"""
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = path
+        self.compression = compression or detect_compression(path)
+        self.count = 0
+        self._file = _open_text(path, 'a', self.compression)
+
+    def write_batch(self, posts: List[Dict]):
+        for post in posts:
+            self._file.write(json.dumps(post, ensure_ascii=False, default=json_default) + "\n")
+        self.count += len(posts)
+        # Sem compressão o arquivo fica legível durante a coleta
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class CsvSink:
+    """Grava posts em CSV com esquema fixo, lote a lote"""
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None):
+        self.path = path
+        self.fieldnames = fieldnames or POST_FIELDS
+        self.count = 0
+
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames,
+                                      restval='', extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+
+    def write_batch(self, posts: List[Dict]):
+        self._writer.writerows(posts)
+        self.count += len(posts)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class PostStreamWriter:
+    """Distribui cada lote para vários sinks, descartando URIs já gravadas"""
+
+    def __init__(self, sinks: List, seen_uris: Optional[Iterable[str]] = None):
+        self.sinks = sinks
+        self.seen_uris = set(seen_uris or [])
+        self.count = 0
+
+    def write_batch(self, posts: List[Dict]):
+        new_posts = []
+        for post in posts:
+            uri = post.get('uri')
+            if uri in self.seen_uris:
+                continue
+            self.seen_uris.add(uri)
+            new_posts.append(post)
+
+        if not new_posts:
+            return
+
+        for sink in self.sinks:
+            sink.write_batch(new_posts)
+        self.count += len(new_posts)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_jsonl(path: str, compression: Optional[str] = None) -> Iterator[Dict]:
+    """Lê posts de um arquivo JSON Lines sem carregar tudo na memória"""
+    if not os.path.exists(path):
+        return
+
+    with _open_text(path, 'r', compression or detect_compression(path)) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Última linha pode estar incompleta se a coleta foi interrompida
+                continue
+
+
+def write_json_array(posts: Iterable[Dict], path: str) -> int:
+    """Grava um array JSON item a item (mesmo formato de json.dump com indent=2)"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for post in posts:
+            item = json.dumps(post, ensure_ascii=False, indent=2, default=json_default).replace("\n", "\n  ")
+            f.write(("," if count else "") + "\n  " + item)
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
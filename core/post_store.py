@@ -0,0 +1,244 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from post_record import parse_timestamp
+from post_sinks import POST_FIELDS, iter_jsonl
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+# Colunas de baixa cardinalidade: dicionário no Arrow (categoria no pandas)
+DICTIONARY_COLUMNS = ['author_handle', 'sentiment_agronegocio', 'contexto_agronegocio']
+TIMESTAMP_COLUMNS = ['created_at', 'indexed_at']
+COUNT_COLUMNS = ['reply_count', 'repost_count', 'like_count']
+
+def post_schema():
+    """Esquema tipado dos posts coletados (mesma ordem de POST_FIELDS)"""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Para o formato Parquet, instale: pip install pyarrow")
+
+    timestamp = pa.timestamp('ms', tz='UTC')
+    types = {
+        'uri': pa.string(),
+        'cid': pa.string(),
+        'author_did': pa.string(),
+        'author_handle': pa.dictionary(pa.int32(), pa.string()),
+        'author_display_name': pa.string(),
+        'text': pa.string(),
+        'created_at': timestamp,
+        'reply_count': pa.int32(),
+        'repost_count': pa.int32(),
+        'like_count': pa.int32(),
+        'indexed_at': timestamp,
+        # Poucos códigos distintos ('pt', 'en', ...): índices int16 num dicionário
+        'langs': pa.list_(pa.dictionary(pa.int16(), pa.string())),
+        'is_2025': pa.bool_()
+    }
+    return pa.schema([(name, types[name]) for name in POST_FIELDS])
+
+
+def _safe_int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def posts_to_table(posts: List[Dict]):
+    """Monta uma tabela Arrow tipada a partir dos dicts de extract_post_data"""
+    schema = post_schema()
+    columns = {name: [] for name in POST_FIELDS}
+    for post in posts:
+        for name in POST_FIELDS:
+            value = post.get(name)
+            if name in TIMESTAMP_COLUMNS:
+                value = parse_timestamp(value)
+            elif name in COUNT_COLUMNS:
+                value = _safe_int(value)
+            elif name == 'langs' and isinstance(value, str):
+                # CSV grava a lista como texto: "['pt']"
+                value = re.findall(r"[\w-]+", value)
+            columns[name].append(value)
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+class ParquetSink:
+    """Grava posts em Parquet com o mesmo contrato dos sinks de post_sinks.py"""
+
+    def __init__(self, path: str, row_group_size: int = 50_000, compression: str = 'zstd'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Para o formato Parquet, instale: pip install pyarrow")
+        self.path = path
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.count = 0
+        # Lotes pequenos (25 posts/página) são acumulados em row groups maiores;
+        # o que estiver no buffer é gravado no close()
+        self._buffer: List[Dict] = []
+        self._writer = None
+
+    def write_batch(self, posts: List[Dict]):
+        self._buffer.extend(posts)
+        self.count += len(posts)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        table = posts_to_table(self._buffer)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def write_parquet(posts: Iterable[Dict], path: str, row_group_size: int = 50_000) -> int:
+    """Grava posts (lista ou iterador, ex.: iter_jsonl) em um arquivo Parquet"""
+    if os.path.exists(path):
+        os.remove(path)
+    sink = ParquetSink(path, row_group_size=row_group_size)
+    batch = []
+    for post in posts:
+        batch.append(post)
+        if len(batch) >= 1000:
+            sink.write_batch(batch)
+            batch = []
+    sink.write_batch(batch)
+    sink.close()
+    return sink.count
+
+
+def _dataframe_table(df):
+    """DataFrame -> tabela Arrow, com as colunas de baixa cardinalidade em dicionário"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in DICTIONARY_COLUMNS:
+        index = table.schema.get_field_index(name)
+        if index >= 0 and not pa.types.is_dictionary(table.schema.field(index).type):
+            table = table.set_column(index, name, table.column(name).dictionary_encode())
+    return table
+
+
+def write_dataframe(df, path: str, compression: str = 'zstd'):
+    """Grava um DataFrame (ex.: com a coluna de sentimento) em Parquet tipado"""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Para o formato Parquet, instale: pip install pyarrow")
+    pq.write_table(_dataframe_table(df), path, compression=compression)
+
+
+class DataFrameParquetWriter:
+    """Grava DataFrames em sequência no mesmo arquivo Parquet (um row group por bloco)"""
+
+    def __init__(self, path: str, compression: str = 'zstd'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Para o formato Parquet, instale: pip install pyarrow")
+        self.path = path
+        self.compression = compression
+        self.count = 0
+        self._schema = None
+        self._writer = None
+
+    def write(self, df):
+        table = _dataframe_table(df)
+        if self._writer is None:
+            # Coluna toda vazia no primeiro bloco vira texto, para os blocos seguintes caberem no esquema
+            self._schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+        self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+        self.count += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def is_parquet_path(path: str) -> bool:
+    return path.endswith('.parquet') or (os.path.isdir(path) and any(
+        name.endswith('.parquet') for name in os.listdir(path)))
+
+
+def load_posts(path: str, columns: Optional[List[str]] = None):
+    """Carrega posts como DataFrame de Parquet, CSV, JSONL ou XLSX, lendo só as colunas pedidas"""
+    import pandas as pd
+
+    if is_parquet_path(path):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Para ler Parquet, instale: pip install pyarrow")
+        schema = pq.read_schema(path) if os.path.isfile(path) else None
+        if columns and schema is not None:
+            columns = [name for name in columns if name in schema.names]
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    if path.endswith(('.jsonl', '.jsonl.gz', '.jsonl.zst')):
+        df = pd.DataFrame(iter_jsonl(path))
+        return df[[name for name in columns if name in df.columns]] if columns else df
+
+    if path.endswith(('.xlsx', '.xls', '.ods')):
+        usecols = (lambda name: name in columns) if columns else None
+        return pd.read_excel(path, usecols=usecols)
+
+    usecols = (lambda name: name in columns) if columns else None
+    return pd.read_csv(path, usecols=usecols)
+
+
+def iter_post_chunks(path: str, chunk_size: int = 10_000, columns: Optional[List[str]] = None) -> Iterator:
+    """Mesmos formatos de load_posts, em DataFrames de até chunk_size linhas, sem ler o arquivo todo"""
+    import pandas as pd
+
+    if is_parquet_path(path):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Para ler Parquet, instale: pip install pyarrow")
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format='parquet')
+        if columns:
+            columns = [name for name in columns if name in dataset.schema.names]
+        for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+
+    if path.endswith(('.jsonl', '.jsonl.gz', '.jsonl.zst')):
+        rows = []
+        for row in iter_jsonl(path):
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                df = pd.DataFrame(rows)
+                yield df[[name for name in columns if name in df.columns]] if columns else df
+                rows = []
+        if rows:
+            df = pd.DataFrame(rows)
+            yield df[[name for name in columns if name in df.columns]] if columns else df
+        return
+
+    if path.endswith(('.xlsx', '.xls', '.ods')):
+        # Planilhas não são lidas em partes; o arquivo inteiro é fatiado
+        df = load_posts(path, columns)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    usecols = (lambda name: name in columns) if columns else None
+    yield from pd.read_csv(path, usecols=usecols, chunksize=chunk_size)
+
+
+def parquet_sibling(path: str) -> str:
+    """Caminho .parquet equivalente a um CSV/XLSX (ex.: para preferir o formato colunar)"""
+    return os.path.splitext(path)[0] + '.parquet'
@@ -0,0 +1,387 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from post_record import parse_timestamp
+from post_sinks import iter_jsonl
+
+DEFAULT_WAREHOUSE = "data/warehouse/posts.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    uri TEXT PRIMARY KEY,
+    cid TEXT,
+    author_did TEXT,
+    author_handle TEXT,
+    author_display_name TEXT,
+    text TEXT,
+    created_at TEXT,
+    indexed_at TEXT,
+    reply_count INTEGER DEFAULT 0,
+    repost_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    langs TEXT,
+    is_2025 INTEGER,
+    sentiment TEXT,
+    contexto TEXT,
+    matched_queries TEXT,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at);
+CREATE INDEX IF NOT EXISTS idx_posts_author_did ON posts(author_did);
+CREATE INDEX IF NOT EXISTS idx_posts_sentiment ON posts(sentiment);
+"""
+
+# Colunas criadas depois da primeira versão da base: acrescentadas com ALTER TABLE
+ADDED_COLUMNS = {'matched_queries': 'TEXT'}
+
+# União das listas JSON de queries (a gravada e a nova), sem repetição
+MERGE_QUERIES_SQL = """CASE
+    WHEN posts.matched_queries IS NULL THEN {new}
+    WHEN {new} IS NULL THEN posts.matched_queries
+    ELSE (SELECT json_group_array(value) FROM (
+        SELECT value FROM json_each(posts.matched_queries) UNION SELECT value FROM json_each({new})))
+END"""
+
+# Índice de texto externo (conteúdo em posts), mantido por triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    text, content='posts', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF text ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    INSERT INTO posts_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+# Re-coleta atualiza engajamento e conteúdo; sentimento só muda via update_sentiment
+UPSERT_SQL = """
+INSERT INTO posts (uri, cid, author_did, author_handle, author_display_name, text, created_at,
+                   indexed_at, reply_count, repost_count, like_count, langs, is_2025,
+                   matched_queries, first_seen_at, last_seen_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(uri) DO UPDATE SET
+    cid = excluded.cid,
+    author_handle = excluded.author_handle,
+    author_display_name = excluded.author_display_name,
+    text = excluded.text,
+    indexed_at = excluded.indexed_at,
+    reply_count = excluded.reply_count,
+    repost_count = excluded.repost_count,
+    like_count = excluded.like_count,
+    matched_queries = """ + MERGE_QUERIES_SQL.format(new='excluded.matched_queries') + """,
+    last_seen_at = excluded.last_seen_at
+"""
+
+
+def normalize_timestamp(value) -> Optional[str]:
+    """ISO 8601 UTC com milissegundos: a ordem lexical vira ordem cronológica"""
+    dt = parse_timestamp(value)
+    if dt is None:
+        return None
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _to_int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _langs_json(value) -> str:
+    if isinstance(value, str):
+        # CSV grava a lista como texto: "['pt']"
+        value = [lang.strip(" '\"") for lang in value.strip('[]').split(',') if lang.strip(" '\"")]
+    return json.dumps(list(value or []))
+
+
+def _queries_json(value) -> Optional[str]:
+    """Lista de queries como JSON, ou None (não apaga as queries já gravadas)"""
+    if isinstance(value, str):
+        value = json.loads(_langs_json(value))
+    return json.dumps(list(value), ensure_ascii=False) if value else None
+
+
+class PostWarehouse:
+    """Base SQLite de todos os posts coletados: upsert por URI, índices e busca FTS5"""
+
+    def __init__(self, path: str = DEFAULT_WAREHOUSE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts_available = True
+        except sqlite3.OperationalError:
+            # SQLite compilado sem FTS5: busca cai para LIKE
+            self.fts_available = False
+        self._conn.commit()
+
+        self.count = 0
+        self.stats = {'inserted': 0, 'updated': 0}
+        # Com scope_to(), as consultas agregadas só consideram as URIs da tabela temporária scope
+        self._scoped = False
+
+    def _add_missing_columns(self):
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(posts)")}
+        for name, column_type in ADDED_COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE posts ADD COLUMN {name} {column_type}")
+
+    def _row(self, post: Dict, now: float) -> Tuple:
+        is_2025 = post.get('is_2025')
+        if isinstance(is_2025, str):
+            is_2025 = is_2025.strip().lower() == 'true'
+        return (
+            post.get('uri', ''),
+            post.get('cid', ''),
+            post.get('author_did', ''),
+            post.get('author_handle', ''),
+            post.get('author_display_name', ''),
+            post.get('text', ''),
+            normalize_timestamp(post.get('created_at')),
+            normalize_timestamp(post.get('indexed_at')),
+            _to_int(post.get('reply_count')),
+            _to_int(post.get('repost_count')),
+            _to_int(post.get('like_count')),
+            _langs_json(post.get('langs')),
+            None if is_2025 is None else int(bool(is_2025)),
+            _queries_json(post.get('matched_queries')),
+            now,
+            now
+        )
+
+    def upsert_posts(self, posts: Iterable[Dict]) -> Tuple[int, int]:
+        """Insere posts novos e atualiza os já conhecidos; retorna (inseridos, atualizados)"""
+        now = time.time()
+        rows = [self._row(post, now) for post in posts if post.get('uri')]
+        if not rows:
+            return 0, 0
+
+        uris = {row[0] for row in rows}
+        known = self.known_uris(uris)
+        with self._lock:
+            self._conn.executemany(UPSERT_SQL, rows)
+            self._conn.commit()
+
+        inserted = len(uris) - len(known)
+        self.stats['inserted'] += inserted
+        self.stats['updated'] += len(rows) - inserted
+        return inserted, len(rows) - inserted
+
+    def known_uris(self, uris: Iterable[str]) -> Set[str]:
+        """Subconjunto das URIs que já estão na base (consulta pela chave primária)"""
+        uris = list(uris)
+        known = set()
+        with self._lock:
+            for start in range(0, len(uris), 500):
+                chunk = uris[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT uri FROM posts WHERE uri IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                known.update(row[0] for row in rows)
+        return known
+
+    # Mesmo contrato dos sinks de post_sinks.py: pode ir direto no PostStreamWriter
+    def write_batch(self, posts: List[Dict]):
+        self.upsert_posts(posts)
+        self.count += len(posts)
+
+    def update_sentiment(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Grava (uri, sentimento, contexto) calculados pela análise de sentimento"""
+        rows = list(rows)
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE posts SET sentiment = ?, contexto = ? WHERE uri = ?",
+                [(sentiment, contexto, uri) for uri, sentiment, contexto in rows]
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def tag_queries(self, rows: Iterable[Tuple[str, List[str]]]) -> int:
+        """Acrescenta (uri, queries) às queries já gravadas de cada post"""
+        params = [{'queries': _queries_json(queries), 'uri': uri} for uri, queries in rows if queries]
+        sql = ("UPDATE posts SET matched_queries = " + MERGE_QUERIES_SQL.format(new=':queries')
+               + " WHERE uri = :uri")
+        with self._lock:
+            self._conn.executemany(sql, params)
+            self._conn.commit()
+        return len(params)
+
+    def import_file(self, path: str) -> Tuple[int, int]:
+        """Importa um arquivo de coleta anterior (.jsonl, .json ou .csv)"""
+        if path.endswith(('.jsonl', '.jsonl.gz', '.jsonl.zst')):
+            posts = iter_jsonl(path)
+        elif path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                posts = json.load(f)
+        else:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                posts = list(csv.DictReader(f))
+
+        inserted = updated = 0
+        batch = []
+        for post in posts:
+            batch.append(post)
+            if len(batch) >= 5000:
+                i, u = self.upsert_posts(batch)
+                inserted, updated, batch = inserted + i, updated + u, []
+        i, u = self.upsert_posts(batch)
+        return inserted + i, updated + u
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def scope_to(self, uris: Optional[Iterable[str]]):
+        """Restringe totals/monthly_counts/top_authors às URIs dadas (None volta à base inteira)"""
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS scope (uri TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM scope")
+            if uris is not None:
+                self._conn.executemany("INSERT OR IGNORE INTO scope VALUES (?)", ((uri,) for uri in uris))
+            self._conn.commit()
+            self._scoped = uris is not None
+
+    def _where(self, since: Optional[str], until: Optional[str]) -> Tuple[str, Tuple]:
+        """Filtro por created_at em [since, until], até o fim do segundo de until (como na coleta)"""
+        clauses, params = [], []
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(normalize_timestamp(since))
+        if until:
+            # Limite exclusivo no segundo seguinte: until=23:59:59Z inclui 23:59:59.999Z
+            clauses.append("created_at < ?")
+            end_second = parse_timestamp(until).replace(microsecond=0)
+            params.append(normalize_timestamp(end_second + timedelta(seconds=1)))
+        if self._scoped:
+            clauses.append("uri IN (SELECT uri FROM scope)")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    def totals(self, since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+        where, params = self._where(since, until)
+        row = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(like_count), 0), COALESCE(SUM(repost_count), 0), "
+            f"COALESCE(SUM(reply_count), 0) FROM posts{where}", params
+        )[0]
+        return {'posts': row[0], 'likes': row[1], 'reposts': row[2], 'replies': row[3]}
+
+    def monthly_counts(self, since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, int]:
+        where, params = self._where(since, until)
+        rows = self._query(
+            f"SELECT substr(created_at, 1, 7) AS month, COUNT(*) FROM posts{where} "
+            "GROUP BY month HAVING month IS NOT NULL ORDER BY month", params
+        )
+        return dict(rows)
+
+    def top_authors(self, limit: int = 10, since: Optional[str] = None,
+                    until: Optional[str] = None) -> List[Tuple[str, int]]:
+        # Agrupa pelo DID (indexado), que não muda quando o autor troca de handle
+        where, params = self._where(since, until)
+        return self._query(
+            f"SELECT MAX(author_handle), COUNT(*) AS n FROM posts{where} "
+            "GROUP BY author_did ORDER BY n DESC LIMIT ?", params + (limit,)
+        )
+
+    def sentiment_distribution(self) -> Dict[str, int]:
+        rows = self._query(
+            "SELECT sentiment, COUNT(*) FROM posts WHERE sentiment IS NOT NULL GROUP BY sentiment"
+        )
+        return dict(rows)
+
+    def query_counts(self) -> Dict[str, int]:
+        """Posts encontrados por query (um post conta para todas as queries que o acharam)"""
+        rows = self._query(
+            "SELECT q.value, COUNT(*) FROM posts, json_each(posts.matched_queries) AS q "
+            "WHERE posts.matched_queries IS NOT NULL GROUP BY q.value ORDER BY COUNT(*) DESC"
+        )
+        return dict(rows)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Busca textual (FTS5, ordenada por relevância)"""
+        if self.fts_available:
+            sql = ("SELECT p.uri, p.author_handle, p.created_at, p.text FROM posts_fts "
+                   "JOIN posts p ON p.rowid = posts_fts.rowid WHERE posts_fts MATCH ? "
+                   "ORDER BY bm25(posts_fts) LIMIT ?")
+        else:
+            sql = ("SELECT uri, author_handle, created_at, text FROM posts WHERE text LIKE ? "
+                   "ORDER BY created_at DESC LIMIT ?")
+            query = f"%{query}%"
+        rows = self._query(sql, (query, limit))
+        return [dict(zip(('uri', 'author_handle', 'created_at', 'text'), row)) for row in rows]
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM posts")[0][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Importa coletas antigas e consulta a base pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Base local de posts coletados (SQLite)")
+    parser.add_argument('--db', default=DEFAULT_WAREHOUSE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Importa arquivos .jsonl/.json/.csv")
+    import_parser.add_argument('files', nargs='+')
+
+    subparsers.add_parser('stats', help="Resumo da base")
+
+    search_parser = subparsers.add_parser('search', help="Busca textual")
+    search_parser.add_argument('query')
+    search_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+    warehouse = PostWarehouse(args.db)
+
+    try:
+        if args.command == 'import':
+            for path in args.files:
+                inserted, updated = warehouse.import_file(path)
+                print(f"📥 {path}: {inserted} novos, {updated} atualizados")
+            print(f"🗃️ Total na base: {len(warehouse):,} posts")
+
+        elif args.command == 'stats':
+            totals = warehouse.totals()
+            print(f"🗃️ Posts: {totals['posts']:,} | 💖 {totals['likes']:,} | "
+                  f"🔄 {totals['reposts']:,} | 💬 {totals['replies']:,}")
+            for month, count in warehouse.monthly_counts().items():
+                print(f"   {month}: {count} posts")
+            for sentiment, count in warehouse.sentiment_distribution().items():
+                print(f"   {sentiment}: {count}")
+            for query, count in warehouse.query_counts().items():
+                print(f"   🔎 '{query}': {count} posts")
+
+        elif args.command == 'search':
+            for post in warehouse.search(args.query, args.limit):
+                print(f"[{post['created_at']}] @{post['author_handle']}: {post['text'][:120]}")
+    finally:
+        warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
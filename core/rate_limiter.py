@@ -0,0 +1,176 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte Retry-After (segundos ou data HTTP) em segundos de espera"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket compartilhado, ajustado pelos cabeçalhos ratelimit-* do servidor"""
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, min_rate: float = 0.05,
+                 max_rate: Optional[float] = None, jitter: float = 0.2,
+                 backoff_base: float = 5.0, backoff_cap: float = 300.0):
+        # rate em requests/s; burst = tamanho do balde
+        self.rate = rate
+        self.capacity = float(burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # Janela deslizante para medir a taxa realmente alcançada
+        self._request_times = deque()
+        self.metrics_window = 60.0
+
+        self.stats = {
+            'requests': 0,
+            'throttled_waits': 0,
+            'total_wait_time': 0.0,
+            'backoffs': 0,
+            'server_limit': None,
+            'server_remaining': None
+        }
+
+    def set_rate(self, rate: float):
+        """Define a taxa alvo (requests/s) respeitando os limites configurados"""
+        rate = max(rate, self.min_rate)
+        if self.max_rate:
+            rate = min(rate, self.max_rate)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Reserva um token e retorna quanto tempo esperar antes de usar"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            # Ficha consumida já; saldo negativo vira espera proporcional
+            self.tokens -= 1.0
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            wait = max(wait, self.blocked_until - now)
+
+            self._request_times.append(now + wait)
+            while self._request_times and self._request_times[0] < now - self.metrics_window:
+                self._request_times.popleft()
+
+            self.stats['requests'] += 1
+            if wait > 0:
+                self.stats['throttled_waits'] += 1
+                self.stats['total_wait_time'] += wait
+            return wait
+
+    def acquire(self):
+        """Bloqueia até que o próximo request possa ser enviado"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Versão assíncrona de acquire() para o coletor com asyncio"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Ajusta o ritmo a partir de ratelimit-remaining/ratelimit-reset"""
+        if not headers:
+            return
+
+        remaining = headers.get('ratelimit-remaining')
+        reset = headers.get('ratelimit-reset')
+        limit = headers.get('ratelimit-limit')
+
+        if limit is not None:
+            self.stats['server_limit'] = limit
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = int(remaining)
+            reset_in = max(float(reset) - time.time(), 1.0)
+        except ValueError:
+            return
+
+        self.stats['server_remaining'] = remaining
+
+        if remaining <= 0:
+            # Cota esgotada: espera até o reset (com jitter para não acordar todos juntos)
+            with self._lock:
+                self.blocked_until = max(self.blocked_until,
+                                         time.monotonic() + reset_in + random.uniform(0, self.jitter * reset_in))
+            return
+
+        # Distribui o que resta da cota igualmente até o reset
+        self.set_rate(remaining / reset_in)
+
+    def backoff(self, headers: Optional[Mapping[str, str]] = None, attempt: int = 0) -> float:
+        """Pausa todos os workers após um 429; retorna a espera aplicada"""
+        retry_after = parse_retry_after(headers.get('Retry-After') if headers else None)
+
+        if retry_after is None and headers and headers.get('ratelimit-reset'):
+            try:
+                retry_after = max(float(headers['ratelimit-reset']) - time.time(), 0.0)
+            except ValueError:
+                retry_after = None
+
+        if retry_after is None:
+            # Backoff exponencial com jitter completo
+            retry_after = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        else:
+            retry_after += random.uniform(0, self.jitter * max(retry_after, 1.0))
+
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.tokens = min(self.tokens, 0.0)
+        self.stats['backoffs'] += 1
+        return retry_after
+
+    def achieved_rate(self) -> float:
+        """Requests/s efetivamente enviados na última janela de medição"""
+        with self._lock:
+            now = time.monotonic()
+            recent = [t for t in self._request_times if now - self.metrics_window <= t <= now]
+        if not recent:
+            return 0.0
+        span = max(now - recent[0], 1.0)
+        return len(recent) / span
+
+    def metrics(self) -> Dict:
+        """Resumo para relatórios"""
+        return {
+            'target_rate': self.rate,
+            'achieved_rate': self.achieved_rate(),
+            **self.stats
+        }
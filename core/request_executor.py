@@ -0,0 +1,123 @@
+import random
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+import requests
+
+# Política por classe de erro: número máximo de novas tentativas e backoff (base, teto)
+DEFAULT_RETRY_POLICIES = {
+    'rate_limit': {'max_retries': 8, 'base': 5.0, 'cap': 300.0},
+    'auth': {'max_retries': 1, 'base': 0.0, 'cap': 0.0},
+    'server': {'max_retries': 5, 'base': 2.0, 'cap': 60.0},
+    'connection': {'max_retries': 5, 'base': 2.0, 'cap': 60.0}
+}
+
+ERROR_CLASSES = list(DEFAULT_RETRY_POLICIES)
+
+
+def classify_status(status_code: int) -> Optional[str]:
+    """Classe de erro recuperável para um status HTTP (None = não tentar de novo)"""
+    if status_code == 429:
+        return 'rate_limit'
+    if status_code == 401:
+        return 'auth'
+    if 500 <= status_code < 600:
+        return 'server'
+    return None
+
+
+class RequestExecutor:
+    """Executa requests com retentativas limitadas, em laço (sem recursão)"""
+
+    def __init__(self, session: requests.Session, rate_limiter=None, stats: Optional[Dict] = None,
+                 on_auth_error: Optional[Callable[[], bool]] = None,
+                 policies: Optional[Dict[str, Dict]] = None, timeout: float = 30.0,
+                 auth_provider: Optional[Callable[[], Dict[str, str]]] = None):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        # on_auth_error() renova o token; retorna False se não foi possível
+        self.on_auth_error = on_auth_error
+        # auth_provider() devolve o cabeçalho Authorization vigente a cada tentativa
+        self.auth_provider = auth_provider
+        self.policies = {**DEFAULT_RETRY_POLICIES, **(policies or {})}
+        self.timeout = timeout
+
+        # Contadores gravados no dict de estatísticas do coletor
+        self.stats = stats if stats is not None else {}
+        for error_class in ERROR_CLASSES:
+            self.stats.setdefault(f'retries_{error_class}', 0)
+        self.stats.setdefault('http_attempts', 0)
+        self.stats.setdefault('failed_requests', 0)
+
+    def retry_wait(self, error_class: str, attempt: int,
+                   headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """Registra a falha e retorna a espera antes da próxima tentativa (None = desistir)"""
+        policy = self.policies[error_class]
+        if attempt > policy['max_retries']:
+            self.stats['failed_requests'] += 1
+            return None
+
+        if error_class == 'auth' and (not self.on_auth_error or not self.on_auth_error()):
+            self.stats['failed_requests'] += 1
+            return None
+
+        self.stats[f'retries_{error_class}'] += 1
+
+        if error_class == 'auth':
+            return 0.0
+        if error_class == 'rate_limit' and self.rate_limiter:
+            # O limitador pausa todos os workers; a espera acontece no próximo acquire
+            self.rate_limiter.backoff(headers, attempt - 1)
+            return 0.0
+
+        # Backoff exponencial com jitter completo
+        return random.uniform(0, min(policy['cap'], policy['base'] * (2 ** (attempt - 1))))
+
+    def execute(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        """Envia o request; devolve a resposta final (ou None se a conexão nunca se firmou)"""
+        kwargs.setdefault('timeout', self.timeout)
+        attempts = {error_class: 0 for error_class in ERROR_CLASSES}
+
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            request_kwargs = kwargs
+            if self.auth_provider:
+                request_kwargs = {**kwargs, 'headers': {**kwargs.get('headers', {}), **self.auth_provider()}}
+
+            self.stats['http_attempts'] += 1
+            response = None
+            headers = None
+            try:
+                response = self.session.request(method, url, **request_kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                error_class = 'connection'
+                print(f"🔌 Falha de conexão: {e}")
+            else:
+                if self.rate_limiter:
+                    self.rate_limiter.update_from_headers(response.headers)
+                error_class = classify_status(response.status_code)
+                if error_class is None:
+                    return response
+                headers = response.headers
+
+            attempts[error_class] += 1
+            wait = self.retry_wait(error_class, attempts[error_class], headers)
+            if wait is None:
+                print(f"❌ Desistindo após {attempts[error_class]} falhas ({error_class})")
+                return response
+
+            # Libera a resposta descartada antes de esperar
+            if response is not None:
+                response.close()
+            response = None
+
+            if error_class == 'rate_limit':
+                print(f"⏳ Rate limit (tentativa {attempts[error_class]}). Aguardando liberação...")
+            elif error_class == 'auth':
+                print("🔑 Token renovado, repetindo request...")
+            elif wait > 0:
+                print(f"🔁 Erro {error_class} (tentativa {attempts[error_class]}). Aguardando {wait:.1f}s...")
+                time.sleep(wait)
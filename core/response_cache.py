@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """Cache local (SQLite) de respostas da API, com TTL e limite de tamanho"""
+
+    def __init__(self, path: str = "data/cache/responses.sqlite",
+                 ttl: float = 7 * 24 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Uma conexão compartilhada entre os workers, protegida por lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                params TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+        # Tamanho total mantido em memória; o SUM sobre a tabela só roda quando ele passa do limite
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+
+    @staticmethod
+    def normalize_params(endpoint: str, params: Dict) -> str:
+        """Forma canônica dos parâmetros (ordem fixa, sem valores vazios)"""
+        normalized = {k: str(v) for k, v in sorted(params.items()) if v is not None and v != ''}
+        return json.dumps({'endpoint': endpoint, 'params': normalized}, ensure_ascii=False, sort_keys=True)
+
+    def make_key(self, endpoint: str, params: Dict) -> str:
+        return hashlib.sha256(self.normalize_params(endpoint, params).encode('utf-8')).hexdigest()
+
+    def get(self, endpoint: str, params: Dict) -> Optional[Dict]:
+        """Resposta em cache para (endpoint, params), ou None"""
+        body = self.get_raw(endpoint, params)
+        return None if body is None else json.loads(body)
+
+    def get_raw(self, endpoint: str, params: Dict) -> Optional[bytes]:
+        """Corpo JSON em cache, sem decodificar (para quem decodifica em outro processo)"""
+        key = self.make_key(endpoint, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            body, size, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+
+        return zlib.decompress(body)
+
+    def put(self, endpoint: str, params: Dict, data: Dict):
+        """Guarda uma resposta bem-sucedida e aplica o limite de tamanho"""
+        self.put_raw(endpoint, params, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def put_raw(self, endpoint: str, params: Dict, raw: bytes):
+        """Guarda o corpo JSON como veio da API"""
+        key = self.make_key(endpoint, params)
+        body = zlib.compress(raw)
+        now = time.time()
+
+        with self._lock:
+            # Substituir uma entrada existente desconta o tamanho antigo do total
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, params, body, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, self.normalize_params(endpoint, params), body, len(body), now, now)
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            self.stats['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até ficar abaixo de 90% do limite"""
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+
+        # Confere o total real (outro processo pode usar o mesmo arquivo)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats['evictions'] += 1
+        self._total_bytes = total
+
+    def hit_ratio(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def print_stats(self):
+        """Resumo de uso do cache para os relatórios"""
+        print(f"🗄️ Cache de respostas: {self.stats['hits']} acertos, {self.stats['misses']} faltas "
+              f"({self.hit_ratio() * 100:.1f}% de acerto) | {self.stats['evictions']} removidas")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
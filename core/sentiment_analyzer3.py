@@ -4,23 +4,39 @@ import torch
 import re
 from tqdm import tqdm
 import logging
+import os
+from post_store import PYARROW_AVAILABLE, load_posts, parquet_sibling, write_dataframe
+from post_warehouse import DEFAULT_WAREHOUSE, PostWarehouse
+from context_rules import ContextRuleEngine
+from sentiment_backends import carregar_pipeline
+from sentiment_cache import DEFAULT_SENTIMENT_CACHE, SentimentCache, rule_version
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AnalisadorAgronegocio:
-    def __init__(self):
-        # Usa CPU por padrão, GPU se disponível
-        self.device = 0 if torch.cuda.is_available() else -1
-
-        # Carrega modelo mais sofisticado para português
-        self.sentiment_pipeline = pipeline(
-            "text-classification",
-            model="cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual",
-            device=self.device,
-            return_all_scores=True
-        )
+    # Mudanças na lógica de decisão (limiares, ordem das regras) exigem trocar esta versão
+    VERSAO_LOGICA = "1"
+
+    def __init__(self, backend='torch'):
+        # Usa CPU por padrão, GPU se disponível (int8 e ONNX rodam só na CPU)
+        self.device = 0 if torch.cuda.is_available() and backend == 'torch' else -1
+
+        # Carrega modelo mais sofisticado para português, no backend escolhido
+        # (torch, torch-int8 ou onnx; ver sentiment_backends.py)
+        self.model_id = "cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual"
+        self.backend = backend
+        self.sentiment_pipeline = carregar_pipeline(self.model_id, backend, self.device)
+
+        # Backends quantizados/exportados podem divergir do fp32, então entram na chave do cache
+        self.cache_model_id = self.model_id if backend == 'torch' else f"{self.model_id}@{backend}"
+
+        # Barra de progresso dos lotes (desligada nos workers do sentiment_runner.py)
+        self.mostrar_progresso = True
+
+        # Termos que indicam que o texto fala de agronegócio
+        self.termos_agronegocio = ['agronegócio', 'agricultura', 'pecuária']
 
         # Palavras-chave relacionadas ao agronegócio
         self.keywords_positivas = [
@@ -53,6 +69,19 @@ class AnalisadorAgronegocio:
             r'sucesso.*agronegócio'
         ]
 
+        # Todas as regras acima compiladas em uma passada única sobre o texto
+        self.regras = ContextRuleEngine(
+            self.termos_agronegocio, self.padroes_critica, self.padroes_apoio,
+            self.keywords_positivas, self.keywords_negativas
+        )
+
+        # Identifica as regras no cache de sentimento (muda junto com as listas acima)
+        self.rule_version = rule_version(
+            self.termos_agronegocio, self.keywords_positivas, self.keywords_negativas,
+            self.padroes_critica, self.padroes_apoio,
+            logic_version=self.VERSAO_LOGICA
+        )
+
     def preprocessar_texto(self, texto):
         """Limpa e prepara o texto para análise"""
         if pd.isna(texto) or not isinstance(texto, str):
@@ -67,32 +96,13 @@ class AnalisadorAgronegocio:
 
     def detectar_contexto_agronegocio(self, texto):
         """Detecta se o texto menciona agronegócio e em que contexto"""
-        texto_lower = texto.lower()
-
-        # Verifica se menciona agronegócio diretamente
-        if 'agronegócio' not in texto_lower and 'agricultura' not in texto_lower and 'pecuária' not in texto_lower:
-            return 'nao_relacionado'
-
-        # Verifica padrões específicos de crítica
-        for padrao in self.padroes_critica:
-            if re.search(padrao, texto_lower):
-                return 'critica_explicita'
-
-        # Verifica padrões específicos de apoio
-        for padrao in self.padroes_apoio:
-            if re.search(padrao, texto_lower):
-                return 'apoio_explicito'
+        return self.regras.detectar(texto)
 
-        # Conta palavras-chave positivas e negativas
-        palavras_positivas = sum(1 for palavra in self.keywords_positivas if palavra in texto_lower)
-        palavras_negativas = sum(1 for palavra in self.keywords_negativas if palavra in texto_lower)
-
-        if palavras_negativas > palavras_positivas:
-            return 'contexto_negativo'
-        elif palavras_positivas > palavras_negativas:
-            return 'contexto_positivo'
-        else:
-            return 'contexto_neutro'
+    def classificar_regras(self, texto_limpo):
+        """(contexto, rótulo) pelas regras; rótulo None quando o caso precisa do modelo"""
+        if not texto_limpo:
+            return self.regras.detectar(texto_limpo), 'erro'
+        return self.regras.avaliar(texto_limpo)
 
     def analisar_sentimento_geral(self, texto):
         """Analisa o sentimento geral do texto"""
@@ -100,41 +110,65 @@ class AnalisadorAgronegocio:
             # Limita o texto para não exceder o limite do modelo
             texto_truncado = texto[:512]
             resultado = self.sentiment_pipeline(texto_truncado)[0]
-
-            # Encontra o sentimento com maior confiança
-            sentimento_principal = max(resultado, key=lambda x: x['score'])
-
-            return {
-                'label': sentimento_principal['label'],
-                'score': sentimento_principal['score']
-            }
+            return self._sentimento_principal(resultado)
         except Exception as e:
             logger.warning(f"Erro na análise de sentimento: {e}")
             return {'label': 'NEUTRAL', 'score': 0.0}
 
+    def _sentimento_principal(self, resultado):
+        """Sentimento com maior confiança entre os scores devolvidos pelo pipeline"""
+        sentimento_principal = max(resultado, key=lambda x: x['score'])
+        return {
+            'label': sentimento_principal['label'],
+            'score': sentimento_principal['score']
+        }
+
+    def analisar_sentimento_lote(self, textos, batch_size=32):
+        """Analisa o sentimento geral de vários textos em lotes
+
+        Os textos são ordenados por tamanho, então cada lote junta textos parecidos e o
+        preenchimento (padding) até o maior texto do lote fica pequeno. Os resultados
+        voltam na ordem original.
+        """
+        truncados = [texto[:512] for texto in textos]
+        ordem = sorted(range(len(truncados)), key=lambda i: len(truncados[i]))
+        resultados = [None] * len(truncados)
+
+        for inicio in tqdm(range(0, len(ordem), batch_size), desc="Analisando lotes",
+                           disable=not self.mostrar_progresso):
+            indices = ordem[inicio:inicio + batch_size]
+            lote = [truncados[i] for i in indices]
+            try:
+                saidas = self.sentiment_pipeline(lote, batch_size=len(lote))
+            except Exception as e:
+                # Um texto problemático não derruba o lote: refaz um a um, como no caminho por linha
+                logger.warning(f"Erro no lote de sentimento, analisando um a um: {e}")
+                saidas = None
+
+            for posicao, i in enumerate(indices):
+                if saidas is None:
+                    resultados[i] = self.analisar_sentimento_geral(truncados[i])
+                else:
+                    resultados[i] = self._sentimento_principal(saidas[posicao])
+
+        return resultados
+
     def classificar_sentimento_agronegocio(self, texto):
         """Classifica especificamente a atitude em relação ao agronegócio"""
         texto_limpo = self.preprocessar_texto(texto)
 
-        if not texto_limpo:
-            return 'erro'
-
-        # Detecta contexto
-        contexto = self.detectar_contexto_agronegocio(texto_limpo)
-
-        # Se não é relacionado ao agronegócio, retorna neutro
-        if contexto == 'nao_relacionado':
-            return 'neutro'
-
-        # Se há crítica ou apoio explícito, retorna diretamente
-        if contexto == 'critica_explicita':
-            return 'negativo'
-        elif contexto == 'apoio_explicito':
-            return 'positivo'
+        # Contexto e rótulo em uma passada: não relacionado -> neutro, crítica ou apoio
+        # explícito -> negativo/positivo direto
+        contexto, rotulo = self.classificar_regras(texto_limpo)
+        if rotulo is not None:
+            return rotulo
 
         # Para casos ambíguos, usa análise de sentimento geral + contexto
         sentimento_geral = self.analisar_sentimento_geral(texto_limpo)
+        return self.combinar_contexto_sentimento(contexto, sentimento_geral)
 
+    def combinar_contexto_sentimento(self, contexto, sentimento_geral):
+        """Decide o rótulo de um caso ambíguo a partir do contexto e do sentimento geral"""
         if contexto == 'contexto_negativo':
             if sentimento_geral['label'] in ['NEGATIVE', 'negative']:
                 return 'negativo'
@@ -159,31 +193,96 @@ class AnalisadorAgronegocio:
                     return 'negativo'
             return 'neutro'
 
+    def classificar_lote(self, textos, batch_size=32, cache=None):
+        """Classifica vários textos de uma vez: (sentimentos, contextos), na ordem de entrada
+
+        Mesmo resultado de classificar_sentimento_agronegocio texto a texto, mas as regras
+        rodam primeiro sobre todos os textos e só os casos ambíguos vão para o modelo,
+        em lotes (analisar_sentimento_lote). Com um SentimentCache, textos já classificados
+        com o mesmo modelo e as mesmas regras saem do cache.
+        """
+        limpos = [self.preprocessar_texto(texto) for texto in textos]
+        sentimentos = [None] * len(limpos)
+        contextos = [None] * len(limpos)
+        scores = [None] * len(limpos)
+
+        pendentes = range(len(limpos))
+        if cache is not None:
+            chaves = [cache.make_key(texto_limpo) for texto_limpo in limpos]
+            encontrados = cache.get_many(chaves)
+            pendentes = []
+            for i, chave in enumerate(chaves):
+                if chave in encontrados:
+                    sentimentos[i], scores[i], contextos[i] = encontrados[chave]
+                else:
+                    pendentes.append(i)
+
+        ambiguos = []
+        for i in pendentes:
+            contextos[i], sentimentos[i] = self.classificar_regras(limpos[i])
+            if sentimentos[i] is None:
+                # Decidido depois do modelo
+                ambiguos.append(i)
+
+        logger.info(f"{len(ambiguos)} de {len(limpos)} posts precisam do modelo "
+                    f"({len(limpos) - len(pendentes)} já classificados no cache)")
+        resultados = self.analisar_sentimento_lote([limpos[i] for i in ambiguos], batch_size)
+        for i, sentimento_geral in zip(ambiguos, resultados):
+            sentimentos[i] = self.combinar_contexto_sentimento(contextos[i], sentimento_geral)
+            scores[i] = sentimento_geral['score']
+
+        if cache is not None:
+            cache.put_many((chaves[i], sentimentos[i], scores[i], contextos[i]) for i in pendentes)
+
+        return sentimentos, contextos
+
 def main():
     # Inicializa o analisador
-    analisador = AnalisadorAgronegocio()
-
-    # Lê o CSV original
-    logger.info("Carregando dados...")
-    df = pd.read_csv("data/bluesky_agronegócio_2025.csv")
-
-    # Aplica análise de sentimento com barra de progresso
-    logger.info("Iniciando análise de sentimento...")
-    tqdm.pandas(desc="Analisando posts")
-    df['sentiment_agronegocio'] = df['text'].progress_apply(
-        analisador.classificar_sentimento_agronegocio
-    )
-
-    # Adiciona análise de contexto para debugging
-    df['contexto_agronegocio'] = df['text'].apply(
-        lambda x: analisador.detectar_contexto_agronegocio(
-            analisador.preprocessar_texto(x)
+    analisador = AnalisadorAgronegocio(backend=os.getenv('SENTIMENT_BACKEND', 'torch'))
+
+    # Lê os posts coletados (Parquet quando disponível, senão o CSV original)
+    entrada = "data/bluesky_agronegócio_2025.csv"
+    if PYARROW_AVAILABLE and os.path.exists(parquet_sibling(entrada)):
+        entrada = parquet_sibling(entrada)
+    logger.info(f"Carregando dados de {entrada}...")
+    df = load_posts(entrada)
+
+    # Aplica análise de sentimento em lotes (regras primeiro, modelo só nos casos ambíguos)
+    batch_size = int(os.getenv('SENTIMENT_BATCH_SIZE', '32'))
+    logger.info(f"Iniciando análise de sentimento (lotes de {batch_size})...")
+
+    # Cache por conteúdo: re-execuções só mandam ao modelo os textos ainda não vistos
+    # (SENTIMENT_CACHE vazio desliga)
+    cache_path = os.getenv('SENTIMENT_CACHE', DEFAULT_SENTIMENT_CACHE)
+    cache = SentimentCache(cache_path, analisador.cache_model_id, analisador.rule_version) if cache_path else None
+    try:
+        sentimentos, contextos = analisador.classificar_lote(
+            df['text'].tolist(), batch_size=batch_size, cache=cache
         )
-    )
+    finally:
+        if cache is not None:
+            cache.print_stats()
+            cache.close()
+    df['sentiment_agronegocio'] = sentimentos
+
+    # Contexto detectado pelas regras, para debugging
+    df['contexto_agronegocio'] = contextos
 
     # Salva novo CSV
     logger.info("Salvando resultados...")
     df.to_csv("data/posts_com_sentimento_agronegocio.csv", index=False)
+    if PYARROW_AVAILABLE:
+        # Versão colunar para as etapas seguintes (organizador, nuvem de palavras)
+        write_dataframe(df, "data/posts_com_sentimento_agronegocio.parquet")
+
+    # Grava o sentimento na base consolidada (coluna indexada), se ela existir
+    if os.path.exists(DEFAULT_WAREHOUSE) and 'uri' in df.columns:
+        warehouse = PostWarehouse(DEFAULT_WAREHOUSE)
+        total = warehouse.update_sentiment(
+            zip(df['uri'], df['sentiment_agronegocio'], df['contexto_agronegocio'])
+        )
+        warehouse.close()
+        logger.info(f"Sentimento gravado para {total} posts em {DEFAULT_WAREHOUSE}")
 
     # Exibe estatísticas detalhadas
     print("\n=== RELATÓRIO DE ANÁLISE ===")
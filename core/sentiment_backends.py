@@ -0,0 +1,128 @@
+import argparse
+import os
+import time
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    ONNX_AVAILABLE = True
+except ImportError:
+    onnxruntime = None
+    ORTModelForSequenceClassification = None
+    ONNX_AVAILABLE = False
+
+# torch: fp32 eager (comportamento original) | torch-int8: quantização dinâmica das camadas
+# Linear | onnx: modelo exportado para ONNX Runtime com otimizações de grafo
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+DEFAULT_ONNX_DIR = "data/models/onnx"
+
+
+def _onnx_path(model_id: str, onnx_dir: str) -> str:
+    return os.path.join(onnx_dir, model_id.replace('/', '__'))
+
+
+def _load_onnx_model(model_id: str, onnx_dir: str):
+    """Carrega o modelo ONNX exportado (exporta na primeira vez e guarda em onnx_dir)"""
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    path = _onnx_path(model_id, onnx_dir)
+    if os.path.exists(os.path.join(path, "model.onnx")):
+        return ORTModelForSequenceClassification.from_pretrained(path, session_options=session_options)
+
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_id, export=True, session_options=session_options
+    )
+    model.save_pretrained(path)
+    return model
+
+
+def carregar_pipeline(model_id: str, backend: str = 'torch', device: int = -1,
+                      onnx_dir: str = DEFAULT_ONNX_DIR):
+    """Pipeline de classificação com o backend de inferência escolhido"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    if backend == 'onnx' and not ONNX_AVAILABLE:
+        raise RuntimeError("Backend onnx requer: pip install onnxruntime optimum")
+
+    if backend == 'torch':
+        return pipeline("text-classification", model=model_id, device=device, return_all_scores=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if backend == 'torch-int8':
+        # Quantização dinâmica só existe na CPU
+        model = AutoModelForSequenceClassification.from_pretrained(model_id)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("text-classification", model=model, tokenizer=tokenizer,
+                        device=-1, return_all_scores=True)
+
+    return pipeline("text-classification", model=_load_onnx_model(model_id, onnx_dir),
+                    tokenizer=tokenizer, device=-1, return_all_scores=True)
+
+
+def main():
+    """Concordância e vazão de cada backend em relação ao fp32, nos posts coletados
+
+    A concordância é medida nos posts que passam pelo modelo: no rótulo do modelo
+    (positive/neutral/negative) e no rótulo final depois das regras de contexto.
+    """
+    from post_store import load_posts
+    from sentiment_analyzer3 import AnalisadorAgronegocio
+
+    parser = argparse.ArgumentParser(description="Compara os backends de inferência do modelo de sentimento")
+    parser.add_argument('--input', default="data/bluesky_agronegócio_2025.csv")
+    parser.add_argument('--backends', default=",".join(BACKENDS), help="Lista separada por vírgulas")
+    parser.add_argument('--limit', type=int, default=0, help="Usa só os N primeiros posts (0 = todos)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    textos = load_posts(args.input)['text'].tolist()
+    if args.limit:
+        textos = textos[:args.limit]
+
+    ambiguos = contextos = referencia = None
+    linhas = []
+    for backend in ['torch'] + [b for b in args.backends.split(',') if b and b != 'torch']:
+        try:
+            analisador = AnalisadorAgronegocio(backend=backend)
+        except (RuntimeError, ValueError) as e:
+            print(f"⚠️ {backend}: {e}")
+            continue
+
+        # Só os textos que chegam ao modelo (os demais são decididos pelas regras, iguais em todo backend)
+        if ambiguos is None:
+            ambiguos, contextos = [], []
+            for texto in textos:
+                texto_limpo = analisador.preprocessar_texto(texto)
+                contexto, rotulo = analisador.classificar_regras(texto_limpo)
+                if rotulo is None:
+                    ambiguos.append(texto_limpo)
+                    contextos.append(contexto)
+            print(f"🧪 {len(ambiguos)} de {len(textos)} posts passam pelo modelo")
+
+        inicio = time.perf_counter()
+        resultados = analisador.analisar_sentimento_lote(ambiguos, args.batch_size)
+        segundos = time.perf_counter() - inicio
+        rotulos = [analisador.combinar_contexto_sentimento(contexto, resultado)
+                   for contexto, resultado in zip(contextos, resultados)]
+
+        if referencia is None:
+            referencia = ([resultado['label'] for resultado in resultados], rotulos)
+        total = max(len(resultados), 1)
+        modelo_igual = sum(r['label'] == label for r, label in zip(resultados, referencia[0])) / total
+        final_igual = sum(a == b for a, b in zip(rotulos, referencia[1])) / total
+        linhas.append((backend, len(ambiguos) / segundos if segundos else 0.0, modelo_igual, final_igual))
+
+    print("\n=== BACKENDS DE INFERÊNCIA (referência: torch fp32) ===")
+    print(f"{'backend':<12} {'textos/s':>10} {'rótulo do modelo':>18} {'rótulo final':>14}")
+    base = linhas[0][1] if linhas else 0.0
+    for backend, vazao, modelo, final in linhas:
+        ganho = f" ({vazao / base:.1f}x)" if base else ""
+        print(f"{backend:<12} {vazao:>10.1f} {modelo * 100:>17.1f}% {final * 100:>13.1f}%{ganho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_SENTIMENT_CACHE = "data/cache/sentiment.sqlite"
+
+# (sentimento, score do modelo ou None quando as regras decidiram, contexto)
+CachedSentiment = Tuple[str, Optional[float], str]
+
+
+def rule_version(*rule_lists: Iterable[str], logic_version: str = "1") -> str:
+    """Versão das regras: hash das listas de palavras-chave/padrões e da versão da lógica"""
+    payload = json.dumps([list(rules) for rules in rule_lists] + [logic_version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class SentimentCache:
+    """Cache local (SQLite) da classificação de sentimento, por conteúdo do texto
+
+    A chave é o hash de (texto pré-processado, modelo, versão das regras): trocar o
+    modelo ou mudar as listas de regras muda todas as chaves, e as entradas antigas
+    são descartadas ao abrir o cache com a nova versão.
+    """
+
+    def __init__(self, path: str = DEFAULT_SENTIMENT_CACHE, model_id: str = "", rule_version: str = ""):
+        self.path = path
+        self.model_id = model_id
+        self.rule_version = rule_version
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Vários processos (sentiment_runner.py) podem gravar no mesmo arquivo: espera o lock do SQLite
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiments (
+                key TEXT PRIMARY KEY,
+                model_id TEXT NOT NULL,
+                rule_version TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                score REAL,
+                contexto TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidated': 0}
+        self._invalidate_stale()
+
+    def _invalidate_stale(self):
+        """Remove entradas de outro modelo ou de outra versão das regras"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sentiments WHERE model_id != ? OR rule_version != ?",
+                (self.model_id, self.rule_version)
+            )
+            self._conn.commit()
+            self.stats['invalidated'] += cursor.rowcount
+
+    def make_key(self, texto: str) -> str:
+        payload = json.dumps([texto, self.model_id, self.rule_version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CachedSentiment]:
+        """Classificações em cache para as chaves informadas (as ausentes ficam de fora)"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, CachedSentiment] = {}
+        with self._lock:
+            # Consultas em blocos, abaixo do limite de parâmetros do SQLite
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, sentiment, score, contexto FROM sentiments WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, sentiment, score, contexto in rows:
+                    found[key] = (sentiment, score, contexto)
+
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, str, Optional[float], str]]):
+        """Guarda (chave, sentimento, score, contexto) de textos recém-classificados"""
+        now = time.time()
+        rows = [(key, self.model_id, self.rule_version, sentiment, score, contexto, now)
+                for key, sentiment, score, contexto in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sentiments "
+                "(key, model_id, rule_version, sentiment, score, contexto, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self.stats['stores'] += len(rows)
+
+    def hit_ratio(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def print_stats(self):
+        """Resumo de uso do cache para o relatório"""
+        print(f"🗄️ Cache de sentimento: {self.stats['hits']} acertos, {self.stats['misses']} textos novos "
+              f"({self.hit_ratio() * 100:.1f}% de acerto) | {self.stats['invalidated']} entradas antigas removidas")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,152 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from post_store import PYARROW_AVAILABLE, DataFrameParquetWriter, iter_post_chunks, parquet_sibling
+from post_warehouse import DEFAULT_WAREHOUSE, PostWarehouse
+from sentiment_cache import DEFAULT_SENTIMENT_CACHE, SentimentCache
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    psutil = None
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Estado de cada processo worker: o modelo é carregado uma vez, no initializer
+_analisador = None
+_cache = None
+
+
+def physical_cores() -> int:
+    """Núcleos físicos (o modelo não ganha com hyper-threading); os lógicos sem psutil"""
+    if PSUTIL_AVAILABLE:
+        cores = psutil.cpu_count(logical=False)
+        if cores:
+            return cores
+    return os.cpu_count() or 1
+
+
+def _iniciar_worker(backend: str, threads: int, cache_path: str):
+    global _analisador, _cache
+    import torch
+    from sentiment_analyzer3 import AnalisadorAgronegocio
+
+    # Cada worker usa só a sua fatia dos núcleos; sem isso os N processos disputam todos
+    torch.set_num_threads(threads)
+    _analisador = AnalisadorAgronegocio(backend=backend)
+    _analisador.mostrar_progresso = False
+    if cache_path:
+        _cache = SentimentCache(cache_path, _analisador.cache_model_id, _analisador.rule_version)
+
+
+def _classificar_shard(textos, batch_size: int):
+    """Executado no worker: (sentimentos, contextos) de um bloco de textos"""
+    return _analisador.classificar_lote(textos, batch_size=batch_size, cache=_cache)
+
+
+def run_sharded(entrada: str, saida_csv: str, saida_parquet=None, workers: int = 0,
+                chunk_size: int = 5_000, batch_size: int = 32, backend: str = 'torch',
+                cache_path=DEFAULT_SENTIMENT_CACHE, warehouse_path=None) -> Counter:
+    """Classifica a entrada em blocos distribuídos entre processos, gravando na ordem original
+
+    A entrada é lida em blocos (iter_post_chunks), só os textos vão para os workers e
+    os resultados voltam na ordem de envio, então a saída tem a mesma ordem de linhas
+    da entrada. No máximo 2 blocos por worker ficam em memória ao mesmo tempo.
+    """
+    workers = workers or physical_cores()
+    threads = max(1, physical_cores() // workers)
+    logger.info(f"{workers} workers com {threads} threads cada, blocos de {chunk_size} posts")
+
+    parquet_writer = DataFrameParquetWriter(saida_parquet) if saida_parquet else None
+    warehouse = PostWarehouse(warehouse_path) if warehouse_path else None
+    distribuicao = Counter()
+    total = 0
+    primeiro_bloco = True
+    inicio = time.perf_counter()
+
+    def gravar(bloco, resultado):
+        nonlocal primeiro_bloco, total
+        sentimentos, contextos = resultado
+        bloco = bloco.assign(sentiment_agronegocio=sentimentos, contexto_agronegocio=contextos)
+        bloco.to_csv(saida_csv, mode='w' if primeiro_bloco else 'a', header=primeiro_bloco, index=False)
+        primeiro_bloco = False
+        if parquet_writer:
+            parquet_writer.write(bloco)
+        if warehouse and 'uri' in bloco.columns:
+            warehouse.update_sentiment(zip(bloco['uri'], sentimentos, contextos))
+        distribuicao.update(sentimentos)
+        total += len(bloco)
+        logger.info(f"{total} posts classificados ({total / (time.perf_counter() - inicio):.1f} posts/s)")
+
+    # spawn: o torch não se dá bem com fork depois de inicializado
+    context = multiprocessing.get_context('spawn')
+    pendentes = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_iniciar_worker,
+                                 initargs=(backend, threads, cache_path)) as executor:
+            for bloco in iter_post_chunks(entrada, chunk_size):
+                textos = bloco['text'].tolist()
+                pendentes.append((bloco, executor.submit(_classificar_shard, textos, batch_size)))
+                # Limita os blocos em voo; o mais antigo é gravado primeiro (ordem original)
+                while len(pendentes) >= workers * 2:
+                    bloco_pronto, futuro = pendentes.popleft()
+                    gravar(bloco_pronto, futuro.result())
+
+            while pendentes:
+                bloco_pronto, futuro = pendentes.popleft()
+                gravar(bloco_pronto, futuro.result())
+    finally:
+        if parquet_writer:
+            parquet_writer.close()
+        if warehouse:
+            warehouse.close()
+
+    return distribuicao
+
+
+def main():
+    """Análise de sentimento em vários processos, para corpora grandes"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Análise de sentimento em blocos, com vários processos")
+    parser.add_argument('--input', default="data/bluesky_agronegócio_2025.csv",
+                        help="CSV, Parquet ou JSONL com a coluna text")
+    parser.add_argument('--output', default="data/posts_com_sentimento_agronegocio.csv")
+    parser.add_argument('--workers', type=int, default=0, help="Processos (padrão: núcleos físicos)")
+    parser.add_argument('--chunk-size', type=int, default=5_000, help="Posts por bloco enviado a um worker")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('SENTIMENT_BATCH_SIZE', '32')))
+    parser.add_argument('--backend', default=os.getenv('SENTIMENT_BACKEND', 'torch'))
+    parser.add_argument('--cache', default=os.getenv('SENTIMENT_CACHE', DEFAULT_SENTIMENT_CACHE),
+                        help="Cache de sentimento (vazio desliga)")
+    args = parser.parse_args()
+
+    entrada = args.input
+    if PYARROW_AVAILABLE and os.path.exists(parquet_sibling(entrada)):
+        entrada = parquet_sibling(entrada)
+    logger.info(f"Classificando {entrada}...")
+
+    inicio = time.perf_counter()
+    distribuicao = run_sharded(
+        entrada, args.output,
+        saida_parquet=parquet_sibling(args.output) if PYARROW_AVAILABLE else None,
+        workers=args.workers, chunk_size=args.chunk_size, batch_size=args.batch_size,
+        backend=args.backend, cache_path=args.cache,
+        warehouse_path=DEFAULT_WAREHOUSE if os.path.exists(DEFAULT_WAREHOUSE) else None
+    )
+    segundos = time.perf_counter() - inicio
+
+    total = sum(distribuicao.values())
+    print("\n=== RELATÓRIO DE ANÁLISE ===")
+    print(f"Total de posts analisados: {total} em {segundos:.1f}s ({total / max(segundos, 1e-9):.1f} posts/s)")
+    for sentiment, count in distribuicao.most_common():
+        print(f"{sentiment}: {count} ({count / max(total, 1) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import base64
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+
+def decode_jwt_exp(token: Optional[str]) -> Optional[float]:
+    """Lê o claim `exp` (epoch em segundos) de um JWT, sem validar a assinatura"""
+    if not token:
+        return None
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class BlueskySessionManager:
+    """Sessão compartilhada: renova o accessJwt em segundo plano antes de expirar"""
+
+    # Sem `exp` legível, assume a validade conservadora usada antes (5 minutos)
+    FALLBACK_LIFETIME = 5 * 60
+
+    def __init__(self, base_url: str, http_session: requests.Session,
+                 refresh_margin: float = 60.0, stats: Optional[Dict] = None):
+        self.base_url = base_url
+        self.http_session = http_session
+        self.refresh_margin = refresh_margin
+
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+        self.lifetime: Optional[float] = None
+        self.last_refresh_at = 0.0
+
+        # _lock protege a troca dos tokens; _refresh_lock garante um único refresh por vez
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+        self.stats = stats if stats is not None else {}
+        self.stats.setdefault('token_renewals', 0)
+
+    def _store_tokens(self, session_data: Dict) -> bool:
+        """Troca os tokens de forma atômica e agenda a próxima renovação"""
+        access_token = session_data.get('accessJwt')
+        if not access_token:
+            return False
+
+        expires_at = decode_jwt_exp(access_token) or (time.time() + self.FALLBACK_LIFETIME)
+        with self._lock:
+            self.access_token = access_token
+            self.refresh_token = session_data.get('refreshJwt') or self.refresh_token
+            self.expires_at = expires_at
+            self.lifetime = max(expires_at - time.time(), 0.0)
+            self.last_refresh_at = time.time()
+
+        self._schedule_refresh()
+        return True
+
+    def create_session(self, identifier: str, password: str) -> bool:
+        """Autentica com email/senha"""
+        endpoint = f"{self.base_url}/xrpc/com.atproto.server.createSession"
+        response = self.http_session.post(endpoint, json={
+            "identifier": identifier,
+            "password": password
+        })
+        response.raise_for_status()
+        return self._store_tokens(response.json())
+
+    def refresh(self, force: bool = False) -> bool:
+        """Renova o accessJwt usando o refreshJwt (um único refresh por vez)
+
+        Com `force` (um 401 de verdade), o token só é reaproveitado se outro worker
+        o trocou enquanto este esperava o lock; o intervalo de 5 segundos não vale.
+        """
+        with self._lock:
+            seen_token = self.access_token
+
+        with self._refresh_lock:
+            if force:
+                with self._lock:
+                    if self.access_token != seen_token:
+                        return True
+            # Outro worker acabou de renovar: reaproveita o token novo
+            elif time.time() - self.last_refresh_at < 5 and not self.needs_refresh():
+                return True
+
+            with self._lock:
+                refresh_token = self.refresh_token
+            if not refresh_token:
+                print("❌ Sem refresh token disponível")
+                return False
+
+            endpoint = f"{self.base_url}/xrpc/com.atproto.server.refreshSession"
+            try:
+                # O refreshJwt vai só neste request; os demais seguem com o accessJwt atual
+                response = self.http_session.post(endpoint, headers={
+                    'Authorization': f'Bearer {refresh_token}'
+                })
+                response.raise_for_status()
+                if not self._store_tokens(response.json()):
+                    print("❌ Erro na renovação do token")
+                    return False
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Erro na renovação: {e}")
+                return False
+
+            self.stats['token_renewals'] += 1
+            print("🔄 Token renovado com sucesso!")
+            return True
+
+    def handle_auth_error(self) -> bool:
+        """Renovação pedida por um 401 (RequestExecutor.on_auth_error)"""
+        return self.refresh(force=True)
+
+    def _margin(self) -> float:
+        """Margem de renovação; tokens curtos (ex.: servidor simulado) renovam na metade da vida"""
+        if self.lifetime is None:
+            return self.refresh_margin
+        return min(self.refresh_margin, self.lifetime / 2)
+
+    def needs_refresh(self) -> bool:
+        """True se o token expira dentro da margem de segurança"""
+        with self._lock:
+            expires_at = self.expires_at
+        return expires_at is None or time.time() >= expires_at - self._margin()
+
+    def ensure_valid(self) -> bool:
+        """Renova de forma síncrona só se a renovação em segundo plano não aconteceu"""
+        if self.access_token and not self.needs_refresh():
+            return True
+        return self.refresh()
+
+    def auth_headers(self) -> Dict[str, str]:
+        """Cabeçalho de autorização com o token vigente no momento do envio"""
+        self.ensure_valid()
+        with self._lock:
+            access_token = self.access_token
+        return {'Authorization': f'Bearer {access_token}'} if access_token else {}
+
+    def _schedule_refresh(self):
+        """Agenda a renovação para `refresh_margin` segundos antes do exp"""
+        self.stop()
+        if self.expires_at is None:
+            return
+        delay = max(self.expires_at - self._margin() - time.time(), 0.0)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        if not self.refresh():
+            # Nova tentativa em breve; ensure_valid() cobre o intervalo
+            self._timer = threading.Timer(15.0, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self):
+        """Cancela a renovação agendada"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 import re
 from collections import Counter
+from post_store import is_parquet_path, load_posts
 import seaborn as sns
 
 # Configuração melhorada do NLTK
@@ -48,7 +49,7 @@ class BlueskyWordCloudGenerator:
         Inicializa o gerador com o caminho da planilha Excel.
 
         Args:
-            excel_path (str): Caminho para o arquivo Excel
+            excel_path (str): Caminho para o arquivo Excel (ou .parquet)
         """
         self.excel_path = excel_path
         self.df = None
@@ -135,13 +136,18 @@ class BlueskyWordCloudGenerator:
 
     def load_data(self) -> pd.DataFrame:
         """
-        Carrega os dados da planilha Excel.
+        Carrega os dados da planilha Excel ou do arquivo Parquet.
+
+        No Parquet só a coluna `text` é lida do disco.
 
         Returns:
             pd.DataFrame: DataFrame com os dados carregados
         """
         try:
-            self.df = pd.read_excel(self.excel_path)
+            if is_parquet_path(self.excel_path):
+                self.df = load_posts(self.excel_path, columns=['text'])
+            else:
+                self.df = pd.read_excel(self.excel_path)
             print(f"Dados carregados: {len(self.df)} posts encontrados")
             return self.df
         except Exception as e:
@@ -0,0 +1,108 @@
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'core'))
+
+from context_rules import RULE_LABELS, ContextRuleEngine  # noqa: E402
+
+# Listas do AnalisadorAgronegocio (sentiment_analyzer3.py), copiadas para não carregar o modelo
+TERMOS = ['agronegócio', 'agricultura', 'pecuária']
+KEYWORDS_POSITIVAS = [
+    'agricultura', 'pecuária', 'agronegócio', 'produção agrícola',
+    'tecnologia agrícola', 'sustentabilidade', 'produtividade',
+    'inovação rural', 'desenvolvimento rural', 'economia rural',
+    'segurança alimentar', 'exportação', 'commodities'
+]
+KEYWORDS_NEGATIVAS = [
+    'desmatamento', 'poluição', 'agrotóxico', 'monocultura',
+    'concentração fundiária', 'conflito agrário', 'degradação',
+    'erosão', 'contaminação', 'exploração'
+]
+PADROES_CRITICA = [
+    r'\bagronegócio.*(?:destr|prejudic|problem|dano)',
+    r'(?:contra|crítica).*agronegócio',
+    r'agronegócio.*(?:ruim|mal|negativ)',
+    r'fim.*agronegócio',
+    r'pare.*agronegócio'
+]
+PADROES_APOIO = [
+    r'\bagronegócio.*(?:importante|essencial|fundamental)',
+    r'(?:apoio|defendo).*agronegócio',
+    r'agronegócio.*(?:bom|positiv|desenvolvimento)',
+    r'viva.*agronegócio',
+    r'sucesso.*agronegócio'
+]
+
+ENGINE = ContextRuleEngine(TERMOS, PADROES_CRITICA, PADROES_APOIO, KEYWORDS_POSITIVAS, KEYWORDS_NEGATIVAS)
+
+
+# detectar_contexto_agronegocio antes do ContextRuleEngine, copiado como referência
+def old_detectar_contexto(texto, padroes_critica=PADROES_CRITICA, padroes_apoio=PADROES_APOIO):
+    texto_lower = texto.lower()
+
+    if 'agronegócio' not in texto_lower and 'agricultura' not in texto_lower and 'pecuária' not in texto_lower:
+        return 'nao_relacionado'
+
+    for padrao in padroes_critica:
+        if re.search(padrao, texto_lower):
+            return 'critica_explicita'
+
+    for padrao in padroes_apoio:
+        if re.search(padrao, texto_lower):
+            return 'apoio_explicito'
+
+    palavras_positivas = sum(1 for palavra in KEYWORDS_POSITIVAS if palavra in texto_lower)
+    palavras_negativas = sum(1 for palavra in KEYWORDS_NEGATIVAS if palavra in texto_lower)
+
+    if palavras_negativas > palavras_positivas:
+        return 'contexto_negativo'
+    elif palavras_positivas > palavras_negativas:
+        return 'contexto_positivo'
+    else:
+        return 'contexto_neutro'
+
+
+FRAGMENTS = [
+    'agronegócio', 'Agronegócio', 'AGRONEGÓCIO', 'agronegocio', 'xagronegócio', '_agronegócio', '1agronegócio',
+    'agricultura', 'pecuária', 'destrói', 'prejudica', 'problema', 'dano', 'contra', 'crítica', 'ruim',
+    'mal', 'negativo', 'fim', 'pare', 'importante', 'essencial', 'fundamental', 'apoio', 'defendo', 'bom',
+    'positivo', 'desenvolvimento', 'desenvolvimento rural', 'viva', 'sucesso', 'produção agrícola',
+    'tecnologia agrícola', 'sustentabilidade', 'produtividade', 'inovação rural', 'economia rural',
+    'segurança alimentar', 'exportação', 'commodities', 'desmatamento', 'poluição', 'agrotóxico',
+    'monocultura', 'concentração fundiária', 'conflito agrário', 'degradação', 'erosão', 'contaminação',
+    'exploração', 'rural', 'x', '1', '_', '-', '.', '#', ' ', '\n'
+]
+
+
+def random_text(rng):
+    parts = rng.choices(FRAGMENTS, k=rng.randint(0, 10))
+    separators = rng.choices(['', ' ', ' ', '\n', ',', '-'], k=len(parts))
+    return ''.join(part + sep for part, sep in zip(parts, separators))
+
+
+def test_engine_agrees_with_previous_rules():
+    rng = random.Random(2025)
+    for _ in range(20000):
+        texto = random_text(rng)
+        assert ENGINE.detectar(texto) == old_detectar_contexto(texto), texto
+
+
+def test_fallback_patterns_agree_with_previous_rules():
+    # Padrões fora do formato 'A.*B' caem no re.search
+    critica = PADROES_CRITICA + [r'agro\w*\s+mata']
+    apoio = PADROES_APOIO + [r'^viva']
+    engine = ContextRuleEngine(TERMOS, critica, apoio, KEYWORDS_POSITIVAS, KEYWORDS_NEGATIVAS)
+    rng = random.Random(7)
+    for _ in range(5000):
+        texto = random_text(rng) + rng.choice(['', ' mata', 'viva '])
+        assert engine.detectar(texto) == old_detectar_contexto(texto, critica, apoio), texto
+
+
+def test_avaliar_labels_only_rule_decided_contexts():
+    assert ENGINE.avaliar('sem relação') == ('nao_relacionado', 'neutro')
+    assert ENGINE.avaliar('fim do agronegócio') == ('critica_explicita', 'negativo')
+    assert ENGINE.avaliar('viva o agronegócio') == ('apoio_explicito', 'positivo')
+    assert ENGINE.avaliar('agricultura e desmatamento e erosão') == ('contexto_negativo', None)
+    assert set(RULE_LABELS) == {'nao_relacionado', 'critica_explicita', 'apoio_explicito'}
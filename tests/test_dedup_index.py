@@ -0,0 +1,87 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'core'))
+
+from dedup_index import DedupIndex, split_post_uri, uri_hash  # noqa: E402
+
+
+def post_uri(i):
+    return f"at://did:plc:user{i % 97}/app.bsky.feed.post/rkey{i}"
+
+
+def test_add_and_contains():
+    index = DedupIndex(capacity=16)
+    assert post_uri(1) not in index
+    assert index.add(post_uri(1))
+    assert not index.add(post_uri(1))
+    assert post_uri(1) in index
+    assert post_uri(2) not in index
+    assert len(index) == 1
+
+
+def test_uri_hash_ignores_collection_path():
+    # (DID, rkey) identifica o post, não a URI inteira
+    assert split_post_uri(post_uri(5)) == ('did:plc:user5', 'rkey5')
+    assert uri_hash(post_uri(5)) == uri_hash("at://did:plc:user5/outra.colecao/rkey5")
+    assert uri_hash(post_uri(5)) != uri_hash(post_uri(6))
+
+
+def test_grows_past_load_factor_without_losing_entries():
+    for bloom_capacity in (None, 8):
+        index = DedupIndex(capacity=8, bloom_capacity=bloom_capacity)
+        initial_slots = len(index._table)
+        uris = [post_uri(i) for i in range(5000)]
+        assert all(index.add(uri) for uri in uris)
+
+        assert len(index) == 5000
+        assert len(index._table) > initial_slots
+        assert len(index) <= len(index._table) * DedupIndex.MAX_LOAD
+        assert all(uri in index for uri in uris)
+        assert not any(post_uri(i) in index for i in range(5000, 6000))
+        if bloom_capacity:
+            # O Bloom acompanha o índice em vez de saturar
+            assert index.bloom.capacity >= len(index)
+
+
+def test_add_hash_matches_add():
+    rng = random.Random(2025)
+    by_uri = DedupIndex(capacity=8, bloom_capacity=64)
+    by_hash = DedupIndex(capacity=8, bloom_capacity=64)
+    for _ in range(3000):
+        uri = post_uri(rng.randrange(1500))
+        assert by_uri.add(uri) == by_hash.add_hash(uri_hash(uri))
+        assert by_hash.contains_hash(uri_hash(uri))
+    assert len(by_uri) == len(by_hash)
+    assert list(by_uri._table) == list(by_hash._table)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "dedup" / "seen.idx")
+    uris = [post_uri(i) for i in range(2000)]
+    index = DedupIndex(path, capacity=8, bloom_capacity=100)
+    index.update(uris)
+    index.save()
+    assert os.path.exists(path + ".bloom")
+
+    reloaded = DedupIndex(path, capacity=8, bloom_capacity=100)
+    assert len(reloaded) == len(index)
+    assert all(uri in reloaded for uri in uris)
+    assert not any(post_uri(i) in reloaded for i in range(2000, 2500))
+    # O índice carregado continua aceitando inserções e crescendo
+    assert not reloaded.add(uris[0])
+    assert reloaded.add(post_uri(2000))
+    assert post_uri(2000) in reloaded
+
+
+def test_load_without_bloom_file_rebuilds_it(tmp_path):
+    path = str(tmp_path / "seen.idx")
+    index = DedupIndex(path, capacity=8)
+    index.update(post_uri(i) for i in range(500))
+    index.save()
+    assert not os.path.exists(path + ".bloom")
+
+    reloaded = DedupIndex(path, bloom_capacity=10)
+    assert reloaded.bloom.capacity >= len(reloaded)
+    assert all(post_uri(i) in reloaded for i in range(500))
@@ -0,0 +1,64 @@
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'core'))
+
+from keyword_matcher import AGRO_BRAZIL_MATCHER, AGRO_SIGNAL_NAMES, BRAZIL_SIGNAL_NAMES  # noqa: E402
+
+# Filtros de texto do contador antes do KeywordMatcher, copiados como referência
+OLD_BRAZIL_PATTERNS = [
+    r'\br\$\d', r'\breai[s]?\b', r'\bcpf\b', r'\bcnpj\b',
+    r'\bbrasil\b', r'\bbrasileiro\b', r'\bbrasileira\b',
+    r'\bs[ãa]o paulo\b', r'\brio de janeiro\b', r'\bbras[íi]lia\b'
+]
+OLD_AGRO_PATTERNS = [
+    r'\bagroneg[óo]cio\b',
+    r'\bagricultura\b', r'\bpecuária\b', r'\bfazenda\b',
+    r'\b(soja|milho|algod[ãa]o|caf[ée]|cana)\b',
+    r'\b(bovino|su[íi]no|avicultura)\b',
+    r'\b(plantio|colheita|safra)\b'
+]
+
+
+def old_is_brazil_text(text):
+    text = text.lower()
+    if any(re.search(pattern, text) for pattern in OLD_BRAZIL_PATTERNS):
+        return True
+    return any(state in text for state in ['minas gerais', 'rio grande', 'santa catarina'])
+
+
+def old_has_agro(text):
+    text = text.lower()
+    return any(re.search(pattern, text) for pattern in OLD_AGRO_PATTERNS)
+
+
+FRAGMENTS = [
+    'agronegócio', 'agronegocio', 'Agricultura', 'pecuária', 'pecuaria', 'fazenda', 'soja', 'milho',
+    'algodão', 'café', 'cafe', 'cana', 'canavial', 'bovino', 'suíno', 'avicultura', 'safra', 'safras',
+    'colheita', 'plantio', 'R$', 'r$5', 'R$ 10', 'reais', 'reai', 'real', 'CPF', 'cnpj', 'Brasil',
+    'brasileiro', 'brasileiras', 'São Paulo', 'sao paulo', 'Rio de Janeiro', 'Brasília', 'brasilia',
+    'Minas Gerais', 'minas geraisense', 'xminas gerais', 'rio grande', 'território grande',
+    'Rio Grandense', 'santa catarina', 'santa catarinense', 'x', '1', '_', '-', '.', '#', '@', ' ', '\n'
+]
+
+
+def random_text(rng):
+    parts = rng.choices(FRAGMENTS, k=rng.randint(0, 8))
+    separators = rng.choices(['', ' ', ' ', '\n', ',', '-'], k=len(parts))
+    return ''.join(part + sep for part, sep in zip(parts, separators))
+
+
+def test_matcher_agrees_with_previous_filters():
+    rng = random.Random(2025)
+    for _ in range(20000):
+        text = random_text(rng)
+        signals = AGRO_BRAZIL_MATCHER.scan(text)
+        assert (not signals.isdisjoint(BRAZIL_SIGNAL_NAMES)) == old_is_brazil_text(text), text
+        assert (not signals.isdisjoint(AGRO_SIGNAL_NAMES)) == old_has_agro(text), text
+
+
+def test_states_match_inside_words():
+    for text in ['território grande do sul', 'xminas gerais', 'Santa Catarinas']:
+        assert 'brasil:estados' in AGRO_BRAZIL_MATCHER.scan(text)
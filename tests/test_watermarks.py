@@ -0,0 +1,51 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'core'))
+
+from checkpoint import WatermarkStore  # noqa: E402
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def test_future_created_at_does_not_move_watermark_ahead(tmp_path):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    store.advance('agronegócio', [
+        {'created_at': iso(now - timedelta(hours=2)), 'indexed_at': iso(now - timedelta(hours=2))},
+        # Relógio do cliente adiantado: indexedAt (servidor) é o que vale
+        {'created_at': iso(now + timedelta(days=300)), 'indexed_at': iso(now - timedelta(hours=1))},
+    ])
+    assert store.get('agronegócio') == iso(now - timedelta(hours=1))
+
+
+def test_future_created_at_without_indexed_at_is_clamped_to_now(tmp_path):
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    before = datetime.now(timezone.utc)
+    store.advance('soja', [{'created_at': iso(before + timedelta(days=30))}])
+    watermark = datetime.fromisoformat(store.get('soja').replace('Z', '+00:00'))
+    assert watermark <= datetime.now(timezone.utc)
+
+
+def test_watermark_never_moves_back_and_survives_save(tmp_path):
+    path = str(tmp_path / "watermarks.json")
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    store = WatermarkStore(path)
+    store.advance('milho', [{'created_at': iso(now - timedelta(hours=1)), 'indexed_at': iso(now)}])
+    store.advance('milho', [{'created_at': iso(now - timedelta(days=3)), 'indexed_at': iso(now)}])
+    assert store.get('milho') == iso(now - timedelta(hours=1))
+
+    store.save()
+    assert WatermarkStore(path).get('milho') == iso(now - timedelta(hours=1))
+
+
+def test_legacy_future_watermark_is_recovered(tmp_path):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    # Formato anterior: maior created_at e maior indexed_at, cada um por conta própria
+    store.watermarks['fazenda'] = {'created_at': iso(now + timedelta(days=300)),
+                                   'indexed_at': iso(now - timedelta(hours=1))}
+    assert store.get('fazenda') == iso(now - timedelta(hours=1))